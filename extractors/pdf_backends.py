@@ -7,6 +7,7 @@ via a string flag without touching internals.
 Supported backends:
   - "pymupdf"  : PyMuPDF backend with text/blocks modes (default)
   - "legacy"   : original words_to_text() logic from pdf_to_jsonl.py
+                 (legacy_mode="words" or "text")
 
 Usage:
   from pdf_backends import extract_pagerecords
@@ -22,7 +23,7 @@ from typing import Iterator, Dict, Any
 import fitz
 
 from id_factory import IDFactory
-from pdf_to_jsonl import words_to_text, to_jsonable, group_sections_per_page, PageRecord
+from pdf_to_jsonl import words_to_dict, section_ids_for_text
 
 
 def _current_backend(pdf_path: Path, book_id: str, **kwargs) -> Iterator[Dict[str, Any]]:
@@ -32,15 +33,14 @@ def _current_backend(pdf_path: Path, book_id: str, **kwargs) -> Iterator[Dict[st
     This mirrors the loop in convert_pdf() but yields dicts instead of writing
     directly, so it can be used through the unified interface.
     """
-    with fitz.open(pdf_path) as doc:
-        for page_idx in range(len(doc)):
-            page_record: PageRecord = words_to_text(doc[page_idx], book_id=book_id)
-
-            # Add section heuristics (same as convert_pdf does)
-            sections = group_sections_per_page(page_record)
-            page_record.section_ids = {s for s in sections if s is not None}
+    mode = kwargs.get("legacy_mode", "words")
+    page_range = kwargs.get("page_range")
 
-            yield to_jsonable(page_record)
+    with fitz.open(pdf_path) as doc:
+        pages = range(len(doc)) if page_range is None else page_range
+        for page_idx in pages:
+            # Built as a dict with section heuristics applied (same as convert_pdf does)
+            yield words_to_dict(doc[page_idx], book_id=book_id, mode=mode)
 
 
 def _pymupdf_backend(pdf_path: Path, book_id: str, **kwargs) -> Iterator[Dict[str, Any]]:
@@ -50,23 +50,12 @@ def _pymupdf_backend(pdf_path: Path, book_id: str, **kwargs) -> Iterator[Dict[st
     from extractors.pymupdf_backend import extract_pages
 
     mode = kwargs.get("pymupdf_mode", "text")
+    page_range = kwargs.get("page_range")
 
-    for record in extract_pages(pdf_path, book_id, mode=mode):
+    for record in extract_pages(pdf_path, book_id, mode=mode, page_range=page_range):
         # Run the same section-heuristic pass on the extracted text
         # so section_ids are populated consistently
-        temp = PageRecord(
-            id=record["id"],
-            book_id=record["book_id"],
-            pdf_page_number=record["pdf_page_number"],
-            text=record["text"],
-            word_count=record["word_count"],
-            has_chapter=record["has_chapter"],
-            has_section=record["has_section"],
-            has_question=record["has_question"],
-            has_answer=record["has_answer"],
-        )
-        sections = group_sections_per_page(temp)
-        record["section_ids"] = sorted(s for s in sections if s is not None)
+        record["section_ids"] = sorted(section_ids_for_text(record["text"], record["book_id"]))
 
         yield record
 
@@ -91,7 +80,8 @@ def extract_pagerecords(
         pdf_path:  Path to the PDF.
         book_id:   Deterministic book UUID.
         backend:   "pymupdf" (default) or "legacy".
-        **kwargs:  Passed to the chosen backend (e.g. pymupdf_mode="blocks").
+        **kwargs:  Passed to the chosen backend (e.g. pymupdf_mode="blocks",
+                   legacy_mode="text", page_range=range(0, 50)).
 
     Yields:
         dict — one PageRecord per page, JSON-serialisable.
@@ -24,7 +24,7 @@ from pathlib import Path
 from typing import Iterator, Dict, Any, List, Optional
 
 from id_factory import IDFactory
-from legacy.regex_parts import has_answer, has_question, has_chapter, has_section
+from legacy.regex_parts import scan_page_flags
 
 
 # ---------------------------------------------------------------------------
@@ -72,14 +72,16 @@ def extract_pages(
     book_id: str,
     *,
     mode: str = "text",
+    page_range: Optional[range] = None,
 ) -> Iterator[Dict[str, Any]]:
     """
     Yield one PageRecord dict per page from the PDF.
 
     Args:
-        pdf_path:  Path to the PDF file.
-        book_id:   Book UUID (from IDFactory or pipeline).
-        mode:      "text" or "blocks".
+        pdf_path:    Path to the PDF file.
+        book_id:     Book UUID (from IDFactory or pipeline).
+        mode:        "text" or "blocks".
+        page_range:  Optional 0-based page indices to extract (default: all).
 
     Yields:
         dict matching the PageRecord schema (JSON-serialisable).
@@ -90,12 +92,14 @@ def extract_pages(
     extractor = _extract_text_mode if mode == "text" else _extract_blocks_mode
 
     with fitz.open(pdf_path) as doc:
-        for page_idx in range(len(doc)):
+        pages = range(len(doc)) if page_range is None else page_range
+        for page_idx in pages:
             page = doc[page_idx]
             pdf_page_number = page_idx + 1  # 1-based
 
             text = extractor(page)
             word_count = len(text.split()) if text else 0
+            chap, sec, ques, ans = scan_page_flags(text)
 
             yield {
                 "id": IDFactory.page_id(book_id, pdf_page_number),
@@ -105,10 +109,10 @@ def extract_pages(
                 "real_page_number": None,
                 "text": text,
                 "word_count": word_count,
-                "has_chapter": has_chapter(text) if text else False,
-                "has_section": has_section(text) if text else False,
-                "has_question": has_question(text) if text else False,
-                "has_answer": has_answer(text) if text else False,
+                "has_chapter": chap,
+                "has_section": sec,
+                "has_question": ques,
+                "has_answer": ans,
                 "text_embedding": None,
             }
 
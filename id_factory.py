@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import re
 import uuid
+import hashlib
+import functools
 import unicodedata
 from dataclasses import dataclass
 
@@ -21,6 +23,36 @@ def _norm(s: str) -> str:
     s = re.sub(r'\s+', ' ', s)  # Replace multiple whitespace with single space
     return s
 
+""" -------------------------------------------------------------------------------------------------------- """
+"""
+Per-book SHA-1 state for uuid5(_ns(), f'{kind}|book:{_norm(book_id)}|...'): uuid5 is SHA-1 over
+namespace bytes + name, so hashing the shared prefix once and copy()-ing it per ID gives the same
+UUIDs without re-deriving the namespace and re-normalising the book ID on every page/section call.
+Args:
+    kind: Name prefix ("page" or "section")
+    book_id: Book ID the IDs are scoped to
+Returns:
+    hashlib SHA-1 object primed with the namespace and name prefix (copy before updating)
+"""
+@functools.lru_cache(maxsize=256)
+def _book_prefix_hasher(kind: str, book_id: str):
+    h = hashlib.sha1(IDFactory._ns().bytes)
+    h.update(f'{kind}|book:{_norm(book_id)}|'.encode('utf-8'))
+    return h
+
+"""
+Finish a uuid5 from a primed prefix hasher
+Args:
+    prefix: Hasher from _book_prefix_hasher (left untouched)
+    rest: Remainder of the uuid5 name after the prefix
+Returns:
+    UUID string identical to str(uuid.uuid5(ns, prefix_name + rest))
+"""
+def _uuid5_from(prefix, rest: str) -> str:
+    h = prefix.copy()
+    h.update(rest.encode('utf-8'))
+    return str(uuid.UUID(bytes=h.digest()[:16], version=5))
+
 """ -------------------------------------------------------------------------------------------------------- """
 """
 Deterministic, namespaced IDs
@@ -39,13 +71,12 @@ class IDFactory:
     
     @staticmethod
     def section_id(book_id: str, section_key: str) -> str:
-        name = f'section|book:{_norm(book_id)}|{_norm(section_key)}|key:{_norm(section_key)}'
-        return str(uuid.uuid5(IDFactory._ns(), name))
+        key = _norm(section_key)
+        return _uuid5_from(_book_prefix_hasher('section', book_id), f'{key}|key:{key}')
     
     @staticmethod
     def page_id(book_id: str, page_number: int) -> str:
-        name = f'page|book:{_norm(book_id)}|number:{int(page_number)}'
-        return str(uuid.uuid5(IDFactory._ns(), name))
+        return _uuid5_from(_book_prefix_hasher('page', book_id), f'number:{int(page_number)}')
     
     @staticmethod
     def qa_id(book_id: str, problem_key: str) -> str:
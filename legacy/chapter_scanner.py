@@ -11,9 +11,11 @@ Detects:
 import json
 import re
 from pathlib import Path
-from typing import List, Optional, Tuple, Set
+from typing import Iterable, List, Optional, Tuple, Set
 from dataclasses import dataclass, field
 
+from legacy.pagerecords_reader import iter_pagerecords
+
 
 @dataclass
 class SpecialPageType:
@@ -166,9 +168,34 @@ def scan_pagerecords_for_chapters(
 ) -> List[ChapterBoundary]:
    """
    Scan PageRecords file and extract chapter boundaries with special pages.
+   Streams the file into scan_pages_for_chapters(); see it for the arguments.
+   """
+   return scan_pages_for_chapters(
+      iter_pagerecords(pagerecords_file, verbose=verbose),
+      min_chapter=min_chapter,
+      max_chapter=max_chapter,
+      min_page_gap=min_page_gap,
+      detect_special_pages=detect_special_pages,
+      special_patterns=special_patterns,
+      verbose=verbose,
+   )
+
+
+def scan_pages_for_chapters(
+   pages: Iterable[dict],
+   *,
+   min_chapter: int = 1,
+   max_chapter: int = 50,
+   min_page_gap: int = 5,
+   detect_special_pages: bool = True,
+   special_patterns: dict = None,
+   verbose: bool = True,
+) -> List[ChapterBoundary]:
+   """
+   Extract chapter boundaries with special pages from parsed PageRecord dicts.
    
    Args:
-      pagerecords_file: Path to _PageRecords file
+      pages: PageRecord dicts in page order
       min_chapter: Minimum expected chapter number
       max_chapter: Maximum expected chapter number
       min_page_gap: Minimum pages between chapters
@@ -190,64 +217,53 @@ def scan_pagerecords_for_chapters(
    if verbose:
       print(f"  Scanning for chapters and special pages...")
    
-   with open(pagerecords_file, 'r', encoding='utf-8') as f:
-      for line_num, line in enumerate(f, 1):
-         if not line.strip():
+   for page_data in pages:
+      page_num = page_data.get('pdf_page_number')
+      text = page_data.get('text', '')
+      
+      if not page_num or not text:
+            continue
+      
+      # Detect chapter boundary
+      chapter_result = detect_chapter_at_page_start(text)
+      
+      if chapter_result:
+            chapter_num, title = chapter_result
+            
+            # Validation
+            if not (min_chapter <= chapter_num <= max_chapter):
                continue
-         
-         try:
-               page_data = json.loads(line)
-         except json.JSONDecodeError:
-               if verbose:
-                  print(f"    Warning: Skipping malformed JSON at line {line_num}")
+            
+            if chapter_num in seen_chapters:
                continue
-         
-         page_num = page_data.get('pdf_page_number')
-         text = page_data.get('text', '')
-         
-         if not page_num or not text:
+            
+            if last_page > 0 and (page_num - last_page) < min_page_gap:
+               if verbose:
+                  print(f"    Skipping Chapter {chapter_num} @ page {page_num} (too close)")
                continue
-         
-         # Detect chapter boundary
-         chapter_result = detect_chapter_at_page_start(text)
-         
-         if chapter_result:
-               chapter_num, title = chapter_result
-               
-               # Validation
-               if not (min_chapter <= chapter_num <= max_chapter):
-                  continue
-               
-               if chapter_num in seen_chapters:
-                  continue
-               
-               if last_page > 0 and (page_num - last_page) < min_page_gap:
-                  if verbose:
-                     print(f"    Skipping Chapter {chapter_num} @ page {page_num} (too close)")
-                  continue
-               
-               # Valid chapter found
-               boundary = ChapterBoundary(chapter_num, page_num, title)
-               boundaries.append(boundary)
-               seen_chapters.add(chapter_num)
-               last_page = page_num
-               current_chapter = boundary
+            
+            # Valid chapter found
+            boundary = ChapterBoundary(chapter_num, page_num, title)
+            boundaries.append(boundary)
+            seen_chapters.add(chapter_num)
+            last_page = page_num
+            current_chapter = boundary
+            
+            if verbose:
+               title_display = f": {title}" if title else ""
+               print(f"    ✓ Chapter {chapter_num}{title_display} @ page {page_num}")
+      
+      # Detect special pages (only if we're in a chapter)
+      elif detect_special_pages and current_chapter:
+            special_result = detect_special_page_type(text, special_patterns)
+            
+            if special_result:
+               page_type, matched_text = special_result
+               current_chapter.add_special_page(page_type, page_num, matched_text)
                
                if verbose:
-                  title_display = f": {title}" if title else ""
-                  print(f"    ✓ Chapter {chapter_num}{title_display} @ page {page_num}")
-         
-         # Detect special pages (only if we're in a chapter)
-         elif detect_special_pages and current_chapter:
-               special_result = detect_special_page_type(text, special_patterns)
-               
-               if special_result:
-                  page_type, matched_text = special_result
-                  current_chapter.add_special_page(page_type, page_num, matched_text)
-                  
-                  if verbose:
-                     print(f"      → {page_type.title()} page @ {page_num}")
-   
+                  print(f"      → {page_type.title()} page @ {page_num}")
+
    # Sort by page number
    boundaries.sort(key=lambda b: b.page_number)
    
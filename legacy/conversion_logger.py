@@ -3,11 +3,18 @@ Conversion logging system for tracking PDF processing status.
 Maintains a JSONL log of all PDFs and their conversion status.
 """
 
+import os
 import json
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
 
+try:
+   import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+   fcntl = None
+
 
 @dataclass
 class ConversionLogEntry:
@@ -60,9 +67,29 @@ class ConversionLogger:
    
    def _write_all_entries(self, entries: List[ConversionLogEntry]):
       """Write all entries back to file (overwrites)."""
-      with open(self.log_path, 'w', encoding='utf-8') as f:
+      # Renamed into place so readers never see a half-written log
+      tmp = self.log_path.with_name(self.log_path.name + '.tmp')
+      with open(tmp, 'w', encoding='utf-8') as f:
          for entry in entries:
                f.write(json.dumps(entry.to_dict()) + '\n')
+      os.replace(tmp, self.log_path)
+
+   @contextmanager
+   def _locked(self):
+      """
+      Hold an exclusive lock on a sidecar .lock file, so read-modify-write
+      updates from concurrent conversions (batch workers, server threads)
+      do not overwrite each other.
+      """
+      if fcntl is None:
+         yield
+         return
+      with open(self.log_path.with_name(self.log_path.name + '.lock'), 'w') as lock:
+         fcntl.flock(lock, fcntl.LOCK_EX)
+         try:
+            yield
+         finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
    
    def get_entry(self, pdf_name: str) -> Optional[ConversionLogEntry]:
       """
@@ -89,15 +116,16 @@ class ConversionLogger:
       Args:
          entry: ConversionLogEntry to add
       """
-      existing = self.get_entry(entry.document_title)
-      
-      if existing:
-         # Entry already exists, don't add duplicate
-         return
-      
-      # Append new entry
-      with open(self.log_path, 'a', encoding='utf-8') as f:
-         f.write(json.dumps(entry.to_dict()) + '\n')
+      with self._locked():
+         existing = self.get_entry(entry.document_title)
+
+         if existing:
+            # Entry already exists, don't add duplicate
+            return
+
+         # Append new entry
+         with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry.to_dict()) + '\n')
    
    def update_entry(self, pdf_name: str, **updates) -> bool:
       """
@@ -110,21 +138,22 @@ class ConversionLogger:
       Returns:
          True if entry was found and updated, False otherwise
       """
-      entries = self._read_all_entries()
-      found = False
-      
-      for i, entry in enumerate(entries):
-         if entry.document_title == pdf_name:
-               # Update fields
-               for key, value in updates.items():
-                  if hasattr(entry, key):
-                     setattr(entry, key, value)
-               found = True
-               break
-      
-      if found:
-         self._write_all_entries(entries)
-      
+      with self._locked():
+         entries = self._read_all_entries()
+         found = False
+
+         for i, entry in enumerate(entries):
+            if entry.document_title == pdf_name:
+                  # Update fields
+                  for key, value in updates.items():
+                     if hasattr(entry, key):
+                        setattr(entry, key, value)
+                  found = True
+                  break
+
+         if found:
+            self._write_all_entries(entries)
+
       return found
    
    def mark_as_converted(self, pdf_name: str, output_path: str, 
@@ -186,15 +215,16 @@ class ConversionLogger:
       Returns:
          True if entry was found and deleted
       """
-      entries = self._read_all_entries()
-      original_len = len(entries)
-      
-      entries = [e for e in entries if e.document_title != pdf_name]
-      
-      if len(entries) < original_len:
-         self._write_all_entries(entries)
-         return True
-      
+      with self._locked():
+         entries = self._read_all_entries()
+         original_len = len(entries)
+
+         entries = [e for e in entries if e.document_title != pdf_name]
+
+         if len(entries) < original_len:
+            self._write_all_entries(entries)
+            return True
+
       return False
 
 
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+JSONL line serialization shared by the converters, the page classifier and
+the rag index/corpus writers.
+
+Only the standard library plus optional orjson, so importing it does not pull
+in PyMuPDF, numpy or the conversion stack.
+"""
+
+import json
+from typing import Any, Dict
+
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+
+def dumps_jsonl_line(record: Dict[str, Any]) -> bytes:
+   """
+   Serialize one JSON-native dict as a compact UTF-8 JSONL line, including the
+   trailing newline (orjson when installed, json with the same separators otherwise).
+   """
+   if orjson is not None:
+      return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+   return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
@@ -29,6 +29,16 @@ from collections import Counter
 from dataclasses import dataclass, field, asdict
 from typing import Any, Dict, List, Optional, Tuple
 
+from legacy.jsonl_io import dumps_jsonl_line
+
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
 # ============================================================================
 # PAGE TYPES
 # ============================================================================
@@ -390,15 +400,17 @@ def classify_pagerecords(
    counts: Counter = Counter()
    confidence_sums: Counter = Counter()
 
-   with open(input_path, 'r', encoding='utf-8') as fin, \
-        open(output_path, 'w', encoding='utf-8') as fout:
+   # Lines are collected and written with a single write() at the end
+   out_lines: List[bytes] = []
+
+   with open(input_path, 'rb') as fin:
 
       for line in fin:
          line = line.strip()
          if not line:
             continue
 
-         record = json.loads(line)
+         record = _loads(line)
          text = record.get('text', '') or ''
          wc = record.get('word_count', None)
          pdf_page = record.get('pdf_page_number', 0)
@@ -423,11 +435,14 @@ def classify_pagerecords(
             detected_chapter_numbers=chapter_nums,
          )
 
-         fout.write(json.dumps(asdict(classification), ensure_ascii=False) + '\n')
+         out_lines.append(dumps_jsonl_line(asdict(classification)))
 
          counts[page_type] += 1
          confidence_sums[page_type] += confidence
 
+   with open(output_path, 'wb') as fout:
+      fout.write(b''.join(out_lines))
+
    if verbose:
       _print_summary(counts, confidence_sums)
 
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Single-pass reader for _PageRecords JSONL files.
+
+The chapter scanner, section scanner and section text extractor all consume
+the same page stream. Reading it once here and handing the parsed pages to
+each stage avoids re-opening and re-decoding the file per stage.
+PageRecordsReader adds random access to single pages via mmap.
+"""
+
+import os
+import json
+import mmap
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+try:
+   import zstandard
+except ImportError:
+   zstandard = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+# PageRecords written with convert_pdf(compress=True) carry this suffix
+ZST_SUFFIX = '.zst'
+
+
+def require_zstandard():
+   """Raise if the optional zstandard package needed for .zst PageRecords is missing."""
+   if zstandard is None:
+      raise ImportError(
+         "zstandard is required for compressed PageRecords. Install with: pip install zstandard"
+      )
+
+
+class PageRecordsReader:
+   """
+   Random-access view of a _PageRecords file.
+
+   The file is memory-mapped and one vectorised pass over its bytes records
+   where every line starts and ends; get(i) then decodes line i straight
+   from the map without touching the lines before it. Files ending in .zst
+   are decompressed into memory once instead of mapped.
+
+   Usage:
+      with PageRecordsReader(path) as reader:
+         page = reader.get(41)
+         for page in reader: ...
+   """
+
+   def __init__(self, pagerecords_file: Path):
+      self._file = open(pagerecords_file, 'rb')
+      if Path(pagerecords_file).suffix == ZST_SUFFIX:
+         require_zstandard()
+         with self._file:
+            self._mm = zstandard.ZstdDecompressor().stream_reader(self._file).read()
+         size = len(self._mm)
+      else:
+         size = os.fstat(self._file.fileno()).st_size
+         # mmap cannot map an empty file
+         self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+      newlines = np.flatnonzero(np.frombuffer(self._mm, dtype=np.uint8) == 0x0A) if size else np.empty(0, np.int64)
+      self._starts = np.concatenate(([0], newlines + 1)).astype(np.int64)
+      self._ends = np.concatenate((newlines, [size])).astype(np.int64)
+      if size and self._starts[-1] == size:
+         # Trailing newline: drop the empty pseudo-line after it
+         self._starts, self._ends = self._starts[:-1], self._ends[:-1]
+
+   def __len__(self) -> int:
+      return len(self._starts)
+
+   def raw(self, i: int) -> bytes:
+      """Bytes of line i (without the newline)."""
+      return self._mm[int(self._starts[i]):int(self._ends[i])]
+
+   def get(self, i: int) -> dict:
+      """Decode line i; raises ValueError if it is not valid JSON."""
+      return _loads(self.raw(i))
+
+   def __iter__(self) -> Iterator[dict]:
+      return iter_pagerecords(self)
+
+   def close(self) -> None:
+      if isinstance(self._mm, mmap.mmap):
+         self._mm.close()
+      self._file.close()
+
+   def __enter__(self) -> "PageRecordsReader":
+      return self
+
+   def __exit__(self, *exc) -> None:
+      self.close()
+
+
+def iter_pagerecords(source: Union[Path, PageRecordsReader], *, verbose: bool = False) -> Iterator[dict]:
+   """
+   Yield PageRecord dicts from a _PageRecords file, skipping blank and malformed lines.
+
+   Args:
+      source: Path to _PageRecords file, or an open PageRecordsReader
+      verbose: Print a warning for each malformed line
+   """
+   if not isinstance(source, PageRecordsReader):
+      with PageRecordsReader(source) as reader:
+         yield from iter_pagerecords(reader, verbose=verbose)
+      return
+
+   for i in range(len(source)):
+      line = source.raw(i)
+      if not line.strip():
+         continue
+      try:
+         yield _loads(line)
+      except ValueError:
+         if verbose:
+            print(f"    Warning: Skipping malformed JSON at line {i + 1}")
+
+
+def load_pagerecords(pagerecords_file: Path, *, verbose: bool = False) -> List[dict]:
+   """Read every PageRecord in the file into a list (one decode per line)."""
+   return list(iter_pagerecords(pagerecords_file, verbose=verbose))
+
+
+def page_text_map(pages: Iterable[dict]) -> Dict[int, str]:
+   """Map pdf_page_number -> text for already-parsed PageRecords."""
+   page_map = {}
+   for page_data in pages:
+      page_num = page_data.get('pdf_page_number')
+      if page_num:
+         page_map[page_num] = page_data.get('text', '')
+   return page_map
@@ -394,6 +394,7 @@ Returns:
 def save_qa_extraction(questions: List[QuestionRecord], answers: List[AnswerRecord], output_path: Path) -> Tuple[Path, Path]:
    from pathlib import Path
    from pdf_to_jsonl import to_jsonable
+   from legacy.jsonl_io import dumps_jsonl_line
 
    # Get base filename without extension
    base_name = output_path.stem  # e.g., "eecs_test3" from "eecs_test3.jsonl"
@@ -409,17 +410,12 @@ def save_qa_extraction(questions: List[QuestionRecord], answers: List[AnswerReco
    print(f"  Questions: {questions_output}")
    print(f"  Answers: {answers_output}\n")
 
-   # Save questions
-   with open(questions_output, 'w', encoding='utf-8') as f:
-      for q in questions:
-         record = to_jsonable(q)
-         f.write(json.dumps(record, ensure_ascii=False) + '\n')
+   # Each file is serialized in memory and written with a single write()
+   with open(questions_output, 'wb') as f:
+      f.write(b''.join(dumps_jsonl_line(to_jsonable(q)) for q in questions))
    
-   # Save answers
-   with open(answers_output, 'w', encoding='utf-8') as f:
-      for a in answers:
-         record = to_jsonable(a)
-         f.write(json.dumps(record, ensure_ascii=False) + '\n')
+   with open(answers_output, 'wb') as f:
+      f.write(b''.join(dumps_jsonl_line(to_jsonable(a)) for a in answers))
    
    return questions_output, answers_output
 
@@ -3,6 +3,13 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
 @dataclass
 class QuestionOption:
    letter: str
@@ -139,6 +146,51 @@ class QuestionBank:
    def add_answer(self, answer: Answer) -> None:
       self.answers.append(answer)
 
+   def add_questions_bulk(
+      self,
+      question_ids: List[str],
+      question_texts: List[str],
+      chapters: List[Optional[str]],
+      pages: List[Optional[int]],
+      sections: List[Optional[str]],
+      source_book: Optional[str] = None,
+      question_type: str = 'multiple_choice',
+      source_type: str = 'textbook',
+   ) -> None:
+      """
+      Add one question per position of the parallel column lists. The batch
+      shares one created_at timestamp and the bank's list grows once.
+      """
+      created_at = datetime.now().isoformat()
+      self.questions.extend([
+         Question(
+            question_id=qid,
+            question_text=text,
+            question_type=question_type,
+            source_type=source_type,
+            source_book=source_book,
+            source_chapter=chapter,
+            source_page=page,
+            source_section=section,
+            created_at=created_at,
+         )
+         for qid, text, chapter, page, section
+         in zip(question_ids, question_texts, chapters, pages, sections)
+      ])
+
+   def add_answers_bulk(
+      self,
+      question_ids: List[str],
+      answer_texts: List[str],
+      source: Optional[str] = None,
+   ) -> None:
+      """Add one answer per (question_id, answer_text) pair, sharing one created_at."""
+      created_at = datetime.now().isoformat()
+      self.answers.extend([
+         Answer(question_id=qid, answer_text=text, source=source, created_at=created_at)
+         for qid, text in zip(question_ids, answer_texts)
+      ])
+
    def add_question_answer_pair(self, question: Question, answer: Answer) -> None:
       self.questions.append(question)
       self.answers.append(answer)
@@ -165,16 +217,25 @@ class QuestionBank:
       data = {
          'name': self.name,
          'description': self.description,
-         'questions': [asdict(q) for q in self.questions],
-         'answers': [asdict(a) for a in self.answers]
       }
-      with open(filepath, 'w') as f:
-         json.dump(data, f, indent=2)
+      # Written as UTF-8 bytes either way; orjson keeps non-ASCII unescaped
+      if orjson is not None:
+         # orjson serializes dataclasses natively, with the same fields and
+         # order as asdict(), and skips asdict()'s recursive deep copy
+         data['questions'] = self.questions
+         data['answers'] = self.answers
+         payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+      else:
+         data['questions'] = [asdict(q) for q in self.questions]
+         data['answers'] = [asdict(a) for a in self.answers]
+         payload = json.dumps(data, indent=2).encode('utf-8')
+      with open(filepath, 'wb') as f:
+         f.write(payload)
    
    @classmethod
    def load(cls, filepath: str) -> 'QuestionBank':
-      with open(filepath, 'r') as f:
-         data = json.load(f)
+      with open(filepath, 'rb') as f:
+         data = _loads(f.read())
 
       bank = cls(
          name=data.get('name', 'untitled question bank'),
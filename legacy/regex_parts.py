@@ -1,5 +1,5 @@
 import re
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from dataclasses import dataclass
 from legacy.qa_schema import Question, Answer, QuestionOption
 
@@ -478,35 +478,46 @@ def find_answers(text: str, questions: List[Question] = None) -> List[Answer]:
 # UTILITY FUNCTIONS
 # ============================================================================
 
+# Each has_* check is one precompiled alternation of its pattern list, so a page is
+# searched once per flag instead of once per pattern
+def _any_of(patterns: List[str]) -> "re.Pattern":
+   return re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE)
+
+_CHAPTER_ANY = _any_of(CHAPTER_PATTERNS)
+_SECTION_ANY = _any_of(SECTION_PATTERNS)
+_QUESTION_HEADER_ANY = _any_of(QUESTION_HEADER_PATTERNS)
+_ANSWER_HEADER_ANY = _any_of(ANSWER_HEADER_PATTERNS)
+
+
 def has_chapter(text: str) -> bool:
-   """Check if text contains an answer/solution section header."""
-   for pattern in CHAPTER_PATTERNS:
-      if re.search(pattern, text, re.IGNORECASE):
-         return True
-   return False
+   """Check if text contains a chapter heading."""
+   return _CHAPTER_ANY.search(text) is not None
 
 def has_section(text: str) -> bool:
-   """Check if text contains an answer/solution section header."""
-   for pattern in SECTION_PATTERNS:
-      if re.search(pattern, text, re.IGNORECASE):
-         return True
-   return False
+   """Check if text contains a section heading."""
+   return _SECTION_ANY.search(text) is not None
 
 
 def has_question(text: str) -> bool:
    """Check if text contains a question/exercise section header."""
-   for pattern in QUESTION_HEADER_PATTERNS:
-      if re.search(pattern, text, re.IGNORECASE):
-         return True
-   return False
+   return _QUESTION_HEADER_ANY.search(text) is not None
 
 
 def has_answer(text: str) -> bool:
    """Check if text contains an answer/solution section header."""
-   for pattern in ANSWER_HEADER_PATTERNS:
-      if re.search(pattern, text, re.IGNORECASE):
-         return True
-   return False
+   return _ANSWER_HEADER_ANY.search(text) is not None
+
+
+def scan_page_flags(text: str) -> Tuple[bool, bool, bool, bool]:
+   """(has_chapter, has_section, has_question, has_answer) for a page; all False for empty text."""
+   if not text:
+      return (False, False, False, False)
+   return (
+      _CHAPTER_ANY.search(text) is not None,
+      _SECTION_ANY.search(text) is not None,
+      _QUESTION_HEADER_ANY.search(text) is not None,
+      _ANSWER_HEADER_ANY.search(text) is not None,
+   )
 
 
 # ============================================================================
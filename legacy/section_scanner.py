@@ -17,9 +17,11 @@ Design principles:
 import json
 import re
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterable, List, Optional, Tuple
 from dataclasses import dataclass, field
 
+from legacy.pagerecords_reader import iter_pagerecords
+
 
 @dataclass
 class SectionBoundary:
@@ -132,12 +134,31 @@ def scan_pagerecords_for_sections(
 ) -> List[SectionBoundary]:
    """
    Scan PageRecords file and extract section boundaries with page ranges.
+   Streams the file into scan_pages_for_sections(); see it for the arguments.
+   """
+   return scan_pages_for_sections(
+      iter_pagerecords(pagerecords_file, verbose=verbose),
+      max_depth=max_depth,
+      chapter_boundaries=chapter_boundaries,
+      verbose=verbose,
+   )
+
+
+def scan_pages_for_sections(
+   pages: Iterable[dict],
+   *,
+   max_depth: int = 2,
+   chapter_boundaries: List[dict] = None,
+   verbose: bool = True,
+) -> List[SectionBoundary]:
+   """
+   Extract section boundaries with page ranges from parsed PageRecord dicts.
 
    Each unique section_number is recorded once (first occurrence only).
    After collection, page_end is computed from the next section's page_start.
 
    Args:
-      pagerecords_file: Path to _PageRecords file
+      pages: PageRecord dicts in page order
       max_depth: Maximum section depth to detect
       chapter_boundaries: Optional list of chapter boundaries for validation
       verbose: Print progress
@@ -152,55 +173,44 @@ def scan_pagerecords_for_sections(
    if verbose:
       print(f"  Scanning for sections (max depth: {max_depth})...")
 
-   with open(pagerecords_file, 'r', encoding='utf-8') as f:
-      for line_num, line in enumerate(f, 1):
-         if not line.strip():
-               continue
+   for page_data in pages:
+      page_num = page_data.get('pdf_page_number')
+      text = page_data.get('text', '')
 
-         try:
-               page_data = json.loads(line)
-         except json.JSONDecodeError:
-               if verbose:
-                  print(f"    Warning: Skipping malformed JSON at line {line_num}")
-               continue
+      if not page_num or not text:
+            continue
 
-         page_num = page_data.get('pdf_page_number')
-         text = page_data.get('text', '')
+      # Track the last page in the file for final section's page_end
+      last_page_num = max(last_page_num, page_num)
 
-         if not page_num or not text:
-               continue
+      # Detect section
+      result = detect_section_at_page_start(text, max_depth=max_depth)
 
-         # Track the last page in the file for final section's page_end
-         last_page_num = max(last_page_num, page_num)
+      if result:
+            section_num, title, depth = result
 
-         # Detect section
-         result = detect_section_at_page_start(text, max_depth=max_depth)
-
-         if result:
-               section_num, title, depth = result
-
-               # Skip duplicates entirely — only keep first occurrence
-               if section_num in seen_sections:
-                  continue
+            # Skip duplicates entirely — only keep first occurrence
+            if section_num in seen_sections:
+               continue
 
-               # Extract chapter number
-               chapter_num = int(section_num.split('.')[0])
+            # Extract chapter number
+            chapter_num = int(section_num.split('.')[0])
 
-               # Create section boundary (page_end computed after collection)
-               section = SectionBoundary(
-                  section_number=section_num,
-                  page_start=page_num,
-                  section_title=title,
-                  chapter_number=chapter_num,
-                  depth=depth
-               )
+            # Create section boundary (page_end computed after collection)
+            section = SectionBoundary(
+               section_number=section_num,
+               page_start=page_num,
+               section_title=title,
+               chapter_number=chapter_num,
+               depth=depth
+            )
 
-               sections.append(section)
-               seen_sections.add(section_num)
+            sections.append(section)
+            seen_sections.add(section_num)
 
-               if verbose:
-                  title_display = f": {title}" if title else ""
-                  print(f"    ✓ Section {section_num}{title_display} @ page {page_num}")
+            if verbose:
+               title_display = f": {title}" if title else ""
+               print(f"    ✓ Section {section_num}{title_display} @ page {page_num}")
 
    # Sort by page_start
    sections.sort(key=lambda s: s.page_start)
@@ -21,6 +21,8 @@ from pathlib import Path
 from typing import List, Dict, Optional
 from dataclasses import dataclass, field, asdict
 
+from legacy.pagerecords_reader import iter_pagerecords, page_text_map
+
 
 @dataclass
 class Section:
@@ -79,24 +81,7 @@ def load_page_text_map(pagerecords_file: Path) -> Dict[int, str]:
    Returns:
       Dictionary mapping page numbers to their text content
    """
-   page_map = {}
-   
-   with open(pagerecords_file, 'r', encoding='utf-8') as f:
-      for line in f:
-         if not line.strip():
-               continue
-         
-         try:
-               page_data = json.loads(line)
-               page_num = page_data.get('pdf_page_number')
-               text = page_data.get('text', '')
-               
-               if page_num:
-                  page_map[page_num] = text
-         except json.JSONDecodeError:
-               continue
-   
-   return page_map
+   return page_text_map(iter_pagerecords(pagerecords_file))
 
 
 def extract_section_text(
@@ -132,6 +117,7 @@ def build_sections_with_text(
    *,
    book_name: str = None,
    chapters_file: Path = None,
+   page_map: Dict[int, str] = None,
    verbose: bool = True
 ) -> List[Section]:
    """
@@ -142,6 +128,7 @@ def build_sections_with_text(
       pagerecords_file: Path to _PageRecords file
       book_name: Optional book name for metadata
       chapters_file: Optional chapters file for chapter titles
+      page_map: Pre-built page_number -> text map; skips re-reading pagerecords_file
       verbose: Print progress
    
    Returns:
@@ -176,10 +163,11 @@ def build_sections_with_text(
                   chapter_titles[ch_data['chapter_number']] = ch_data.get('chapter_title')
    
    # Load page text map
-   if verbose:
-      print(f"  Loading page text from {pagerecords_file.name}...")
-   
-   page_map = load_page_text_map(pagerecords_file)
+   if page_map is None:
+      if verbose:
+         print(f"  Loading page text from {pagerecords_file.name}...")
+      
+      page_map = load_page_text_map(pagerecords_file)
    
    if verbose:
       print(f"  Loaded {len(page_map)} pages")
@@ -12,14 +12,28 @@ Usage:
    Integrated into run_pipeline.py — run that instead.
 """
 
+import os
 import re
 import json
+import functools
+import numbers
 import pickle
 import numpy as np
+from scipy import sparse
+from collections import Counter
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import (
+   CountVectorizer, HashingVectorizer, TfidfTransformer, TfidfVectorizer,
+)
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+# Optional: MessagePack for the documents/metadatas store (falls back to JSON)
+try:
+   import msgpack
+except ImportError:
+   msgpack = None
 
 # Sentence boundary pattern — handles abbreviations, decimals, etc.
 _SENTENCE_RE = re.compile(
@@ -34,6 +48,91 @@ _HEADING_LIKE_RE = re.compile(
 )
 
 
+# Per-book raw term counts cached beside each sections file (see load_textbooks)
+_COUNTS_SUFFIX = '.tfidf_counts.npz'
+_COUNTS_VOCAB_SUFFIX = '.tfidf_vocab.json'
+
+
+def _split_sentences(text: str) -> List[str]:
+   """Split text into sentences, filtering out very short fragments."""
+   raw = _SENTENCE_RE.split(text)
+   # Also split on newlines that look like sentence boundaries
+   sentences = []
+   for chunk in raw:
+      for line in chunk.split('\n'):
+         line = line.strip()
+         if len(line) > 30:  # Skip tiny fragments
+            sentences.append(line)
+   return sentences
+
+
+@functools.lru_cache(maxsize=4096)
+def _split_sentences_cached(text: str) -> Tuple[str, ...]:
+   """Memoised ``_split_sentences``; the same chunks recur across queries."""
+   return tuple(_split_sentences(text))
+
+
+# =========================================================================
+# On-disk stores (MessagePack preferred, JSON fallback)
+# =========================================================================
+
+def _write_store(db_path: Path, stem: str, obj: Dict) -> None:
+   """Write ``obj`` to <stem>.msgpack, or <stem>.json when msgpack is missing."""
+   if msgpack is not None:
+      (db_path / f'{stem}.msgpack').write_bytes(msgpack.packb(obj, use_bin_type=True))
+      # Drop any legacy JSON copy so the two stores cannot diverge
+      legacy_file = db_path / f'{stem}.json'
+      if legacy_file.exists():
+         legacy_file.unlink()
+   else:
+      with open(db_path / f'{stem}.json', 'w', encoding='utf-8') as f:
+         json.dump(obj, f)
+
+
+def _read_store(db_path: Path, stem: str) -> Optional[Dict]:
+   """Read a store written by ``_write_store``; None if neither file exists."""
+   msgpack_file = db_path / f'{stem}.msgpack'
+   if msgpack is not None and msgpack_file.exists():
+      return msgpack.unpackb(msgpack_file.read_bytes(), raw=False)
+   json_file = db_path / f'{stem}.json'
+   if json_file.exists():
+      with open(json_file, 'r', encoding='utf-8') as f:
+         return json.load(f)
+   return None
+
+
+_CSR_PARTS = ('data', 'indices', 'indptr')
+
+
+def _save_csr(db_path: Path, stem: str, matrix) -> None:
+   """Save a CSR matrix as raw .npy arrays so it can be memory-mapped on load."""
+   matrix = sparse.csr_matrix(matrix)
+   shape_file = db_path / f'{stem}_shape.json'
+   if shape_file.exists():
+      shape_file.unlink()
+   for part in _CSR_PARTS:
+      # Replace rather than truncate: other readers may still map the old file
+      target = db_path / f'{stem}_{part}.npy'
+      tmp = target.with_suffix('.npy.tmp')
+      with open(tmp, 'wb') as f:
+         np.save(f, getattr(matrix, part))
+      os.replace(tmp, target)
+   # Written last: its presence marks a complete set of arrays
+   shape_file.write_text(json.dumps(list(matrix.shape)))
+
+
+def _load_csr(db_path: Path, stem: str):
+   """Memory-map a CSR matrix saved by ``_save_csr``; None if absent."""
+   shape_file = db_path / f'{stem}_shape.json'
+   if not shape_file.exists():
+      return None
+   shape = tuple(json.loads(shape_file.read_text()))
+   arrays = tuple(
+      np.load(db_path / f'{stem}_{part}.npy', mmap_mode='r') for part in _CSR_PARTS
+   )
+   return sparse.csr_matrix(arrays, shape=shape, copy=False)
+
+
 # =========================================================================
 # Stable PageRank (module-level, testable)
 # =========================================================================
@@ -121,6 +220,66 @@ def _tokenize_symbols(text: str):
    return set(_CODE_SYMBOL_RE.findall(text))
 
 
+def _fit_query_and_texts(vectorizer, query: str, texts: List[str]):
+   """
+   Fit ``vectorizer`` on ``[query] + texts`` in a single tokenization pass.
+
+   Returns (query_vec, text_vectors). The query counts as one more document,
+   so the IDF (and, under ``max_features``, the vocabulary) differs from a
+   fit on ``texts`` alone: cosine scores shift and the ranking is only
+   approximately the same. Columns for terms that only occur in the query
+   are dropped; they cannot add to any score. Callers rank by these scores
+   and must not compare them against absolute thresholds.
+   Raises ValueError when ``texts`` yield an empty vocabulary.
+   """
+   matrix = vectorizer.fit_transform([query] + list(texts)).tocsc()
+   text_vectors = matrix[1:]
+   shared = np.flatnonzero(text_vectors.getnnz(axis=0))
+   if shared.size == 0:
+      raise ValueError("empty vocabulary; texts contain only stop words")
+   if shared.size < matrix.shape[1]:
+      matrix = matrix[:, shared]
+   matrix = matrix.tocsr()
+   return matrix[0], matrix[1:]
+
+
+# Stateless term hasher for QuestionBank matching: no vocabulary to build or
+# store, so only IDF has to be fitted over the question texts.
+_QA_HASHER = HashingVectorizer(
+   stop_words='english',
+   ngram_range=(1, 2),
+   n_features=2 ** 16,
+   alternate_sign=False,
+   norm=None,
+   dtype=np.float32,
+)
+
+
+def _sparse_top1(query_vec, row_vectors) -> Optional[Tuple[int, float]]:
+   """
+   Best-matching row for an L2-normalised sparse query, as (index, cosine).
+
+   Works on the sparse product only, so no dense similarity row is built.
+   Ties resolve to the lowest index (like ``np.argmax``). Returns None when
+   the query shares no terms with any row.
+   """
+   sims = (query_vec @ row_vectors.T).tocsr()
+   if sims.nnz == 0:
+      return None
+   best_sim = sims.data.max()
+   best_idx = int(sims.indices[sims.data == best_sim].min())
+   return best_idx, float(best_sim)
+
+
+def _bank_signature(bank_files: List[Path]) -> List[List]:
+   """(path, mtime_ns, size) per QuestionBank file, to detect a stale QA index."""
+   sig = []
+   for bf in bank_files:
+      st = bf.stat()
+      sig.append([str(bf), st.st_mtime_ns, st.st_size])
+   return sig
+
+
 # Definition-bias question prefixes
 _DEFINITION_PREFIXES = re.compile(
    r'^(?:what\s+is|what\s+are|define|explain|describe)\b', re.IGNORECASE
@@ -579,7 +738,8 @@ class TextbookSearchOffline:
          stop_words='english',
          ngram_range=(1, 2),  # Use single words and pairs
          min_df=2,  # Ignore words that appear in fewer than 2 docs
-         max_df=0.8  # Ignore words that appear in >80% of docs
+         max_df=0.8,  # Ignore words that appear in >80% of docs
+         dtype=np.float32  # Halves the stored CSR matrix
       )
       
       # Storage
@@ -587,12 +747,39 @@ class TextbookSearchOffline:
       self.metadatas = []
       self.vectors = None
       
+      # QuestionBank matching index (see index_questionbanks)
+      self.qa_signature = None
+      self.qa_pairs = []
+      self.qa_sources = np.array([], dtype=object)
+      self.qa_idf = None
+      self.q_vectors = None
+      # Questions per hashed column of q_vectors (its document frequency)
+      self.qa_df = None
+      # QuestionBank dirs already compared with the loaded QA index; later
+      # queries against them touch no files (see _check_qa_index)
+      self._qa_checked_dirs = set()
+      
       # Try to load existing index
       self._load_index()
+      self._load_qa_index()
       
       print(f"✓ Initialized offline search at {db_path}")
       print(f"  Current index size: {len(self.documents)} chunks")
    
+   @property
+   def metadatas(self) -> List[Dict]:
+      """Per-chunk metadata, parallel to self.documents."""
+      return self._metadatas
+   
+   @metadatas.setter
+   def metadatas(self, value: List[Dict]):
+      self._metadatas = value
+      self._invalidate_filter_columns()
+   
+   def _invalidate_filter_columns(self):
+      """Drop the search() filter columns; call after editing metadatas in place."""
+      self._filter_columns_cache = None
+   
    def load_textbook(self, sections_file: Path, book_name: str = None):
       """
       Load a textbook's sections into the index.
@@ -601,15 +788,64 @@ class TextbookSearchOffline:
          sections_file: Path to SectionsWithText_Chunked.jsonl
          book_name: Optional override for book name
       """
-      if not sections_file.exists():
-         print(f"✗ File not found: {sections_file}")
+      self.load_textbooks([(sections_file, book_name)])
+   
+   def load_textbooks(self, books: List[Tuple[Path, Optional[str]]], cache_counts: bool = False):
+      """
+      Load several textbooks, then vectorize and save the index once.
+      
+      Every load refits TF-IDF over the whole corpus, so loading B books
+      one at a time refits B times; batch loads (run_pipeline, ingest)
+      should come through here.
+      
+      Args:
+         books: (sections_file, book_name) pairs; book_name may be None
+         cache_counts: Cache each book's raw term counts beside its sections
+                       file and fit from those, so a rebuild only tokenizes
+                       new or changed books. Used when the index starts empty.
+      """
+      from_counts = cache_counts and not self.documents
+      count_blocks = []
+      loaded = 0
+      for sections_file, book_name in books:
+         if not sections_file.exists():
+            print(f"✗ File not found: {sections_file}")
+            continue
+         
+         # Auto-detect book name if not provided
+         if book_name is None:
+            book_name = sections_file.stem.replace('_SectionsWithText_Chunked', '')
+            book_name = book_name.replace('_SectionsWithText', '')
+         
+         new_docs, new_metas = self._read_sections(sections_file, book_name)
+         
+         # Add to existing data
+         self.documents.extend(new_docs)
+         self.metadatas.extend(new_metas)
+         self._invalidate_filter_columns()
+         if from_counts:
+            count_blocks.append(self._book_counts(sections_file, new_docs))
+         loaded += 1
+         
+         print(f"✓ Loaded {len(new_docs)} chunks from {book_name}")
+      
+      if not loaded:
          return
       
-      # Auto-detect book name if not provided
-      if book_name is None:
-         book_name = sections_file.stem.replace('_SectionsWithText_Chunked', '')
-         book_name = book_name.replace('_SectionsWithText', '')
+      # Re-vectorize all documents (includes new ones)
+      print(f"  Vectorizing {len(self.documents)} total chunks...")
+      if from_counts:
+         self.vectors = self._fit_from_counts(count_blocks)
+      else:
+         self.vectors = self.vectorizer.fit_transform(self.documents)
+      
+      # Save index
+      self._save_index()
       
+      print(f"  Total in index: {len(self.documents)} chunks")
+   
+   def _read_sections(self, sections_file: Path, book_name: str) -> Tuple[List[str], List[Dict]]:
+      """Texts and search metadata for each chunk of one sections JSONL file."""
       print(f"\nLoading {book_name}...")
       
       new_docs = []
@@ -643,19 +879,104 @@ class TextbookSearchOffline:
                if (i + 1) % 50 == 0:
                   print(f"  Loaded {i + 1} chunks...")
       
-      # Add to existing data
-      self.documents.extend(new_docs)
-      self.metadatas.extend(new_metas)
+      return new_docs, new_metas
+   
+   def _count_params(self) -> Dict:
+      """Tokenization settings shared by the TF-IDF vectorizer and cached counts."""
+      v = self.vectorizer
+      stop_words = v.stop_words if v.stop_words is None or isinstance(v.stop_words, str) \
+         else sorted(v.stop_words)
+      return {
+         'lowercase': v.lowercase,
+         'stop_words': stop_words,
+         'token_pattern': v.token_pattern,
+         'ngram_range': list(v.ngram_range),
+      }
+   
+   def _book_counts(self, sections_file: Path, docs: List[str]) -> Tuple[sparse.csr_matrix, List[str]]:
+      """
+      Raw term counts for one book's chunks, with the book's own sorted vocabulary.
       
-      # Re-vectorize all documents (includes new ones)
-      print(f"  Vectorizing {len(self.documents)} total chunks...")
-      self.vectors = self.vectorizer.fit_transform(self.documents)
+      Cached as <stem>.tfidf_counts.npz / <stem>.tfidf_vocab.json beside the
+      sections file, keyed on its mtime, size and the tokenization settings.
+      """
+      counts_file = sections_file.with_name(sections_file.stem + _COUNTS_SUFFIX)
+      vocab_file = sections_file.with_name(sections_file.stem + _COUNTS_VOCAB_SUFFIX)
+      st = sections_file.stat()
+      params = self._count_params()
+      key = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'params': params}
       
-      # Save index
-      self._save_index()
+      if counts_file.exists() and vocab_file.exists():
+         try:
+            with open(vocab_file, 'r', encoding='utf-8') as f:
+               cached = json.load(f)
+            if cached.get('key') == key:
+               counts = sparse.load_npz(counts_file).tocsr()
+               if counts.shape == (len(docs), len(cached['vocab'])):
+                  return counts, cached['vocab']
+         except (OSError, ValueError, KeyError):
+            pass
       
-      print(f"✓ Loaded {len(new_docs)} chunks from {book_name}")
-      print(f"  Total in index: {len(self.documents)} chunks")
+      counter = CountVectorizer(dtype=np.int32, **{**params, 'ngram_range': tuple(params['ngram_range'])})
+      try:
+         counts = counter.fit_transform(docs).tocsr()
+         vocab = counter.get_feature_names_out().tolist()
+      except ValueError:  # Nothing but stop words / empty chunks
+         counts = sparse.csr_matrix((len(docs), 0), dtype=np.int32)
+         vocab = []
+      
+      sparse.save_npz(counts_file, counts)
+      with open(vocab_file, 'w', encoding='utf-8') as f:
+         json.dump({'key': key, 'vocab': vocab}, f, ensure_ascii=False)
+      return counts, vocab
+   
+   def _fit_from_counts(self, blocks: List[Tuple[sparse.csr_matrix, List[str]]]) -> sparse.csr_matrix:
+      """
+      Fit the TF-IDF vectorizer from per-book raw counts and return the vectors.
+      
+      Same vocabulary, idf and vectors as fit_transform over every document,
+      without re-tokenizing: the books' vocabularies are merged into one
+      sorted vocabulary, their columns remapped and the rows stacked, then
+      min_df / max_df / max_features are applied as TfidfVectorizer does.
+      """
+      v = self.vectorizer
+      terms = sorted(set().union(*(vocab for _, vocab in blocks)))
+      column = {t: j for j, t in enumerate(terms)}
+      
+      rows = []
+      for counts, vocab in blocks:
+         remap = np.array([column[t] for t in vocab], dtype=np.int64)
+         coo = counts.tocoo()
+         rows.append(sparse.csr_matrix(
+            (coo.data, (coo.row, remap[coo.col])), shape=(coo.shape[0], len(terms)),
+         ))
+      X = sparse.vstack(rows, format='csr').astype(v.dtype)
+      X.sort_indices()
+      
+      n_docs = X.shape[0]
+      high = v.max_df if isinstance(v.max_df, numbers.Integral) else v.max_df * n_docs
+      low = v.min_df if isinstance(v.min_df, numbers.Integral) else v.min_df * n_docs
+      if high < low:
+         raise ValueError("max_df corresponds to < documents than min_df")
+      dfs = np.bincount(X.indices, minlength=X.shape[1])
+      mask = (dfs <= high) & (dfs >= low)
+      if v.max_features is not None and mask.sum() > v.max_features:
+         tfs = np.asarray(X.sum(axis=0)).ravel()
+         mask_inds = (-tfs[mask]).argsort()[:v.max_features]
+         new_mask = np.zeros(len(dfs), dtype=bool)
+         new_mask[np.where(mask)[0][mask_inds]] = True
+         mask = new_mask
+      keep = np.flatnonzero(mask)
+      if len(keep) == 0:
+         raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+      
+      transformer = TfidfTransformer(
+         norm=v.norm, use_idf=v.use_idf, smooth_idf=v.smooth_idf, sublinear_tf=v.sublinear_tf,
+      )
+      vectors = transformer.fit_transform(X[:, keep])
+      v.vocabulary_ = {terms[j]: i for i, j in enumerate(keep.tolist())}
+      v.idf_ = transformer.idf_
+      return vectors
    
    def search(
       self,
@@ -687,28 +1008,23 @@ class TextbookSearchOffline:
       # Calculate similarity
       similarities = cosine_similarity(query_vector, self.vectors)[0]
       
-      # Apply filters
-      valid_indices = []
-      for i, meta in enumerate(self.metadatas):
-         if book_filter and meta['book'] != book_filter:
-               continue
-         if book_ids is not None and len(book_ids) > 0:
-            bid = meta.get('book_id')
-            if bid not in book_ids:
-               continue
-         if chapter_filter and meta['chapter'] != str(chapter_filter):
-               continue
-         valid_indices.append(i)
+      # Apply filters as one boolean mask over the metadata columns
+      columns = self._filter_columns()
+      valid = np.ones(len(self.metadatas), dtype=bool)
+      if book_filter:
+         valid &= columns['book'] == columns['book_codes'].get(book_filter, -2)
+      if book_ids is not None and len(book_ids) > 0:
+         codes = [columns['book_id_codes'][b] for b in book_ids if b in columns['book_id_codes']]
+         valid &= np.isin(columns['book_id'], codes)
+      if chapter_filter:
+         valid &= columns['chapter'] == columns['chapter_codes'].get(str(chapter_filter), -2)
       
-      # Get top results from valid indices
-      if valid_indices:
-         valid_sims = [(i, similarities[i]) for i in valid_indices]
-      else:
-         valid_sims = [(i, similarities[i]) for i in range(len(similarities))]
+      # Get top results from valid indices (all of them if nothing matched)
+      candidates = np.flatnonzero(valid) if valid.any() else np.arange(len(similarities))
       
-      # Sort by similarity
-      valid_sims.sort(key=lambda x: x[1], reverse=True)
-      top_indices = [i for i, _ in valid_sims[:n_results]]
+      # Sort by similarity; stable, so ties keep index order
+      order = np.argsort(-similarities[candidates], kind='stable')
+      top_indices = candidates[order[:n_results]].tolist()
       
       # Format results
       results = []
@@ -721,6 +1037,28 @@ class TextbookSearchOffline:
       
       return results
    
+   def _filter_columns(self) -> Dict:
+      """
+      Integer-coded book, book_id and chapter columns of self.metadatas for
+      search() filters. Cached until metadatas is reassigned, extended by
+      load_textbooks or saved (see _invalidate_filter_columns).
+      """
+      if self._filter_columns_cache is not None:
+         return self._filter_columns_cache
+      
+      columns = {}
+      for field in ('book', 'book_id', 'chapter'):
+         codes: Dict = {}
+         # -1 marks a chunk without the field; absent filter values map to -2
+         columns[field] = np.fromiter(
+            (-1 if m.get(field) is None else codes.setdefault(m[field], len(codes))
+             for m in self.metadatas),
+            dtype=np.int64, count=len(self.metadatas),
+         )
+         columns[f'{field}_codes'] = codes
+      self._filter_columns_cache = columns
+      return columns
+   
    def ask(
       self,
       question: str,
@@ -971,15 +1309,7 @@ class TextbookSearchOffline:
 
    def _split_sentences(self, text: str) -> List[str]:
       """Split text into sentences, filtering out very short fragments."""
-      raw = _SENTENCE_RE.split(text)
-      # Also split on newlines that look like sentence boundaries
-      sentences = []
-      for chunk in raw:
-         for line in chunk.split('\n'):
-            line = line.strip()
-            if len(line) > 30:  # Skip tiny fragments
-               sentences.append(line)
-      return sentences
+      return list(_split_sentences_cached(text))
 
    def _textrank(self, sim_matrix: np.ndarray, damping: float = 0.85, max_iter: int = 50) -> np.ndarray:
       """
@@ -1022,15 +1352,12 @@ class TextbookSearchOffline:
       """
       sentences = []
       metas = []
-      source_orders = []  # Track original position for readability reordering
-
-      order = 0
       for result in results:
-         for sent in self._split_sentences(result['text']):
-            sentences.append(sent)
-            metas.append(result['metadata'])
-            source_orders.append(order)
-            order += 1
+         sents = _split_sentences_cached(result['text'])
+         sentences.extend(sents)
+         metas.extend([result['metadata']] * len(sents))
+      # Track original position for readability reordering
+      source_orders = list(range(len(sentences)))
 
       if not sentences:
          return []
@@ -1039,33 +1366,35 @@ class TextbookSearchOffline:
       sent_vectorizer = TfidfVectorizer(
          stop_words='english',
          ngram_range=(1, 2),
-         max_features=5000
+         max_features=5000,
+         dtype=np.float32
       )
 
       try:
-         sent_vectors = sent_vectorizer.fit_transform(sentences)
+         query_vec, sent_vectors = _fit_query_and_texts(sent_vectorizer, query, sentences)
       except ValueError:
          return []
 
       # --- Query relevance scores ---
-      query_vec = sent_vectorizer.transform([query])
       query_sims = cosine_similarity(query_vec, sent_vectors)[0]
 
       # --- TextRank importance scores ---
-      # Build sentence-to-sentence similarity graph
-      sent_sim_matrix = cosine_similarity(sent_vectors, sent_vectors)
+      # Build sentence-to-sentence similarity graph. Rows are already
+      # L2-normalised (only query-only columns were pruned), so the sparse
+      # Gram matrix is the cosine matrix without renormalising.
+      sent_sim_matrix = (sent_vectors @ sent_vectors.T).toarray()
       # Zero out self-similarity (no self-loops)
       np.fill_diagonal(sent_sim_matrix, 0)
       textrank_scores = self._textrank(sent_sim_matrix)
 
       # --- Combined score: weighted blend ---
       # 0.6 query relevance + 0.4 TextRank importance
-      combined = 0.6 * query_sims + 0.4 * textrank_scores
+      # One output array; TextRank scores are a fresh array we can scale in place
+      combined = np.multiply(query_sims, 0.6, dtype=np.float64)
+      textrank_scores *= 0.4
+      combined += textrank_scores
 
-      scored = [
-         (float(combined[i]), sentences[i], metas[i], source_orders[i])
-         for i in range(len(sentences))
-      ]
+      scored = list(zip(combined.tolist(), sentences, metas, source_orders))
       scored.sort(key=lambda x: x[0], reverse=True)
 
       # Deduplicate near-identical sentences
@@ -1079,31 +1408,29 @@ class TextbookSearchOffline:
 
       return unique
 
-   def _match_questionbank(
+   def index_questionbanks(
       self,
-      query: str,
       qa_dir: Path,
-      book_filter: Optional[str] = None,
-      threshold: float = 0.3
-   ) -> Optional[Tuple[float, str, str, str]]:
+      bank_files: Optional[List[Path]] = None,
+      save: bool = True,
+   ):
       """
-      Try to match the query against QuestionBank Q&A pairs.
+      Build and persist the QuestionBank matching index.
 
-      Returns (similarity, question_text, answer_text, source_book) or None.
-      """
-      # Collect all QuestionBank files
-      bank_files = sorted(qa_dir.glob("**/*_QuestionBank.json"))
+      Hashes every question under ``qa_dir`` once and fits IDF over them, so
+      ``_match_questionbank`` only has to transform the query.
 
-      if not bank_files:
-         return None
-
-      all_questions = []   # (question_text, answer_text, source)
-      q_texts = []
+      Args:
+         qa_dir: Directory containing converted books (to find QuestionBanks)
+         bank_files: Optional pre-globbed ``*_QuestionBank.json`` files
+         save: Write the index to disk (False keeps it in memory only)
+      """
+      if bank_files is None:
+         bank_files = sorted(qa_dir.glob("**/*_QuestionBank.json"))
 
+      pairs = []   # [question_text, answer_text, source]
       for bf in bank_files:
          source = bf.parent.name
-         if book_filter and source != book_filter:
-            continue
 
          try:
             with open(bf, 'r', encoding='utf-8') as f:
@@ -1125,50 +1452,127 @@ class TextbookSearchOffline:
             a_text = answer_map.get(qid, '')
 
             if q_text and a_text:
-               all_questions.append((q_text, a_text, source))
-               q_texts.append(q_text)
+               pairs.append([q_text, a_text, source])
+
+      self.qa_signature = _bank_signature(bank_files)
+      self._set_qa_pairs(pairs)
+
+      # Hash questions (no vocabulary to build), then reweight with IDF
+      self.qa_idf = None
+      self.q_vectors = None
+      self.qa_df = None
+      if pairs:
+         q_counts = _QA_HASHER.transform([p[0] for p in pairs])
+         if q_counts.nnz > 0:
+            self.qa_idf = TfidfTransformer().fit(q_counts)
+            self.q_vectors = self.qa_idf.transform(q_counts)
+            self.qa_df = self.q_vectors.getnnz(axis=0)
+
+      self._qa_checked_dirs.add(str(qa_dir))
+      if save:
+         self._save_qa_index()
+
+   def _check_qa_index(self, qa_dir: Path):
+      """
+      Compare the loaded QA index with the QuestionBanks under ``qa_dir``,
+      once per directory per instance, and rebuild it in memory if stale.
+      Only index_questionbanks (run by the pipeline) writes it to disk.
+      """
+      key = str(qa_dir)
+      if key in self._qa_checked_dirs:
+         return
+      bank_files = sorted(qa_dir.glob("**/*_QuestionBank.json"))
+      if self.qa_signature != _bank_signature(bank_files):
+         self.index_questionbanks(qa_dir, bank_files=bank_files, save=False)
+      self._qa_checked_dirs.add(key)
 
-      if not q_texts:
-         return None
+   def _set_qa_pairs(self, pairs: List[List[str]]):
+      """Store [question, answer, source] rows plus a source array for filtering."""
+      self.qa_pairs = pairs
+      self.qa_sources = np.array([p[2] for p in pairs], dtype=object)
 
-      # Vectorize questions + query together
-      qa_vectorizer = TfidfVectorizer(
-         stop_words='english',
-         ngram_range=(1, 2),
-         max_features=5000
-      )
+   def _match_questionbank(
+      self,
+      query: str,
+      qa_dir: Path,
+      book_filter: Optional[str] = None,
+      threshold: float = 0.3
+   ) -> Optional[Tuple[float, str, str, str]]:
+      """
+      Try to match the query against QuestionBank Q&A pairs.
 
-      try:
-         q_vectors = qa_vectorizer.fit_transform(q_texts)
-      except ValueError:
-         return None
+      Uses the index from ``index_questionbanks``. Read-only: the index is
+      checked against the files under ``qa_dir`` on first use only (see
+      _check_qa_index), never rewritten on disk here.
 
-      query_vec = qa_vectorizer.transform([query])
-      sims = cosine_similarity(query_vec, q_vectors)[0]
+      Similarities match the per-query TF-IDF refit this index replaced:
+      IDF comes from the questions being matched (the filtered book's
+      alone when book_filter is set) and query terms no question uses are
+      dropped, as a fitted vocabulary drops them. That keeps ``threshold``
+      on the scale it was tuned for. Two differences remain: the refit's
+      5000-term vocabulary cap is not reproduced, and a query term that
+      shares a hash bucket with a question term is kept instead of dropped.
 
-      best_idx = int(np.argmax(sims))
-      best_sim = float(sims[best_idx])
+      Returns (similarity, question_text, answer_text, source_book) or None.
+      """
+      self._check_qa_index(qa_dir)
+
+      if self.q_vectors is None:
+         return None
+
+      q_vectors = self.q_vectors
+      idf = self.qa_idf.idf_
+      df = self.qa_df
+      rows = None
+      if book_filter:
+         rows = np.flatnonzero(self.qa_sources == book_filter)
+         if rows.size == 0:
+            return None
+         # Swap the all-banks IDF for one fit on this book's questions;
+         # rows are L2-normalised, so rescaling columns and renormalising
+         # is the same as reweighting the raw counts
+         q_vectors = q_vectors[rows]
+         df = q_vectors.getnnz(axis=0)
+         book_idf = np.log((1 + rows.size) / (1 + df)) + 1
+         q_vectors = normalize(q_vectors @ sparse.diags(book_idf / idf))
+         idf = book_idf
+
+      query_counts = _QA_HASHER.transform([query])
+      # Terms no question uses cannot match; their IDF, the largest there
+      # is, would only shrink every cosine
+      query_counts.data[df[query_counts.indices] == 0] = 0
+      query_counts.eliminate_zeros()
+      query_vec = normalize(query_counts.multiply(idf).tocsr())
+
+      best = _sparse_top1(query_vec, q_vectors)
+      if best is None:
+         return None
+      best_idx, best_sim = best
 
       if best_sim < threshold:
          return None
 
-      q_text, a_text, source = all_questions[best_idx]
+      if rows is not None:
+         best_idx = int(rows[best_idx])
+      q_text, a_text, source = self.qa_pairs[best_idx]
       return (best_sim, q_text, a_text, source)
 
    def list_books(self):
       """List all books in the index."""
-      books = set(m['book'] for m in self.metadatas)
+      # Count chunks per book in a single pass
+      counts = Counter(m['book'] for m in self.metadatas)
       
-      print(f"\nBooks in index ({len(books)}):")
-      for book in sorted(books):
-         # Count chunks per book
-         book_chunks = sum(1 for m in self.metadatas if m['book'] == book)
+      print(f"\nBooks in index ({len(counts)}):")
+      for book, book_chunks in sorted(counts.items()):
          print(f"  - {book}: {book_chunks} chunks")
    
    def stats(self):
       """Show index statistics."""
-      books = set(m['book'] for m in self.metadatas)
-      total_words = sum(m.get('word_count', 0) for m in self.metadatas)
+      books = set()
+      total_words = 0
+      for m in self.metadatas:
+         books.add(m['book'])
+         total_words += m.get('word_count', 0)
 
       print(f"\nIndex Statistics:")
       print(f"  Books: {len(books)}")
@@ -1188,52 +1592,93 @@ class TextbookSearchOffline:
    
    def _save_index(self):
       """Save index to disk."""
+      # Whatever edited metadatas before this save, filters see it afterwards
+      self._invalidate_filter_columns()
+      
       # Save documents and metadata
       data = {
          'documents': self.documents,
          'metadatas': self.metadatas
       }
-      with open(self.db_path / 'data.json', 'w', encoding='utf-8') as f:
-         json.dump(data, f)
+      _write_store(self.db_path, 'data', data)
       
       # Save vectorizer and vectors
       with open(self.db_path / 'vectorizer.pkl', 'wb') as f:
          pickle.dump(self.vectorizer, f)
       
       if self.vectors is not None:
-         with open(self.db_path / 'vectors.pkl', 'wb') as f:
-               pickle.dump(self.vectors, f)
+         _save_csr(self.db_path, 'vectors', self.vectors)
+         # Superseded by the memory-mappable arrays above
+         legacy_vectors = self.db_path / 'vectors.pkl'
+         if legacy_vectors.exists():
+            legacy_vectors.unlink()
       
       print(f"  💾 Saved index to {self.db_path}")
    
    def _load_index(self):
       """Load index from disk if it exists."""
-      data_file = self.db_path / 'data.json'
       vectorizer_file = self.db_path / 'vectorizer.pkl'
       vectors_file = self.db_path / 'vectors.pkl'
       
-      if not data_file.exists():
+      # Load documents and metadata (MessagePack preferred, JSON for older indexes)
+      data = _read_store(self.db_path, 'data')
+      if data is None:
          return
       
       print(f"  Loading existing index from {self.db_path}...")
       
-      # Load documents and metadata
-      with open(data_file, 'r', encoding='utf-8') as f:
-         data = json.load(f)
-         self.documents = data['documents']
-         self.metadatas = data['metadatas']
+      self.documents = data['documents']
+      self.metadatas = data['metadatas']
       
       # Load vectorizer
       if vectorizer_file.exists():
          with open(vectorizer_file, 'rb') as f:
                self.vectorizer = pickle.load(f)
       
-      # Load vectors
-      if vectors_file.exists():
+      # Load vectors (memory-mapped; pickled CSR for older indexes)
+      self.vectors = _load_csr(self.db_path, 'vectors')
+      if self.vectors is None and vectors_file.exists():
          with open(vectors_file, 'rb') as f:
                self.vectors = pickle.load(f)
 
 
+   def _save_qa_index(self):
+      """Save the QuestionBank matching index to disk."""
+      _write_store(self.db_path, 'qa_meta', {
+         'signature': self.qa_signature,
+         'pairs': self.qa_pairs,
+      })
+
+      idf_file = self.db_path / 'qa_idf.pkl'
+      vectors_file = self.db_path / 'q_vectors.npz'
+      if self.q_vectors is None:
+         for p in (idf_file, vectors_file):
+            if p.exists():
+               p.unlink()
+         return
+
+      with open(idf_file, 'wb') as f:
+         pickle.dump(self.qa_idf, f)
+      sparse.save_npz(vectors_file, self.q_vectors)
+
+   def _load_qa_index(self):
+      """Load the QuestionBank matching index from disk if it exists."""
+      meta = _read_store(self.db_path, 'qa_meta')
+      if meta is None:
+         return
+
+      self.qa_signature = meta['signature']
+      self._set_qa_pairs(meta['pairs'])
+
+      idf_file = self.db_path / 'qa_idf.pkl'
+      vectors_file = self.db_path / 'q_vectors.npz'
+      if idf_file.exists() and vectors_file.exists():
+         with open(idf_file, 'rb') as f:
+            self.qa_idf = pickle.load(f)
+         self.q_vectors = sparse.load_npz(vectors_file)
+         self.qa_df = self.q_vectors.getnnz(axis=0)
+
+
 if __name__ == "__main__":
    print("Use run_pipeline.py to process PDFs and search textbooks.")
    print("  python run_pipeline.py")
\ No newline at end of file
@@ -29,19 +29,40 @@ The result is embedding-ready sections that preserve document structure while
 enabling semantic search with accurate citations.
 """
 
+import os
+import re
 import uuid
+import functools
 import fitz
 import json
 import time
+import traceback
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 from pathlib import Path
 from dataclasses import asdict, dataclass, field, is_dataclass
 from typing import List, Optional, TYPE_CHECKING, Union, Tuple, Set, Dict
 from id_factory import IDFactory
-from legacy.regex_parts import has_answer, has_question, has_chapter, has_section
+from legacy.regex_parts import scan_page_flags
+from legacy.jsonl_io import dumps_jsonl_line
 from legacy.conversion_logger import ConversionLogger, log_new_pdf, log_completed_conversion
-from legacy.chapter_scanner import scan_pagerecords_for_chapters, save_chapters_jsonl
-from legacy.section_scanner import scan_pagerecords_for_sections, save_sections_jsonl
+from legacy.chapter_scanner import scan_pages_for_chapters, save_chapters_jsonl
+from legacy.section_scanner import scan_pages_for_sections, save_sections_jsonl
+from legacy.pagerecords_reader import load_pagerecords, page_text_map, require_zstandard, ZST_SUFFIX
 from legacy.section_text_extractor import build_sections_with_text, save_sections_with_text, chunk_long_sections, save_section_chunks
+from extractors.pymupdf_backend import extract_pages, extract_toc, save_toc, extract_page_labels, save_page_labels
+
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+try:
+   import zstandard
+except ImportError:
+   zstandard = None
 
 """ -------------------------------------------------------------------------------------------------------- """
 if TYPE_CHECKING:
@@ -123,20 +144,96 @@ def to_jsonable(obj):
       return sorted(obj)
    return obj
 
+"""
+json.dumps(default=...) hook with the same conversions as to_jsonable(), applied during
+encoding so records are serialized without an asdict() deep copy and a second walk.
+Args:
+   o - Object the JSON encoder could not serialize natively
+Returns:
+   A dataclass's field dict or a set's sorted list
+"""
+def json_default(o):
+   if is_dataclass(o) and not isinstance(o, type):
+      return o.__dict__
+   if isinstance(o, set):
+      return sorted(o)
+   raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
 """ -------------------------------------------------------------------------------------------------------- """
+# Legacy backend layout modes for words_to_text()
+LEGACY_MODES = ("words", "text")
+
+# Fixed gap threshold for words on the same line: gaps between real words are
+# ~2.2-3.0, gaps between separate sections are negative (column jumps). Anything
+# below this is glued onto the previous word.
+WORD_GAP = 2.0
+
+"""
+Rebuild page text from PyMuPDF word tuples with NumPy instead of a per-word Python loop.
+Words are ordered by (block, line, x0); a new output line starts whenever (block, line) changes.
+Args:
+   words - Non-empty list of (x0, y0, x1, y1, text, block_no, line_no, word_no)
+Returns:
+   Page text with one line per (block, line) group
+"""
+def _layout_words(words: list) -> str:
+   # Transpose once into flat per-field tuples; building arrays from those is much cheaper
+   # than from per-word sub-tuples, which dominated the runtime on dense pages
+   x0, _, x1, _, texts, block_no, line_no, _ = zip(*words)
+   x0, x1 = (np.array(c, dtype=np.float64) for c in (x0, x1))
+   block_no, line_no = (np.array(c, dtype=np.int64) for c in (block_no, line_no))
+
+   # (block, line) already fixes the row, so only x0 orders words within it (stable, like list.sort)
+   order = np.lexsort((x0, line_no, block_no))
+   x0, x1 = x0[order], x1[order]
+   block_no, line_no = block_no[order], line_no[order]
+   texts = [texts[i] for i in order.tolist()]
+
+   # Separator placed before each word after the first
+   new_line = (block_no[1:] != block_no[:-1]) | (line_no[1:] != line_no[:-1])
+   glue = (x0[1:] - x1[:-1]) < WORD_GAP
+   seps = np.where(new_line, '\n', np.where(glue, '', ' ')).tolist()
+
+   return texts[0] + ''.join(chain.from_iterable(zip(seps, texts[1:])))
+
+""" -------------------------------------------------------------------------------------------------------- """
+"""
+Extract page text and word count with the chosen legacy layout mode.
+Args:
+   pymu - PyMuPDF page object
+   mode - "words" rebuilds lines from word boxes (gap-based gluing);
+          "text" uses MuPDF's own C line assembly via get_text("text")
+Returns:
+   Tuple of (text, word_count)
+"""
+def _page_text(pymu, mode: str) -> Tuple[str, int]:
+   if mode not in LEGACY_MODES:
+      raise ValueError(f"Unknown legacy mode: {mode!r}. Use 'words' or 'text'.")
+
+   if mode == 'text':
+      text = pymu.get_text("text") or ''
+      return text, len(text.split())
+
+   words = pymu.get_text("words") or []
+   return (_layout_words(words), len(words)) if words else ('', 0)
+
 """
 PDF to JSONL conversion using PyMuPDF page with improved gap detection.
 Args:
    page - PyMuPDF page object
+   mode - "words" rebuilds lines from word boxes (gap-based gluing);
+          "text" uses MuPDF's own C line assembly via get_text("text")
 Returns:
    PageRecord object
 """
 def words_to_text(
       pymu: str,
       book_id: str='',
+      mode: str='words',
 ) -> PageRecord:
-   words = pymu.get_text("words") or []
-   if not words:
+   text, word_count = _page_text(pymu, mode)
+
+   if not text:
       return PageRecord(
          id=IDFactory.page_id(book_id, pymu.number + 1),
          book_id=book_id,
@@ -144,60 +241,54 @@ def words_to_text(
          text='',
          word_count=0
       )
-   
-   # Sort top to bottom, then left to right
-   words.sort(key=lambda w: (w[5], w[6], w[1], w[0]))
-   
-   lines = []
-   current_line = []
-   prev = None
-   
-   for w in words:
-      x0, y0, x1, y1, text, block_no, line_no, word_no = w
-      
-      if prev is None:
-         current_line = [text]
-         prev = w
-         continue
-      
-      # New line if block or line number changes
-      if (block_no, line_no) != (prev[5], prev[6]):
-         lines.append(' '.join(current_line))
-         current_line = [text]
-         prev = w
-         continue
-      
-      # Same line: use a FIXED gap threshold instead of proportion-based
-      prev_x1 = prev[2]
-      gap = x0 - prev_x1
-      
-      # Use a very low threshold - gaps between real words are ~2.2-3.0,
-      # gaps between separate sections are negative (column jumps)
-      # Use 2.0 to force separation at most gaps
-      if gap >= 2.0:
-         current_line.append(text)
-      else:
-         current_line[-1] = current_line[-1] + text
-      
-      prev = w
-   
-   if current_line:
-      lines.append(' '.join(current_line))
-   
-   text = '\n'.join(lines)
 
+   chap, sec, ques, ans = scan_page_flags(text)
    return PageRecord(
       id=IDFactory.page_id(book_id, pymu.number + 1),
       book_id=book_id,
       pdf_page_number=pymu.number + 1,
       text=text,
-      word_count=len(words),
-      has_chapter=has_chapter(text),
-      has_section=has_section(text),
-      has_question=has_question(text),
-      has_answer=has_answer(text)
+      word_count=word_count,
+      has_chapter=chap,
+      has_section=sec,
+      has_question=ques,
+      has_answer=ans
    )
 
+"""
+Same as words_to_text(), but builds the JSON-ready PageRecord dict directly (fields in emit
+order, section_ids filled from section_ids_for_text) so the page loop skips the dataclass
+allocation and the asdict() round-trip.
+Args:
+   page - PyMuPDF page object
+   mode - Layout mode, see words_to_text()
+Returns:
+   PageRecord dict
+"""
+def words_to_dict(
+      pymu,
+      book_id: str='',
+      mode: str='words',
+) -> Dict:
+   text, word_count = _page_text(pymu, mode)
+   pdf_page_number = pymu.number + 1
+   chap, sec, ques, ans = scan_page_flags(text)
+
+   return {
+      "id": IDFactory.page_id(book_id, pdf_page_number),
+      "section_ids": sorted(section_ids_for_text(text, book_id)),
+      "book_id": book_id,
+      "pdf_page_number": pdf_page_number,
+      "real_page_number": None,
+      "text": text,
+      "word_count": word_count if text else 0,
+      "has_chapter": chap,
+      "has_section": sec,
+      "has_question": ques,
+      "has_answer": ans,
+      "text_embedding": None,
+   }
+
 """ -------------------------------------------------------------------------------------------------------- """
 """
 Identify section boundaries based on page text and simple heuristics.
@@ -208,80 +299,174 @@ Returns:
    Set of section keys
 """
 def group_sections_per_page(page: PageRecord) -> Set[str]:
-   import re
-   text = page.text or ''
-   text_lower = text.lower()
+   return section_ids_for_text(page.text, page.book_id)
+
+# Section heuristics: keyword lists are folded into one case-insensitive alternation each so a
+# page is scanned once per list instead of once per keyword, without a lowered copy of the text
+PRACTICE_KEYWORDS = (
+   "practice exercises",
+   "practice problems",
+   "practice questions",
+   "review questions",
+   "review problems",
+   "review exercises",
+   "self-test questions",
+   "self-test problems",
+   "self test questions",
+   "homework problems",
+   "homework questions",
+   "homework exercises",
+   "end of chapter exercises",
+   "end of chapter problems",
+   "chapter exercises",
+   "suggested exercises",
+   "suggested problems",
+   "worked examples",
+   "study questions",
+   "discussion questions",
+   "comprehension questions",
+   "conceptual questions",
+   "thought questions",
+)
+SOLUTION_KEYWORDS = (
+   "exercise solutions",
+   "answer key",
+   "answer keys",
+   "solutions to exercises",
+   "solutions to problems",
+   "solution to exercises",
+   "solution to problems",
+   "selected answers",
+   "selected solutions",
+   "answers to exercises",
+   "answers to problems",
+   "answers to questions",
+   "hints and solutions",
+   "solutions to selected",
+   "answers to selected",
+   "solutions to odd-numbered",
+   "answers to odd-numbered",
+   "solutions manual",
+)
+_PRACTICE_RE = re.compile("|".join(map(re.escape, PRACTICE_KEYWORDS)), re.IGNORECASE)
+_SOLUTION_RE = re.compile("|".join(map(re.escape, SOLUTION_KEYWORDS)), re.IGNORECASE)
+# Standalone headings on their own line
+_PRACTICE_HEAD_RE = re.compile(r'(?m)^(Exercises?|Problems?|Questions?)\s*$', re.IGNORECASE)
+_SOLUTION_HEAD_RE = re.compile(r'(?m)^(Solutions?|Answers?)\s*$', re.IGNORECASE)
+
+"""
+Fixed section IDs used by the practice/solution heuristics, derived once per book.
+Args:
+   book_id - Book ID used to derive section IDs
+Returns:
+   Tuple of (practice exercises ID, exercise solutions ID)
+"""
+@functools.lru_cache(maxsize=256)
+def _heuristic_section_ids(book_id: str) -> Tuple[str, str]:
+   return (IDFactory.section_id(book_id, "practice exercises"),
+           IDFactory.section_id(book_id, "exercise solutions"))
+
+"""
+Section heuristics behind group_sections_per_page(), on raw page text (no PageRecord needed).
+Args:
+   text - Page text
+   book_id - Book ID used to derive section IDs
+Returns:
+   Set of section keys
+"""
+def section_ids_for_text(text: Optional[str], book_id: str) -> Set[str]:
+   text = text or ''
    section_ids: Set[str] = set()
+   practice_sid, solution_sid = _heuristic_section_ids(book_id)
 
    # --- Practice / exercise detection ---
-   practice_keywords = [
-      "practice exercises",
-      "practice problems",
-      "practice questions",
-      "review questions",
-      "review problems",
-      "review exercises",
-      "self-test questions",
-      "self-test problems",
-      "self test questions",
-      "homework problems",
-      "homework questions",
-      "homework exercises",
-      "end of chapter exercises",
-      "end of chapter problems",
-      "chapter exercises",
-      "suggested exercises",
-      "suggested problems",
-      "worked examples",
-      "study questions",
-      "discussion questions",
-      "comprehension questions",
-      "conceptual questions",
-      "thought questions",
-   ]
-   for kw in practice_keywords:
-      if kw in text_lower:
-         section_ids.add(IDFactory.section_id(page.book_id, "practice exercises"))
-         break
-
-   # Standalone headings: "Exercises", "Problems", "Questions" on their own line
-   if IDFactory.section_id(page.book_id, "practice exercises") not in section_ids:
-      if re.search(r'(?m)^(Exercises?|Problems?|Questions?)\s*$', text, re.IGNORECASE):
-         section_ids.add(IDFactory.section_id(page.book_id, "practice exercises"))
+   # Keyword anywhere, or a standalone "Exercises"/"Problems"/"Questions" heading
+   if _PRACTICE_RE.search(text) or _PRACTICE_HEAD_RE.search(text):
+      section_ids.add(practice_sid)
 
    # --- Solution / answer detection ---
-   solution_keywords = [
-      "exercise solutions",
-      "answer key",
-      "answer keys",
-      "solutions to exercises",
-      "solutions to problems",
-      "solution to exercises",
-      "solution to problems",
-      "selected answers",
-      "selected solutions",
-      "answers to exercises",
-      "answers to problems",
-      "answers to questions",
-      "hints and solutions",
-      "solutions to selected",
-      "answers to selected",
-      "solutions to odd-numbered",
-      "answers to odd-numbered",
-      "solutions manual",
-   ]
-   for kw in solution_keywords:
-      if kw in text_lower:
-         section_ids.add(IDFactory.section_id(page.book_id, "exercise solutions"))
-         break
-
-   # Standalone headings: "Solutions", "Answers" on their own line
-   if IDFactory.section_id(page.book_id, "exercise solutions") not in section_ids:
-      if re.search(r'(?m)^(Solutions?|Answers?)\s*$', text, re.IGNORECASE):
-         section_ids.add(IDFactory.section_id(page.book_id, "exercise solutions"))
+   # Keyword anywhere, or a standalone "Solutions"/"Answers" heading
+   if _SOLUTION_RE.search(text) or _SOLUTION_HEAD_RE.search(text):
+      section_ids.add(solution_sid)
 
    return section_ids
 
+""" -------------------------------------------------------------------------------------------------------- """
+"""
+Open the PageRecords output for binary writing, zstd-compressed (level 3) when compress is set.
+Args:
+   page_out_file - Output path (carries the .zst suffix when compressing)
+   compress - Wrap the file in a zstandard stream writer
+Returns:
+   Writable binary file object; closing it flushes the zstd frame and closes the file
+"""
+def open_pagerecords_writer(page_out_file: Path, compress: bool = False):
+   raw = open(page_out_file, 'wb', buffering=PAGE_WRITE_BUFFER)
+   if not compress:
+      return raw
+   return zstandard.ZstdCompressor(level=3).stream_writer(raw)
+
+# PageRecords are written through a 1 MiB buffer: one write() syscall per ~1 MiB instead of per page
+PAGE_WRITE_BUFFER = 1 << 20
+
+# Page extraction fans out to a process pool only for books long enough to amortise worker start-up.
+# The pool is opt-in (workers > 1): convert_pdf also runs in the server's upload threads, where
+# a pool per upload would oversubscribe the cores. The CLI and run_pipeline opt in.
+MAX_EXTRACT_WORKERS = 8
+PARALLEL_MIN_PAGES = 64
+
+"""
+Extraction process count for callers that own the machine (CLI, batch pipeline)
+Returns:
+   min(cpu_count, MAX_EXTRACT_WORKERS)
+"""
+def default_extract_workers() -> int:
+   return min(os.cpu_count() or 1, MAX_EXTRACT_WORKERS)
+
+"""
+Worker entry point: extracts one contiguous page range with its own fitz handle
+(fitz.Document cannot be shared across processes)
+Args:
+   pdf_path: PDF to open
+   book_id: Book UUID stamped on every PageRecord
+   pages: 0-based page indices to extract
+   pymupdf_mode: "text" or "blocks"
+Returns:
+   List of PageRecord dicts in page order
+"""
+def _extract_page_shard(pdf_path: Path, book_id: str, pages: range, pymupdf_mode: str) -> List[Dict]:
+   records = list(extract_pages(pdf_path, book_id, mode=pymupdf_mode, page_range=pages))
+   # Same section-heuristic pass as the pdf_backends pymupdf dispatcher
+   for d in records:
+      d["section_ids"] = sorted(section_ids_for_text(d["text"], book_id))
+   return records
+
+"""
+Yields PageRecord dicts for the whole PDF in page order, splitting the pages into shards across
+a process pool when workers > 1 and the book has at least PARALLEL_MIN_PAGES pages
+Args:
+   pdf_path: PDF to extract
+   book_id: Book UUID stamped on every PageRecord
+   total_pages: Page count of the PDF
+   pymupdf_mode: "text" or "blocks"
+   workers: Process count; None or 1 extracts serially in this process
+"""
+def iter_page_dicts(pdf_path: Path, book_id: str, total_pages: int,
+                    pymupdf_mode: str = "text", workers: Optional[int] = None):
+   if workers is None or workers <= 1 or total_pages < PARALLEL_MIN_PAGES:
+      yield from _extract_page_shard(pdf_path, book_id, range(total_pages), pymupdf_mode)
+      return
+
+   shard = max(1, total_pages // (workers * 4))
+   shards = [range(lo, min(lo + shard, total_pages)) for lo in range(0, total_pages, shard)]
+   # spawn, not fork: convert_pdf also runs inside the server's worker threads
+   ctx = multiprocessing.get_context("spawn")
+   with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+      # map() hands shards back in submission order, so JSONL page order is preserved
+      for records in pool.map(_extract_page_shard, repeat(pdf_path), repeat(book_id),
+                              shards, repeat(pymupdf_mode)):
+         yield from records
+
 """ -------------------------------------------------------------------------------------------------------- """
 """
 Converts the PDF to JSONL format, one page per line. PageRecords and DocumentRecord stored as two
@@ -298,10 +483,18 @@ def convert_pdf(
     pymupdf_mode: str = "text",
     emit_pdf_toc: bool = False,
     emit_page_labels: bool = False,
+    legacy_mode: str = "words",
+    workers: Optional[int] = None,
+    compress: bool = False,
+    max_pages: Optional[int] = None,
 ) -> Tuple[str, Path]:
    """
    Convert PDF to JSONL. When output_dir is provided, use it directly (no converted/).
    Otherwise use root/converted/{output_dir_name or base_name}.
+   legacy_mode picks the words_to_text() mode for the legacy backend.
+   workers sets the pymupdf extraction process count (None or 1 = serial; see default_extract_workers).
+   compress writes {name}_PageRecords.zst (zstd) instead of plain JSONL; needs zstandard.
+   max_pages stops extraction after the first N pages (None = whole PDF), for quick test indexes.
    """
    root = Path(__file__).parent
    base_name = pdf_path.stem
@@ -341,8 +534,7 @@ def convert_pdf(
    page_count = 0
 
    t0 = time.perf_counter()
-   last_print_time = t0
-   DRAW_EVERY_SEC = 0.25  # Print progress every 0.25 seconds
+   DRAWS_PER_RUN = 200  # Redraw progress every total/200 pages (integer check, no clock read per page)
    BAR_WIDTH = 15
 
    def draw_progress(done: int, total: int, elapsed: float):
@@ -363,24 +555,29 @@ def convert_pdf(
       print(line, end="", flush=True)
 
    # Read PDF
-   page_out_file = output_dir / f"{base_name}_PageRecords"
+   if compress:
+      require_zstandard()
+   page_out_file = output_dir / f"{base_name}_PageRecords{ZST_SUFFIX if compress else ''}"
    TOC_SCAN_PAGES = 60
    toc_pages: List[PageRecord] = []
+   page_ids_list: List[str] = []
+   section_ids_list: List[str] = []
 
    use_pymupdf = backend == "pymupdf"
 
    if use_pymupdf:
-      # --- PyMuPDF backend: iterate via pdf_backends dispatcher ---
-      from extractors.pdf_backends import extract_pagerecords
-
-      # We need total page count for the progress bar
+      # --- PyMuPDF backend: iterate via pdf_backends dispatcher, sharded across processes ---
+      # We need total page count for the progress bar and shard split
       with fitz.open(pdf_path) as tmp_doc:
          total_pages = len(tmp_doc)
-
-      with open(page_out_file, 'w', encoding='utf-8') as outf:
-         for d in extract_pagerecords(
-            pdf_path, book.id,
-            backend="pymupdf", pymupdf_mode=pymupdf_mode
+      if max_pages:
+         total_pages = min(total_pages, max_pages)
+
+      draw_stride = max(1, total_pages // DRAWS_PER_RUN)
+      with open_pagerecords_writer(page_out_file, compress) as outf:
+         for d in iter_page_dicts(
+            pdf_path, book.id, total_pages,
+            pymupdf_mode=pymupdf_mode, workers=workers
          ):
             page_count += 1
             pdf_page_number = d["pdf_page_number"]
@@ -395,23 +592,17 @@ def convert_pdf(
                   has_question=d["has_question"], has_answer=d["has_answer"],
                ))
 
-            book.page_ids.add(d["id"])
+            page_ids_list.append(d["id"])
+            section_ids_list.extend(d["section_ids"])
             book.num_words += d["word_count"]
-            book.num_pages = page_count
-            for sid in d.get("section_ids", []):
-               book.section_ids.add(sid)
-            book.num_sections = len(book.section_ids)
 
-            outf.write(json.dumps(d, ensure_ascii=False) + '\n')
+            outf.write(dumps_jsonl_line(d))
 
-            now = time.perf_counter()
-            if now - last_print_time >= DRAW_EVERY_SEC:
-               draw_progress(page_count, total_pages, now - t0)
-               last_print_time = now
+            if page_count % draw_stride == 0:
+               draw_progress(page_count, total_pages, time.perf_counter() - t0)
 
       # Emit optional sidecar metadata files
       if emit_pdf_toc:
-         from extractors.pymupdf_backend import extract_toc, save_toc
          toc_data = extract_toc(pdf_path)
          if toc_data:
             toc_out = output_dir / f"{base_name}_TOCFromPDF.json"
@@ -419,7 +610,6 @@ def convert_pdf(
             print(f"\n  TOC metadata: {toc_out.name} ({len(toc_data)} entries)")
 
       if emit_page_labels:
-         from extractors.pymupdf_backend import extract_page_labels, save_page_labels
          labels = extract_page_labels(pdf_path)
          if labels:
             labels_out = output_dir / f"{base_name}_PageLabels.json"
@@ -427,47 +617,57 @@ def convert_pdf(
             print(f"  Page labels: {labels_out.name} ({len(labels)} pages)")
 
    else:
-      # --- Current backend: original words_to_text() logic ---
-      with fitz.open(pdf_path) as pdf:
-         with open(page_out_file, 'w', encoding='utf-8') as outf:
-            for page_idx in range(len(pdf)):
+      # --- Current backend: original words_to_text() logic, emitted as dicts ---
+      # Book metadata this backend never extracts
+      book.num_questions = 0
+      book.num_answers = 0
+      book.references = []
+      book.related_readings = []
 
-               # 1) Build PageRecord object
-               page = words_to_text(pdf[page_idx], book_id=book.id)
+      with fitz.open(pdf_path) as pdf:
+         total_pages = len(pdf)
+         if max_pages:
+            total_pages = min(total_pages, max_pages)
+         draw_stride = max(1, total_pages // DRAWS_PER_RUN)
+         with open_pagerecords_writer(page_out_file, compress) as outf:
+            for page_idx in range(total_pages):
+
+               # 1) Build PageRecord dict (section_ids filled from page heuristics)
+               d = words_to_dict(pdf[page_idx], book_id=book.id, mode=legacy_mode)
                if page_idx < TOC_SCAN_PAGES:
-                  toc_pages.append(page)
-
-               # 2) Add page.id to book.page_ids
-               book.page_ids.add(page.id)
-
-               # 3) Add section_ids to page record based on heuristics
-               sections = group_sections_per_page(page)
-               page.section_ids = {s for s in sections if s is not None}
-
-               # 4) Dump PageRecord to DocumentRecord JSONL file
-               d = to_jsonable(page)
-               outf.write(json.dumps(d, ensure_ascii=False) + '\n')
-
-               # 5) Update num_pages and num_words in book record as we go
+                  toc_pages.append(PageRecord(
+                     id=d["id"], book_id=d["book_id"],
+                     pdf_page_number=d["pdf_page_number"],
+                     text=d["text"], word_count=d["word_count"],
+                     has_chapter=d["has_chapter"], has_section=d["has_section"],
+                     has_question=d["has_question"], has_answer=d["has_answer"],
+                     section_ids=set(d["section_ids"]),
+                  ))
+
+               # 2) Collect page id (folded into book.page_ids after the loop)
+               page_ids_list.append(d["id"])
+
+               # 3) Dump PageRecord to DocumentRecord JSONL file
+               outf.write(dumps_jsonl_line(d))
+
+               # 4) Update num_words in book record as we go
                page_count += 1
-               book.num_words += page.word_count
-               book.num_pages = page_count
+               book.num_words += d["word_count"]
+
+               # 5) Collect section ids (folded into book.section_ids after the loop)
+               section_ids_list.extend(d["section_ids"])
 
-               # 6) Update remaining book metadata
-               book.section_ids.update(page.section_ids)
-               book.page_ids.add(page.id)
-               book.num_sections = len(book.section_ids)
-               book.num_questions = 0
-               book.num_answers = 0
-               book.references = []
-               book.related_readings = []
+               if page_count % draw_stride == 0:
+                  draw_progress(page_count, total_pages, time.perf_counter() - t0)
 
-               now = time.perf_counter()
-               if now - last_print_time >= DRAW_EVERY_SEC:
-                  draw_progress(page_count, len(pdf), now - t0)
-                  last_print_time = now
+   # Fold the per-page IDs into the book record in one pass
+   book.page_ids = set(page_ids_list)
+   book.section_ids = set(section_ids_list)
+   book.num_sections = len(book.section_ids)
+   book.num_pages = page_count
 
-               book.num_pages = page_count
+   # Parse PageRecords once; chapter, section and section-text passes all share it
+   page_dicts = load_pagerecords(page_out_file, verbose=True)
 
    # --- Simple chapter detection by scanning PageRecords ---
    print(f"\n{'='*70}")
@@ -475,8 +675,8 @@ def convert_pdf(
    print(f"{'='*70}")
    
    try:
-      boundaries = scan_pagerecords_for_chapters(
-         page_out_file,
+      boundaries = scan_pages_for_chapters(
+         page_dicts,
          min_chapter=1,
          max_chapter=50,
          min_page_gap=5,
@@ -492,7 +692,6 @@ def convert_pdf(
 
    except Exception as e:
       print(f"\n⚠ Chapter detection failed: {e}")
-      import traceback
       traceback.print_exc()
 
    # --- Section detection by scanning PageRecords ---
@@ -501,8 +700,8 @@ def convert_pdf(
    print(f"{'='*70}")
 
    try:
-      sections = scan_pagerecords_for_sections(
-         page_out_file,
+      sections = scan_pages_for_sections(
+         page_dicts,
          max_depth=2,
          verbose=True
       )
@@ -516,7 +715,6 @@ def convert_pdf(
 
    except Exception as e:
       print(f"\n⚠ Section detection failed: {e}")
-      import traceback
       traceback.print_exc()
       sections = []  # Empty list if detection failed
 
@@ -533,6 +731,7 @@ def convert_pdf(
             page_out_file,
             book_name=base_name,
             chapters_file=chapters_out if 'chapters_out' in locals() else None,
+            page_map=page_text_map(page_dicts),
             verbose=True
          )
          
@@ -569,7 +768,6 @@ def convert_pdf(
       
       except Exception as e:
          print(f"\n⚠ Section text extraction failed: {e}")
-         import traceback
          traceback.print_exc()
 
    book.output_jsonl_path = str(output_dir)
@@ -577,7 +775,7 @@ def convert_pdf(
    # Write DocumentRecord to same directory
    book_out_file = output_dir / f"{base_name}_DocumentRecord"
    with open(book_out_file, 'w', encoding='utf-8') as outf:
-      outf.write(json.dumps(to_jsonable(book), indent=2, ensure_ascii=False, sort_keys=True))
+      outf.write(json.dumps(book, default=json_default, indent=2, ensure_ascii=False, sort_keys=True))
 
    # Print closing message
    print(f"\n\n{'=' * 70}")
@@ -635,10 +833,18 @@ if __name__ == "__main__":
                         help="Extraction backend (default: pymupdf)")
    parser.add_argument("--pymupdf-mode", choices=["text", "blocks"], default="text",
                         help="PyMuPDF extraction mode (default: text)")
+   parser.add_argument("--legacy-mode", choices=list(LEGACY_MODES), default="words",
+                        help="Legacy backend layout: word-box reconstruction or MuPDF text (default: words)")
+   parser.add_argument("--workers", type=int, default=None,
+                        help=f"PyMuPDF extraction processes (default: min(cpu_count, {MAX_EXTRACT_WORKERS}); 1 = serial)")
+   parser.add_argument("--compress", action="store_true",
+                        help="Write <book>_PageRecords.zst (zstd) instead of plain JSONL (needs zstandard)")
    parser.add_argument("--emit-pdf-toc", action="store_true",
                         help="Write <book>_TOCFromPDF.json sidecar (pymupdf backend only)")
    parser.add_argument("--emit-page-labels", action="store_true",
                         help="Write <book>_PageLabels.json sidecar (pymupdf backend only)")
+   parser.add_argument("--max-pages", type=int, default=None,
+                        help="Only extract the first N pages (default: all)")
    parser.add_argument("--auto-chunk", action="store_true", default=None,
                         help="Enable section chunking without prompting")
    parser.add_argument("--no-chunk", action="store_true",
@@ -660,4 +866,8 @@ if __name__ == "__main__":
       pymupdf_mode=args.pymupdf_mode,
       emit_pdf_toc=args.emit_pdf_toc,
       emit_page_labels=args.emit_page_labels,
+      legacy_mode=args.legacy_mode,
+      workers=args.workers if args.workers is not None else default_extract_workers(),
+      compress=args.compress,
+      max_pages=args.max_pages,
    )
\ No newline at end of file
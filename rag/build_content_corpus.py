@@ -30,14 +30,28 @@ Usage:
 See --help for all options.
 """
 
+import os
 import re
 import json
 import hashlib
 import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from collections import Counter
 from dataclasses import dataclass, field, asdict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+from legacy.jsonl_io import dumps_jsonl_line
+from rag.build_index import IO_BUFFER
+
+_loads = orjson.loads if orjson is not None else json.loads
+
 
 # ============================================================================
 # CONFIGURATION
@@ -53,24 +67,29 @@ class CorpusConfig:
    hard_max_words: int = 650
    max_dotleader_lines: int = 4   # filter threshold is > this value
    allow_page_types: Optional[set] = None  # whitelist specific noncontent types
+   hash_chunk_ids: bool = False  # emit fixed-width digests as chunk_id
 
 # ============================================================================
 # FILTER TYPES
 # ============================================================================
 
-NONCONTENT_PAGE_TYPES = {"toc", "index", "front_matter", "blankish"}
+NONCONTENT_PAGE_TYPES = frozenset({"toc", "index", "front_matter", "blankish"})
 
 # ============================================================================
 # REGEX PATTERNS
 # ============================================================================
 
 # Dot-leader line:  "Something . . . . . 42" or "Something.........42"
+# (this and the bare pattern define what _classify_line() tests per line)
 _DOT_LEADER_RE = re.compile(r'(?:\.\s*){3,}.*\b\d+\s*$')
 
 # Dot-leader line WITHOUT trailing page number (PyMuPDF often splits the
 # number onto its own line):  "Something . . . . . . . . . ."
 _DOT_LEADER_BARE_RE = re.compile(r'(?:\.\s*){4,}\s*$')
 
+# Three dots with optional blanks between: present in every dot-leader line
+_DOT_RUN_RE = re.compile(r'\.\s*\.\s*\.')
+
 # "Table of Contents" anywhere (case-insensitive)
 _TOC_PHRASE_RE = re.compile(r'table\s+of\s+contents', re.IGNORECASE)
 
@@ -80,14 +99,32 @@ _TITLE_DOT_PADDING_RE = re.compile(r'(?:\.\s*){4,}')
 # Sentence boundary (for splitting oversized paragraphs)
 _SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
 
+# 3+ consecutive newlines (collapsed to one blank line by the cleaner)
+_COLLAPSE_BLANKS_RE = re.compile(r'\n{3,}')
+
+# Paragraph boundary: a blank (or whitespace-only) line
+_PARA_SPLIT_RE = re.compile(r'\n\s*\n')
+
 # Code-like line heuristic: starts with whitespace or has many symbols
 _CODE_LINE_RE = re.compile(r'^(?:\s{4,}|\t)|[{}();=<>]{2,}')
 
-# Section-number line with trailing page number (e.g., "1.2.3 Topic Name 42")
-_SECTION_PAGE_LINE_RE = re.compile(r'^\d+(?:\.\d+)+\s+.*\b\d+\s*$')
-
-# Bare section number on its own line (e.g. "1.2.1" or "10.3.4")
-_BARE_SECTION_RE = re.compile(r'^\d+(?:\.\d+)+\s*$')
+# TOC line signals for looks_like_toc(), as one alternation scanned once per text:
+#   dot:     dot-leader line, same lines as _DOT_LEADER_RE / _DOT_LEADER_BARE_RE
+#            (the match runs to end of line, so each line counts at most once)
+#   bare:    bare section number on its own line (e.g. "1.2.1" or "10.3.4")
+#   secpage: section number with trailing page number (e.g. "1.2.3 Topic Name 42")
+# The section-number branch only consumes the number and checks the rest of
+# the line in a lookahead, so "1.2 Overview . . . . 5" counts as both secpage
+# and dot. [^\S\n] keeps every match inside one line.
+_TOC_SIGNAL_RE = re.compile(
+   r'(?P<dot>(?:\.[^\S\n]*){3,}(?:[^\n]*\b\d+[^\S\n]*|\.[^\S\n]*)$)'
+   r'|^[^\S\n]*\d+(?:\.\d+)+'
+   r'(?=(?P<bare>[^\S\n]*$)|(?P<secpage>[^\S\n]+[^\n]*\b\d+[^\S\n]*$))',
+   re.MULTILINE,
+)
+
+# looks_like_toc() thresholds per signal
+_TOC_THRESHOLDS = {"dot": 5, "secpage": 5, "bare": 8}
 
 
 def looks_like_toc(text: str) -> bool:
@@ -98,29 +135,16 @@ def looks_like_toc(text: str) -> bool:
    - 5+ dot-leader lines (with or without trailing page number), OR
    - 5+ lines with section-number prefix and trailing page number, OR
    - 8+ bare section-number lines (like "1.2.1" alone on a line)
-   """
-   lines = [ln.strip() for ln in text.split('\n') if ln.strip()]
-   if not lines:
-      return False
-
-   # Classic dot-leaders: "Topic . . . . . 42"
-   dot_leader_count = sum(
-      1 for ln in lines
-      if _DOT_LEADER_RE.search(ln) or _DOT_LEADER_BARE_RE.search(ln)
-   )
-   if dot_leader_count >= 5:
-      return True
-
-   # "1.2.3 Topic Name 42" style
-   section_page_count = sum(1 for ln in lines if _SECTION_PAGE_LINE_RE.match(ln))
-   if section_page_count >= 5:
-      return True
-
-   # Bare section numbers ("1.2.1" alone) — common when PyMuPDF splits TOC
-   bare_section_count = sum(1 for ln in lines if _BARE_SECTION_RE.match(ln))
-   if bare_section_count >= 8:
-      return True
 
+   The text is scanned once with _TOC_SIGNAL_RE and the scan stops as soon as
+   any threshold is reached.
+   """
+   counts = dict.fromkeys(_TOC_THRESHOLDS, 0)
+   for m in _TOC_SIGNAL_RE.finditer(text):
+      signal = m.lastgroup
+      counts[signal] += 1
+      if counts[signal] >= _TOC_THRESHOLDS[signal]:
+         return True
    return False
 
 # ============================================================================
@@ -136,12 +160,12 @@ def load_page_classifications(path: Path) -> Dict[int, Dict]:
    """
    classifications = {}
 
-   with open(path, 'r', encoding='utf-8') as f:
+   with open(path, 'rb', buffering=IO_BUFFER) as f:
       for line in f:
          line = line.strip()
          if not line:
             continue
-         record = json.loads(line)
+         record = _loads(line)
          page_num = record.get('pdf_page_number')
          if page_num is not None:
             classifications[page_num] = record
@@ -175,49 +199,125 @@ def make_chunk_id(
    raw = f"{book_name}|{ch}|{sec}|p{ps}-{pe}|i{ci}|s{subchunk_index}"
    return raw
 
+
+# Digest bytes for hashed chunk IDs (hex form is twice as long)
+CHUNK_ID_DIGEST_SIZE = 16
+
+
+def hash_chunk_id(raw_id: str) -> str:
+   """
+   Fixed-width (32 hex chars) digest of a make_chunk_id() string.
+
+   Uses BLAKE2b from hashlib so the same corpus hashes to the same IDs
+   on every machine, with no optional dependency.
+   """
+   return hashlib.blake2b(raw_id.encode('utf-8'), digest_size=CHUNK_ID_DIGEST_SIZE).hexdigest()
+
 # ============================================================================
 # TEXT CLEANING
 # ============================================================================
 
-def clean_text(text: str) -> str:
+@dataclass
+class TextAnalysis:
+   """Cleaned text plus the TOC signals the filters and the writer read from it."""
+   cleaned: str
+   contains_toc_phrase: bool
+   looks_like_toc: bool
+   dot_leader_count: int   # lines matching _DOT_LEADER_RE
+
+
+# _classify_line() bits
+_LINE_DOT_LEADER = 1   # matches _DOT_LEADER_RE
+_LINE_BARE_DOTS = 2    # matches _DOT_LEADER_BARE_RE
+
+
+def _classify_line(stripped: str, compact: str) -> int:
    """
-   Normalize and clean section text for corpus use.
+   Dot-leader bits for one stripped line, without running the regexes.
+
+   compact is the line with all whitespace removed, so "dots separated only
+   by whitespace" becomes "adjacent dots" and both patterns reduce to
+   substring tests:
+   - bare: the line ends in 4+ such dots
+   - leader: a 3-dot run comes before a trailing digit run that starts at
+     a word boundary (the "\\b\\d+\\s*$" tail of _DOT_LEADER_RE)
+   """
+   kind = _LINE_BARE_DOTS if compact.endswith('....') else 0
 
-   - Normalize line endings
-   - Remove embedded TOC lines ("Table of Contents")
-   - Remove pure dot-leader lines
-   - Trim excessive whitespace but keep paragraph structure
+   i = len(stripped)
+   while i and stripped[i - 1].isdecimal():
+      i -= 1
+   if i < len(stripped) and (i == 0 or not (stripped[i - 1].isalnum() or stripped[i - 1] == '_')):
+      head = compact[:len(compact) - (len(stripped) - i)]
+      if '...' in head:
+         kind |= _LINE_DOT_LEADER
+   return kind
+
+
+def analyze_and_clean(text: str) -> TextAnalysis:
+   """
+   Clean section text and collect its TOC signals in one walk over its lines.
+
+   Line endings are normalized first, so the signals and the cleaned text
+   see the same lines. See clean_text() for the cleaning rules.
    """
    # Normalize line endings
    text = text.replace('\r\n', '\n').replace('\r', '\n')
 
-   # Process line by line
-   cleaned_lines = []
-   for line in text.split('\n'):
-      # Remove "Table of Contents" lines
-      if _TOC_PHRASE_RE.search(line):
-         continue
-
-      # Remove dot-leader lines (with or without trailing page number)
-      stripped = line.strip()
-      if stripped and (_DOT_LEADER_RE.search(stripped) or _DOT_LEADER_BARE_RE.search(stripped)):
-         # Check if dots dominate the line (ratio of dot/space chars vs total)
-         dot_space_chars = len(re.findall(r'[.\s]', stripped))
-         total = len(stripped)
-         if total > 0 and dot_space_chars / total > 0.5:
+   # Whole-text checks run once in C; the phrase may span a line break
+   contains_toc_phrase = bool(_TOC_PHRASE_RE.search(text))
+   toc_like = looks_like_toc(text)
+
+   # Every line the cleaner drops or counts holds the TOC phrase or a run of
+   # three dots; most sections have neither and skip the line walk entirely
+   dot_leader_count = 0
+   if contains_toc_phrase or _DOT_RUN_RE.search(text):
+      # Process line by line
+      cleaned_lines = []
+      for line in text.split('\n'):
+         stripped = line.strip()
+         compact = ''.join(stripped.split())
+         kind = _classify_line(stripped, compact)
+         dot_leader_count += kind & _LINE_DOT_LEADER
+
+         # Remove "Table of Contents" lines
+         if contains_toc_phrase and _TOC_PHRASE_RE.search(line):
             continue
 
-      cleaned_lines.append(line)
+         # Remove dot-leader lines (with or without trailing page number)
+         if kind:
+            # Check if dots dominate the line (ratio of dot/space chars vs total)
+            # (length minus what is left once whitespace and dots are dropped)
+            dot_space_chars = len(stripped) - len(compact.replace('.', ''))
+            if dot_space_chars / len(stripped) > 0.5:
+               continue
+
+         cleaned_lines.append(line)
 
-   text = '\n'.join(cleaned_lines)
+      text = '\n'.join(cleaned_lines)
 
    # Collapse 3+ consecutive blank lines to 2
-   text = re.sub(r'\n{3,}', '\n\n', text)
+   text = _COLLAPSE_BLANKS_RE.sub('\n\n', text)
+
+   return TextAnalysis(
+      # Trim leading/trailing whitespace
+      cleaned=text.strip(),
+      contains_toc_phrase=contains_toc_phrase,
+      looks_like_toc=toc_like,
+      dot_leader_count=dot_leader_count,
+   )
 
-   # Trim leading/trailing whitespace
-   text = text.strip()
 
-   return text
+def clean_text(text: str) -> str:
+   """
+   Normalize and clean section text for corpus use.
+
+   - Normalize line endings
+   - Remove embedded TOC lines ("Table of Contents")
+   - Remove pure dot-leader lines
+   - Trim excessive whitespace but keep paragraph structure
+   """
+   return analyze_and_clean(text).cleaned
 
 
 def clean_section_title(title: str) -> str:
@@ -234,44 +334,47 @@ def clean_section_title(title: str) -> str:
 # FILTERING
 # ============================================================================
 
-def check_filters(
+def excluded_page_types(config: CorpusConfig) -> FrozenSet[str]:
+   """Noncontent page types that filter a record (NONCONTENT_PAGE_TYPES minus the whitelist)."""
+   return NONCONTENT_PAGE_TYPES - (config.allow_page_types or frozenset())
+
+
+def page_filter_reason(
    record: Dict,
    page_classifications: Dict[int, Dict],
    config: CorpusConfig,
+   excluded_types: Optional[FrozenSet[str]] = None,
 ) -> Optional[str]:
-   """
-   Check if a SectionsWithText record should be filtered out.
-
-   Returns:
-      None if the record should be KEPT.
-      A reason string if the record should be FILTERED.
-   """
-   text = record.get('text', '')
-   page_start = record.get('page_start', 0)
-   page_end = record.get('page_end', 0)
+   """Filter reason from the classifications of the record's pages, or None."""
+   if config.include_noncontent or not page_classifications:
+      return None
+   if excluded_types is None:
+      excluded_types = excluded_page_types(config)
 
-   # Compute effective excluded page types
-   excluded_types = NONCONTENT_PAGE_TYPES - (config.allow_page_types or set())
+   for pg in range(record.get('page_start', 0), record.get('page_end', 0) + 1):
+      cls = page_classifications.get(pg)
+      if cls and cls.get('page_type') in excluded_types:
+         if cls.get('confidence', 0) >= config.min_confidence:
+            return f"page_{cls['page_type']}_confidence_{cls['confidence']}"
+   return None
 
-   # --- 1. Page classification filter ---
-   if not config.include_noncontent and page_classifications:
-      for pg in range(page_start, page_end + 1):
-         cls = page_classifications.get(pg)
-         if cls and cls.get('page_type') in excluded_types:
-            if cls.get('confidence', 0) >= config.min_confidence:
-               return f"page_{cls['page_type']}_confidence_{cls['confidence']}"
 
+def text_filter_reason(
+   record: Dict,
+   analysis: TextAnalysis,
+   config: CorpusConfig,
+) -> Optional[str]:
+   """Filter reason from the record's text signals and title, or None."""
    # --- 2. "Table of Contents" in text ---
-   if _TOC_PHRASE_RE.search(text):
+   if analysis.contains_toc_phrase:
       return "contains_toc_phrase"
 
    # --- 3. Structural TOC detection ---
-   if looks_like_toc(text):
+   if analysis.looks_like_toc:
       return "looks_like_toc"
 
    # --- 4. Dot-leader heavy (configurable threshold) ---
-   lines = text.split('\n')
-   dot_leader_count = sum(1 for ln in lines if _DOT_LEADER_RE.search(ln))
+   dot_leader_count = analysis.dot_leader_count
    if dot_leader_count > config.max_dotleader_lines:
       return f"dot_leader_heavy_{dot_leader_count}_lines"
 
@@ -279,13 +382,46 @@ def check_filters(
    section_title = record.get('section_title', '')
    if section_title and _TITLE_DOT_PADDING_RE.search(section_title):
       # Only filter if there's no real content beyond the TOC header
-      word_count = record.get('word_count', 0) or len(text.split())
+      word_count = record.get('word_count', 0) or len(record.get('text', '').split())
       if word_count < 50:
          return "dot_padded_title_no_content"
 
    return None
 
 
+def check_filters(
+   record: Dict,
+   page_classifications: Dict[int, Dict],
+   config: CorpusConfig,
+   analysis: Optional[TextAnalysis] = None,
+   excluded_types: Optional[FrozenSet[str]] = None,
+) -> Optional[str]:
+   """
+   Check if a SectionsWithText record should be filtered out.
+
+   The page check (1) runs before the text is analyzed, so records on
+   excluded pages never pay for cleaning; then the text checks (2-5).
+
+   Args:
+      analysis: analyze_and_clean() result for the record's text, if the
+                caller already has it (computed here otherwise)
+      excluded_types: excluded_page_types(config), if the caller already
+                has it (computed here otherwise)
+
+   Returns:
+      None if the record should be KEPT.
+      A reason string if the record should be FILTERED.
+   """
+   # --- 1. Page classification filter ---
+   reason = page_filter_reason(record, page_classifications, config, excluded_types)
+   if reason:
+      return reason
+
+   if analysis is None:
+      analysis = analyze_and_clean(record.get('text', ''))
+   return text_filter_reason(record, analysis, config)
+
+
 def get_page_types_in_range(
    page_start: int,
    page_end: int,
@@ -326,7 +462,7 @@ def _split_into_paragraphs(text: str) -> List[str]:
    Split text into paragraph blocks on double-newline boundaries.
    Keeps code blocks (consecutive code-like lines) together.
    """
-   raw_paragraphs = re.split(r'\n\s*\n', text)
+   raw_paragraphs = _PARA_SPLIT_RE.split(text)
    return [p.strip() for p in raw_paragraphs if p.strip()]
 
 
@@ -353,42 +489,53 @@ def subchunk_text(text: str, config: CorpusConfig) -> List[str]:
    Returns:
       List of subchunk text strings.
    """
+   return [sub for sub, _ in subchunk_text_with_counts(text, config)]
+
+
+def subchunk_text_with_counts(text: str, config: CorpusConfig) -> List[Tuple[str, int]]:
+   """
+   subchunk_text() returning (subchunk, word_count) pairs.
+
+   Each piece is word-counted once; pieces are joined with blank lines, so a
+   subchunk's count is the sum of its pieces' counts.
+   """
    paragraphs = _split_into_paragraphs(text)
 
    if not paragraphs:
-      return [text] if text.strip() else []
+      return [(text, _word_count(text))] if text.strip() else []
 
    # Flatten oversized paragraphs into sentence-level pieces
-   pieces = []
+   pieces: List[Tuple[str, int]] = []
    for para in paragraphs:
       wc = _word_count(para)
       if wc <= config.hard_max_words:
-         pieces.append(para)
+         pieces.append((para, wc))
       else:
          # Try sentence split first
          sentences = _split_paragraph_by_sentences(para)
          if len(sentences) > 1:
-            pieces.extend(sentences)
+            pieces.extend((sent, _word_count(sent)) for sent in sentences)
          else:
             # Fall back to single-newline split
             sub_lines = para.split('\n')
             if len(sub_lines) > 1:
-               pieces.extend(ln for ln in sub_lines if ln.strip())
+               pieces.extend((ln, _word_count(ln)) for ln in sub_lines if ln.strip())
             else:
                # Truly one giant run-on: force word-level split
                words = para.split()
                chunk_size = config.target_max_words
                for start in range(0, len(words), chunk_size):
-                  pieces.append(' '.join(words[start:start + chunk_size]))
+                  chunk_words = words[start:start + chunk_size]
+                  pieces.append((' '.join(chunk_words), len(chunk_words)))
 
-   # Merge pieces into subchunks respecting target range
-   subchunks = []
+   # Merge pieces into subchunks respecting target range. Subchunks stay
+   # lists of parts until the end, so the tail merge extends a list and each
+   # subchunk is joined exactly once.
+   groups: List[Tuple[List[str], int]] = []
    current_parts = []
    current_wc = 0
 
-   for piece in pieces:
-      piece_wc = _word_count(piece)
-
+   for piece, piece_wc in pieces:
       # If adding this piece stays within hard max, accumulate
       if current_wc + piece_wc <= config.hard_max_words:
          current_parts.append(piece)
@@ -396,35 +543,241 @@ def subchunk_text(text: str, config: CorpusConfig) -> List[str]:
 
          # If we've reached the target range, flush
          if current_wc >= config.target_min_words:
-            subchunks.append('\n\n'.join(current_parts))
+            groups.append((current_parts, current_wc))
             current_parts = []
             current_wc = 0
       else:
          # Flush current, then start new with this piece
          if current_parts:
-            subchunks.append('\n\n'.join(current_parts))
+            groups.append((current_parts, current_wc))
          current_parts = [piece]
          current_wc = piece_wc
 
    # Flush remaining
    if current_parts:
-      remaining = '\n\n'.join(current_parts)
       # If the last subchunk is very small, merge with previous
-      if subchunks and _word_count(remaining) < config.target_min_words // 2:
-         subchunks[-1] = subchunks[-1] + '\n\n' + remaining
+      if groups and current_wc < config.target_min_words // 2:
+         last_parts, last_wc = groups[-1]
+         last_parts.extend(current_parts)
+         groups[-1] = (last_parts, last_wc + current_wc)
       else:
-         subchunks.append(remaining)
+         groups.append((current_parts, current_wc))
 
    # Safety: if nothing was produced, return the original text
-   if not subchunks:
-      return [text]
+   if not groups:
+      return [(text, _word_count(text))]
 
-   return subchunks
+   return [('\n\n'.join(parts), wc) for parts, wc in groups]
 
 # ============================================================================
 # CORPUS BUILDER
 # ============================================================================
 
+# Corpus build parallelism: records are independent, so batches of input lines
+# go to a process pool when there are enough of them to amortize worker start-up.
+# The pool is opt-in (workers > 1): run_pipeline's batch mode already runs one
+# book per process, where a pool per book would oversubscribe the cores.
+MAX_CORPUS_WORKERS = 8
+PARALLEL_MIN_RECORDS = 2000
+CORPUS_BATCH_RECORDS = 256
+
+
+def default_corpus_workers() -> int:
+   """Corpus build process count for callers that own the machine: min(cpu_count, MAX_CORPUS_WORKERS)."""
+   return min(os.cpu_count() or 1, MAX_CORPUS_WORKERS)
+
+
+def _build_corpus_batch(
+   lines: List[bytes],
+   book_name: str,
+   page_cls: Dict[int, Dict],
+   config: CorpusConfig,
+) -> Tuple[bytes, bytes, Counter, Counter, int]:
+   """
+   Filter, clean and subchunk one batch of SectionsWithText JSONL lines.
+
+   Returns:
+      (chunks JSONL bytes, logs JSONL bytes, stats, filter_reasons, output word total)
+   """
+   # Per-batch constants: the effective excluded page types, and provenance page
+   # types per (page_start, page_end) since sibling chunks share page ranges
+   excluded_types = excluded_page_types(config)
+   page_types_cache: Dict[Tuple[int, int], List[str]] = {}
+
+   out_lines: List[bytes] = []
+   log_lines: List[bytes] = []
+   stats: Counter = Counter()
+   filter_reasons: Counter = Counter()
+   total_output_words = 0
+
+   for line in lines:
+      line = line.strip()
+      if not line:
+         continue
+
+      record = _loads(line)
+      stats['total_input'] += 1
+
+      text = record.get('text', '')
+      section_number = record.get('section_number')
+      chapter_number = record.get('chapter_number')
+      chunk_index = record.get('chunk_index')
+      page_start = record.get('page_start', 0)
+      page_end = record.get('page_end', 0)
+      rec_book_name = record.get('book_name', book_name)
+
+      # ── Page filter, then analyze + clean text (one pass) ────────
+      # Records on excluded pages are never analyzed
+      filter_reason = page_filter_reason(record, page_cls, config, excluded_types)
+      if not filter_reason:
+         analysis = analyze_and_clean(text)
+         filter_reason = text_filter_reason(record, analysis, config)
+
+      if filter_reason:
+         stats['filtered'] += 1
+         filter_reasons[filter_reason] += 1
+
+         # Write log record
+         candidate_id = make_chunk_id(
+            rec_book_name, chapter_number, section_number,
+            page_start, page_end, chunk_index, 0,
+         )
+
+         log_entry = {
+            "chunk_id_candidate": candidate_id,
+            "reason": filter_reason,
+            "section_number": section_number,
+            "chapter_number": chapter_number,
+            "page_start": page_start,
+            "page_end": page_end,
+            "word_count": record.get('word_count', 0),
+         }
+         log_lines.append(dumps_jsonl_line(log_entry))
+         continue
+
+      cleaned = analysis.cleaned
+
+      if not cleaned.strip():
+         stats['filtered'] += 1
+         filter_reasons['empty_after_cleaning'] += 1
+         continue
+
+      # ── Clean section title ──────────────────────────────────────
+      section_title_raw = record.get('section_title', '')
+      section_title_clean = clean_section_title(section_title_raw)
+
+      # ── Build provenance ─────────────────────────────────────────
+      page_types = page_types_cache.get((page_start, page_end))
+      if page_types is None:
+         page_types = get_page_types_in_range(
+            page_start, page_end, page_cls,
+            min_confidence=config.min_confidence,
+         )
+         page_types_cache[(page_start, page_end)] = page_types
+
+      provenance = {
+         "sectionswithtext_record": {
+            "chapter_number": chapter_number,
+            "section_number": section_number,
+            "chunk_index": chunk_index,
+            "page_start": page_start,
+            "page_end": page_end,
+         },
+         "page_types_in_range": page_types,
+      }
+
+      # ── Text flags ───────────────────────────────────────────────
+      contains_toc_phrase = analysis.contains_toc_phrase
+      looks_like_dot_leader_toc = analysis.dot_leader_count > config.max_dotleader_lines
+
+      # ── Subchunk ─────────────────────────────────────────────────
+      subchunks = subchunk_text_with_counts(cleaned, config)
+      subchunk_total = len(subchunks)
+
+      for sub_idx, (sub_text, wc) in enumerate(subchunks):
+
+         chunk_id = make_chunk_id(
+            rec_book_name, chapter_number, section_number,
+            page_start, page_end, chunk_index, sub_idx,
+         )
+         if config.hash_chunk_ids:
+            # Readable form survives only in provenance
+            provenance = {**provenance, "chunk_id_human": chunk_id}
+            chunk_id = hash_chunk_id(chunk_id)
+
+         output_record = {
+            "chunk_id": chunk_id,
+            "book_name": rec_book_name,
+            "source_type": "textbook_content",
+            "chapter_number": chapter_number,
+            "chapter_title": record.get('chapter_title'),
+            "section_number": section_number,
+            "section_title": section_title_clean,
+            "page_start": page_start,
+            "page_end": page_end,
+            "parent_section_chunk_index": chunk_index,
+            "parent_section_total_chunks": record.get('total_chunks'),
+            "subchunk_index": sub_idx,
+            "subchunk_total": subchunk_total,
+            "text": sub_text,
+            "word_count": wc,
+            "flags": {
+               "filtered_reason": None,
+               "contains_toc_phrase": contains_toc_phrase,
+               "looks_like_dot_leader_toc": looks_like_dot_leader_toc,
+            },
+            "provenance": provenance,
+         }
+
+         out_lines.append(dumps_jsonl_line(output_record))
+         stats['total_output'] += 1
+         total_output_words += wc
+
+   return b''.join(out_lines), b''.join(log_lines), stats, filter_reasons, total_output_words
+
+
+# (book_name, page_cls, config) for _build_corpus_worker, set once per pool process
+_worker_args: Optional[Tuple[str, Dict[int, Dict], CorpusConfig]] = None
+
+
+def _init_corpus_worker(book_name: str, page_cls: Dict[int, Dict], config: CorpusConfig) -> None:
+   global _worker_args
+   _worker_args = (book_name, page_cls, config)
+
+
+def _build_corpus_worker(lines: List[bytes]) -> Tuple[bytes, bytes, Counter, Counter, int]:
+   return _build_corpus_batch(lines, *_worker_args)
+
+
+def iter_corpus_batches(
+   lines: List[bytes],
+   book_name: str,
+   page_cls: Dict[int, Dict],
+   config: CorpusConfig,
+   workers: Optional[int] = None,
+) -> Iterator[Tuple[bytes, bytes, Counter, Counter, int]]:
+   """
+   Yield _build_corpus_batch() results for the input lines, in input order.
+
+   Batches run in a process pool when workers > 1 and there are at least
+   PARALLEL_MIN_RECORDS lines; workers=None runs serially (see default_corpus_workers).
+   """
+   batches = [lines[lo:lo + CORPUS_BATCH_RECORDS] for lo in range(0, len(lines), CORPUS_BATCH_RECORDS)]
+   if workers is None or workers <= 1 or len(lines) < PARALLEL_MIN_RECORDS:
+      for batch in batches:
+         yield _build_corpus_batch(batch, book_name, page_cls, config)
+      return
+
+   # spawn, not fork: matches run_pipeline's book pools.
+   # Page classifications go to each worker once via the initializer, not per batch.
+   ctx = multiprocessing.get_context("spawn")
+   with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                            initializer=_init_corpus_worker,
+                            initargs=(book_name, page_cls, config)) as pool:
+      # map() hands batches back in submission order, so output order is preserved
+      yield from pool.map(_build_corpus_worker, batches)
+
+
 def build_corpus(
    sections_path: Path,
    page_cls_path: Optional[Path],
@@ -432,6 +785,7 @@ def build_corpus(
    book_name_override: Optional[str] = None,
    config: Optional[CorpusConfig] = None,
    verbose: bool = True,
+   workers: Optional[int] = None,
 ) -> Dict[str, int]:
    """
    Build the content corpus from SectionsWithText + PageClassifications.
@@ -443,6 +797,7 @@ def build_corpus(
       book_name_override: Override book name (otherwise read from records)
       config: CorpusConfig with thresholds
       verbose: Print summary
+      workers: Process count for large inputs (None or 1 = serial)
 
    Returns:
       Dict with stats: total_input, filtered_*, total_output, avg_words
@@ -457,16 +812,17 @@ def build_corpus(
       if verbose:
          print(f"  Loaded {len(page_cls)} page classifications")
 
+   with open(sections_path, 'rb', buffering=IO_BUFFER) as f:
+      lines = [line for line in f if line.strip()]
+
    # Determine book name from first record if not overridden
    book_name = book_name_override
    if not book_name:
-      with open(sections_path, 'r', encoding='utf-8') as f:
-         first_line = f.readline().strip()
-         if first_line:
-            first_rec = json.loads(first_line)
-            book_name = first_rec.get('book_name', 'unknown_book')
-         else:
-            book_name = 'unknown_book'
+      if lines:
+         first_rec = _loads(lines[0])
+         book_name = first_rec.get('book_name', 'unknown_book')
+      else:
+         book_name = 'unknown_book'
 
    # Setup output paths
    book_out_dir = out_root / book_name
@@ -480,125 +836,16 @@ def build_corpus(
    filter_reasons: Counter = Counter()
    total_output_words = 0
 
-   with open(sections_path, 'r', encoding='utf-8') as fin, \
-        open(chunks_path, 'w', encoding='utf-8') as fout, \
-        open(logs_path, 'w', encoding='utf-8') as flog:
-
-      for line in fin:
-         line = line.strip()
-         if not line:
-            continue
-
-         record = json.loads(line)
-         stats['total_input'] += 1
-
-         text = record.get('text', '')
-         section_number = record.get('section_number')
-         chapter_number = record.get('chapter_number')
-         chunk_index = record.get('chunk_index')
-         page_start = record.get('page_start', 0)
-         page_end = record.get('page_end', 0)
-         rec_book_name = record.get('book_name', book_name)
-
-         # ── Check filters ────────────────────────────────────────────
-         filter_reason = check_filters(record, page_cls, config)
-
-         if filter_reason:
-            stats['filtered'] += 1
-            filter_reasons[filter_reason] += 1
-
-            # Write log record
-            candidate_id = make_chunk_id(
-               rec_book_name, chapter_number, section_number,
-               page_start, page_end, chunk_index, 0,
-            )
-
-            log_entry = {
-               "chunk_id_candidate": candidate_id,
-               "reason": filter_reason,
-               "section_number": section_number,
-               "chapter_number": chapter_number,
-               "page_start": page_start,
-               "page_end": page_end,
-               "word_count": record.get('word_count', 0),
-            }
-            flog.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
-            continue
-
-         # ── Clean text ───────────────────────────────────────────────
-         cleaned = clean_text(text)
-
-         if not cleaned.strip():
-            stats['filtered'] += 1
-            filter_reasons['empty_after_cleaning'] += 1
-            continue
-
-         # ── Clean section title ──────────────────────────────────────
-         section_title_raw = record.get('section_title', '')
-         section_title_clean = clean_section_title(section_title_raw)
-
-         # ── Build provenance ─────────────────────────────────────────
-         page_types = get_page_types_in_range(
-            page_start, page_end, page_cls,
-            min_confidence=config.min_confidence,
-         )
-
-         provenance = {
-            "sectionswithtext_record": {
-               "chapter_number": chapter_number,
-               "section_number": section_number,
-               "chunk_index": chunk_index,
-               "page_start": page_start,
-               "page_end": page_end,
-            },
-            "page_types_in_range": page_types,
-         }
-
-         # ── Text flags ───────────────────────────────────────────────
-         contains_toc_phrase = bool(_TOC_PHRASE_RE.search(text))
-         lines = text.split('\n')
-         dot_leader_count = sum(1 for ln in lines if _DOT_LEADER_RE.search(ln))
-         looks_like_dot_leader_toc = dot_leader_count > config.max_dotleader_lines
-
-         # ── Subchunk ─────────────────────────────────────────────────
-         subchunks = subchunk_text(cleaned, config)
-         subchunk_total = len(subchunks)
-
-         for sub_idx, sub_text in enumerate(subchunks):
-            wc = _word_count(sub_text)
-
-            chunk_id = make_chunk_id(
-               rec_book_name, chapter_number, section_number,
-               page_start, page_end, chunk_index, sub_idx,
-            )
-
-            output_record = {
-               "chunk_id": chunk_id,
-               "book_name": rec_book_name,
-               "source_type": "textbook_content",
-               "chapter_number": chapter_number,
-               "chapter_title": record.get('chapter_title'),
-               "section_number": section_number,
-               "section_title": section_title_clean,
-               "page_start": page_start,
-               "page_end": page_end,
-               "parent_section_chunk_index": chunk_index,
-               "parent_section_total_chunks": record.get('total_chunks'),
-               "subchunk_index": sub_idx,
-               "subchunk_total": subchunk_total,
-               "text": sub_text,
-               "word_count": wc,
-               "flags": {
-                  "filtered_reason": None,
-                  "contains_toc_phrase": contains_toc_phrase,
-                  "looks_like_dot_leader_toc": looks_like_dot_leader_toc,
-               },
-               "provenance": provenance,
-            }
-
-            fout.write(json.dumps(output_record, ensure_ascii=False) + '\n')
-            stats['total_output'] += 1
-            total_output_words += wc
+   with open(chunks_path, 'wb', buffering=IO_BUFFER) as fout, \
+        open(logs_path, 'wb', buffering=IO_BUFFER) as flog:
+      for out_bytes, log_bytes, batch_stats, batch_reasons, batch_words in iter_corpus_batches(
+         lines, book_name, page_cls, config, workers,
+      ):
+         fout.write(out_bytes)
+         flog.write(log_bytes)
+         stats.update(batch_stats)
+         filter_reasons.update(batch_reasons)
+         total_output_words += batch_words
 
    # ── Summary ────────────────────────────────────────────────────────
    avg_words = (
@@ -682,6 +929,14 @@ def main():
       '--max-dotleader-lines', type=int, default=4,
       help="Max dot-leader lines before filtering (default: 4, filters at >= 5)",
    )
+   parser.add_argument(
+      '--workers', type=int, default=None,
+      help=f"Processes for large inputs (default: min(cpu_count, {MAX_CORPUS_WORKERS}); 1 = serial)",
+   )
+   parser.add_argument(
+      '--hash-chunk-ids', action='store_true',
+      help="Emit 32-char BLAKE2b digests as chunk_id (readable ID kept in provenance)",
+   )
    parser.add_argument(
       '--allow-page-types', default=None,
       help="Comma-separated page types to allow in content-only mode (e.g. 'toc,index')",
@@ -712,6 +967,7 @@ def main():
       hard_max_words=args.hard_max_words,
       max_dotleader_lines=args.max_dotleader_lines,
       allow_page_types=allow_page_types,
+      hash_chunk_ids=args.hash_chunk_ids,
    )
 
    print(f"Building content corpus...")
@@ -727,6 +983,7 @@ def main():
       out_root=out_root,
       book_name_override=args.book_name,
       config=config,
+      workers=args.workers if args.workers is not None else default_corpus_workers(),
    )
 
    print("\n✓ Done")
@@ -6,16 +6,19 @@ Output: textbook_index/<book>/index/
    - faiss.index
    - chunk_ids.npy
    - meta.jsonl
-   - bm25.pkl
+   - bm25.npz  (SimpleBM25 arrays)
+   - vectors.npy  (ivfpq/ivfsq8 only: float16 unit vectors for rescoring)
 """
 
+import os
 import json
 import re
-import pickle
+import base64
 import math
 from pathlib import Path
 from collections import Counter
-from typing import Dict, List, Any
+from itertools import chain
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 
 import numpy as np
 
@@ -24,18 +27,52 @@ try:
 except ImportError:
    faiss = None
 
-# Try rank_bm25, fall back to built-in SimpleBM25
 try:
-   from rank_bm25 import BM25Okapi
-   _HAS_RANK_BM25 = True
+   import orjson
 except ImportError:
-   _HAS_RANK_BM25 = False
+   orjson = None
 
+from legacy.jsonl_io import dumps_jsonl_line
 
-# Code-relevant symbols to preserve as tokens
-CODE_SYMBOLS = {"::","<<",">>","*","&","<",">","{","}","[","]","(",")","+","-","="}
+_loads = orjson.loads if orjson is not None else json.loads
 
-_SYMBOL_RE = re.compile(r'(::|<<|>>|[*&<>{}\[\]()+\-=])')
+
+# Read/write buffer for JSONL files: fewer syscalls on many small records
+IO_BUFFER = 1 << 20
+
+
+# Embedded-chunk field holding the vector as base64 little-endian float32
+# bytes; decodes without building a Python float per component
+EMBEDDING_B64_KEY = 'embedding_b64'
+
+
+def encode_embedding_b64(embedding: Iterable[float]) -> str:
+   """Encode a vector for the EMBEDDING_B64_KEY field."""
+   return base64.b64encode(np.asarray(embedding, dtype='<f4').tobytes()).decode('ascii')
+
+
+def decode_embedding(record: Dict) -> Optional[np.ndarray]:
+   """
+   Embedding of an embedded-chunk record as a float32 vector, or None.
+
+   Reads EMBEDDING_B64_KEY when present, the plain 'embedding' list otherwise.
+   """
+   b64 = record.get(EMBEDDING_B64_KEY)
+   if b64 is not None:
+      return np.frombuffer(base64.b64decode(b64), dtype='<f4')
+   embedding = record.get('embedding')
+   if embedding is None:
+      return None
+   return np.asarray(embedding, dtype=np.float32)
+
+
+# Code-relevant symbols to preserve as tokens (immutable: shared by
+# build_index and retrieve)
+CODE_SYMBOLS = frozenset({"::","<<",">>","*","&","<",">","{","}","[","]","(",")","+","-","="})
+
+# Words and code symbols in one alternation (symbols have no case, so the
+# whole text can be lowercased up front)
+_TOKEN_RE = re.compile(r'[a-zA-Z0-9_]+|::|<<|>>|[*&<>{}\[\]()+\-=]')
 
 
 def tokenize(text: str) -> List[str]:
@@ -43,58 +80,162 @@ def tokenize(text: str) -> List[str]:
    Tokenize text for BM25.
 
    Lowercases words but preserves code symbols like ::, <<, >>, *, &.
+   Tokens are returned in text order.
    """
-   symbols = _SYMBOL_RE.findall(text)
-   words = re.findall(r'[a-zA-Z0-9_]+', text.lower())
-   return words + symbols
+   return _TOKEN_RE.findall(text.lower())
+
+
+# BM25 index files inside index_dir: SimpleBM25 arrays, or (indexes built
+# before bm25.npz, read by Retriever only) a pickled model
+BM25_ARRAYS_FILE = "bm25.npz"
+BM25_PICKLE_FILE = "bm25.pkl"
+
+# Unit-normalized embeddings, kept beside quantized (ivfpq, ivfsq8) indexes
+# so Retriever can replace approximate scores with near-exact cosines. Stored
+# as float16: half the disk and page cache of float32, and for unit vectors
+# the cosine error is below 5e-4, far finer than the quantizer's own error
+VECTORS_FILE = "vectors.npy"
+VECTORS_DTYPE = np.float16
 
 
 class SimpleBM25:
    """
-   Simple BM25 Okapi implementation for when rank-bm25 is not installed.
+   BM25 Okapi over precomputed sparse postings (the BM25S approach).
 
    Parameters: k1=1.5, b=0.75.
+
+   Postings are stored CSR-style: term id t (its index in the sorted
+   vocabulary) owns doc_ids[indptr[t]:indptr[t+1]] with matching counts in
+   tfs. Each posting's query-independent tf/length factor is precomputed, so
+   scoring is one scaled vectorised add per query term over just the
+   documents containing it. save()/load() write the arrays to an .npz file
+   without pickling Python objects.
    """
 
-   def __init__(self, corpus: List[List[str]], k1: float = 1.5, b: float = 0.75):
+   def __init__(self, corpus: Iterable[List[str]], k1: float = 1.5, b: float = 0.75):
+      """
+      Build the index in one pass over corpus, which may be a generator:
+      token lists are counted and dropped, never kept.
+      """
       self.k1 = k1
       self.b = b
-      self.corpus = corpus
-      self.doc_count = len(corpus)
-      self.avgdl = sum(len(doc) for doc in corpus) / max(self.doc_count, 1)
 
-      self.df: Dict[str, int] = Counter()
-      for doc in corpus:
-         for term in set(doc):
-            self.df[term] += 1
+      doc_lens: List[int] = []
+
+      def tf_rows():
+         for doc in corpus:
+            doc_lens.append(len(doc))
+            yield Counter(doc)
+
+      self._set_postings(tf_rows())
+      self.doc_count = len(doc_lens)
+      self.doc_lens = np.asarray(doc_lens, dtype=np.int32)
+      self.avgdl = float(self.doc_lens.sum()) / max(self.doc_count, 1)
+      self._init_tf_weights()
+
+   def _set_postings(self, tf_rows: Iterable[Dict[str, int]]) -> None:
+      """Invert per-document term counts into the CSR arrays."""
+      doc_ids: Dict[str, List[int]] = {}
+      tfs: Dict[str, List[int]] = {}
+      for i, row in enumerate(tf_rows):
+         for term, tf in row.items():
+            if term not in doc_ids:
+               doc_ids[term] = []
+               tfs[term] = []
+            doc_ids[term].append(i)
+            tfs[term].append(tf)
+
+      terms = sorted(doc_ids)
+      self.vocab: Dict[str, int] = {term: t for t, term in enumerate(terms)}
+      self.indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+      np.cumsum([len(doc_ids[term]) for term in terms], out=self.indptr[1:])
+      nnz = int(self.indptr[-1])
+      self.doc_ids = np.fromiter(chain.from_iterable(doc_ids[t] for t in terms), dtype=np.int32, count=nnz)
+      self.tfs = np.fromiter(chain.from_iterable(tfs[t] for t in terms), dtype=np.int32, count=nnz)
+
+   def _init_tf_weights(self) -> None:
+      # Query-independent part of every posting's score:
+      # tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+      doc_lens = np.asarray(self.doc_lens, dtype=np.float64)
+      # avgdl is 0 when every document is empty; there are no postings then,
+      # so any divisor will do
+      len_norm = self.k1 * (1 - self.b + self.b * doc_lens / (self.avgdl or 1.0))
+      tf = self.tfs.astype(np.float64)
+      self._tf_weights = tf * (self.k1 + 1) / (tf + len_norm[self.doc_ids])
+
+   def __setstate__(self, state: Dict[str, Any]) -> None:
+      # bm25.pkl files from before the CSR layout hold one Counter per document
+      tf_rows = state.pop('tf', None)
+      for stale in ('df', 'corpus'):
+         state.pop(stale, None)
+      self.__dict__.update(state)
+      if tf_rows is not None:
+         self.doc_lens = np.asarray(self.doc_lens, dtype=np.int32)
+         self._set_postings(tf_rows)
+         self._init_tf_weights()
+
+   def save(self, path: Path) -> None:
+      """Write the index arrays to an .npz file (the vocabulary as newline-joined UTF-8)."""
+      terms = sorted(self.vocab, key=self.vocab.__getitem__)
+      np.savez(
+         path,
+         vocab=np.frombuffer('\n'.join(terms).encode('utf-8'), dtype=np.uint8),
+         indptr=self.indptr,
+         doc_ids=self.doc_ids,
+         tfs=self.tfs,
+         doc_lens=self.doc_lens,
+         params=np.array([self.k1, self.b], dtype=np.float64),
+      )
 
-      self.tf: List[Dict[str, int]] = []
-      self.doc_lens: List[int] = []
-      for doc in corpus:
-         self.tf.append(Counter(doc))
-         self.doc_lens.append(len(doc))
+   @classmethod
+   def load(cls, path: Path) -> "SimpleBM25":
+      """Read an index written by save(); no pickled objects are loaded."""
+      bm25 = cls.__new__(cls)
+      with np.load(path) as data:
+         vocab = data['vocab'].tobytes().decode('utf-8')
+         bm25.indptr = data['indptr']
+         bm25.doc_ids = data['doc_ids']
+         bm25.tfs = data['tfs']
+         bm25.doc_lens = data['doc_lens']
+         bm25.k1, bm25.b = (float(x) for x in data['params'])
+      # Tokens never contain whitespace, so '\n' is a safe separator
+      terms = vocab.split('\n') if len(bm25.indptr) > 1 else []
+      bm25.vocab = dict(zip(terms, range(len(terms))))
+      bm25.doc_count = len(bm25.doc_lens)
+      bm25.avgdl = float(bm25.doc_lens.sum()) / max(bm25.doc_count, 1)
+      bm25._init_tf_weights()
+      return bm25
 
    def get_scores(self, query: List[str]) -> np.ndarray:
       """Score all documents against the query. Returns array of scores."""
       scores = np.zeros(self.doc_count)
 
-      for term in query:
-         if term not in self.df:
+      # A repeated query term adds its contribution once per occurrence
+      for term, qtf in Counter(query).items():
+         t = self.vocab.get(term)
+         if t is None:
             continue
 
-         idf = math.log(
-            (self.doc_count - self.df[term] + 0.5) / (self.df[term] + 0.5) + 1.0
-         )
+         lo, hi = self.indptr[t], self.indptr[t + 1]
+         df = hi - lo
+         idf = math.log((self.doc_count - df + 0.5) / (df + 0.5) + 1.0)
 
-         for i in range(self.doc_count):
-            tf = self.tf[i].get(term, 0)
-            dl = self.doc_lens[i]
-            numerator = tf * (self.k1 + 1)
-            denominator = tf + self.k1 * (1 - self.b + self.b * dl / self.avgdl)
-            scores[i] += idf * numerator / denominator
+         # doc ids are unique within a posting list, so plain fancy-index add is safe
+         scores[self.doc_ids[lo:hi]] += (qtf * idf) * self._tf_weights[lo:hi]
 
       return scores
 
+   def match_counts(self, terms: Iterable[str]) -> np.ndarray:
+      """
+      For each document, how many of the given terms it contains (repeats in
+      terms count once): one bincount over the terms' posting lists.
+      """
+      ids = [self.vocab[term] for term in set(terms) if term in self.vocab]
+      if not ids:
+         return np.zeros(self.doc_count, dtype=np.int64)
+      postings = np.concatenate([self.doc_ids[self.indptr[t]:self.indptr[t + 1]] for t in ids])
+      return np.bincount(postings, minlength=self.doc_count)
+
    def get_top_n(self, query: List[str], n: int = 10) -> List[int]:
       """Return indices of top-n scoring documents."""
       scores = self.get_scores(query)
@@ -102,10 +243,124 @@ class SimpleBM25:
       return [int(i) for i in top_indices if scores[i] > 0]
 
 
+# FAISS index types for build_index(). "auto" keeps exact flat search for
+# small corpora and switches to HNSW at FLAT_MAX_VECTORS.
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivfpq", "ivfsq8")
+QUANTIZED_INDEX_TYPES = ("ivfpq", "ivfsq8")
+FLAT_MAX_VECTORS = 50_000
+
+HNSW_M = 32                  # graph neighbours per node
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+IVFPQ_NBITS = 8              # bits per PQ code (2**nbits centroids per sub-quantizer)
+IVFPQ_NPROBE = 16            # inverted lists visited per query (ivfpq and ivfsq8)
+
+
+def _pq_subquantizers(dim: int) -> int:
+   """Largest divisor of dim that is <= dim // 8 (PQ needs dim % m == 0)."""
+   for m in range(max(dim // 8, 1), 0, -1):
+      if dim % m == 0:
+         return m
+   return 1
+
+
+def faiss_gpu_count() -> int:
+   """GPUs visible to FAISS (0 with faiss-cpu)."""
+   if faiss is None or not hasattr(faiss, "StandardGpuResources"):
+      return 0
+   return faiss.get_num_gpus()
+
+
+def _train_and_add_on_gpu(index, emb_array: np.ndarray):
+   """
+   Train and fill a CPU IVF index on GPU 0 and return the CPU copy.
+
+   Returns None when the GPU build fails (e.g. a PQ layout the GPU kernels
+   do not support), so the caller can fall back to the CPU.
+   """
+   try:
+      res = faiss.StandardGpuResources()
+      gpu_index = faiss.index_cpu_to_gpu(res, 0, index)
+      gpu_index.train(emb_array)
+      gpu_index.add(emb_array)
+      return faiss.index_gpu_to_cpu(gpu_index)
+   except Exception:
+      return None
+
+
+def make_faiss_index(emb_array: np.ndarray, index_type: str = "auto", use_gpu: bool = True):
+   """
+   Build a populated inner-product FAISS index over unit-normalized rows.
+
+   Args:
+      emb_array:  float32 matrix of shape (n, dim), rows L2-normalized
+      index_type: "flat" (exact), "hnsw" (graph, ~log n search),
+                  "ivfpq" (8-bit product-quantized codes, trained on emb_array),
+                  "ivfsq8" (one int8 code per dimension, trained on emb_array),
+                  or "auto" (flat below FLAT_MAX_VECTORS rows, hnsw above)
+      use_gpu:    Train and fill ivfpq/ivfsq8 on a GPU when FAISS sees one. Flat adds
+                  are a memcpy and FAISS has no GPU HNSW, so those stay on CPU.
+
+   Returns:
+      (faiss index, resolved index type)
+   """
+   if index_type not in INDEX_TYPES:
+      raise ValueError(
+         f"Unknown index type: {index_type!r}. Choose from: {', '.join(INDEX_TYPES)}"
+      )
+
+   n, dim = emb_array.shape
+   if index_type == "auto":
+      index_type = "flat" if n < FLAT_MAX_VECTORS else "hnsw"
+
+   if index_type == "flat":
+      index = faiss.IndexFlatIP(dim)
+   elif index_type == "hnsw":
+      index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+      index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+      index.hnsw.efSearch = HNSW_EF_SEARCH
+   else:
+      # FAISS k-means wants >= 39 training points per centroid. SQ8 only
+      # learns per-dimension ranges, so the coarse quantizer sets its floor.
+      min_train = 39 * 2 ** IVFPQ_NBITS if index_type == "ivfpq" else 39
+      if n < min_train:
+         raise ValueError(
+            f"{index_type} needs at least {min_train} embedded chunks to train, got {n}. "
+            f"Use --index-type flat for small corpora."
+         )
+      # ~4*sqrt(n) lists, but keep >= 39 training points per list
+      nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+      quantizer = faiss.IndexFlatIP(dim)
+      if index_type == "ivfpq":
+         index = faiss.IndexIVFPQ(
+            quantizer, dim, nlist, _pq_subquantizers(dim), IVFPQ_NBITS,
+            faiss.METRIC_INNER_PRODUCT,
+         )
+      else:
+         # One byte per dimension: 4x smaller than float32 rows
+         index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit,
+            faiss.METRIC_INNER_PRODUCT,
+         )
+      # k-means and quantizer training dominate the build; the saved index
+      # is the CPU copy either way
+      gpu_built = _train_and_add_on_gpu(index, emb_array) if use_gpu and faiss_gpu_count() else None
+      if gpu_built is not None:
+         gpu_built.nprobe = min(IVFPQ_NPROBE, nlist)
+         return gpu_built, index_type
+      index.train(emb_array)
+      index.nprobe = min(IVFPQ_NPROBE, nlist)
+
+   index.add(emb_array)
+   return index, index_type
+
+
 def build_index(
    embedded_path: Path,
    index_dir: Path,
    verbose: bool = True,
+   index_type: str = "auto",
+   use_gpu: bool = True,
 ) -> Dict[str, Any]:
    """
    Build FAISS vector index + BM25 index from embedded chunks.
@@ -114,36 +369,49 @@ def build_index(
       embedded_path: Path to chunks_content_embedded.jsonl
       index_dir:     Output directory for index files
       verbose:       Print progress
+      index_type:    FAISS index type, see make_faiss_index()
+      use_gpu:       Let make_faiss_index() train on a GPU when one is visible
 
    Returns:
-      Stats dict with total_chunks, embedding_dim, index_dir
+      Stats dict with total_chunks, embedding_dim, index_type, index_dir
    """
    if faiss is None:
       raise ImportError(
          "faiss-cpu is required. Install with: pip install faiss-cpu"
       )
+   if index_type not in INDEX_TYPES:
+      raise ValueError(
+         f"Unknown index type: {index_type!r}. Choose from: {', '.join(INDEX_TYPES)}"
+      )
 
    index_dir.mkdir(parents=True, exist_ok=True)
 
    chunk_ids: List[str] = []
-   embeddings: List[List[float]] = []
    meta_records: List[Dict] = []
-   token_corpus: List[List[str]] = []
 
-   with open(embedded_path, 'r', encoding='utf-8') as f:
+   # Embedding rows go straight into one float32 matrix. Non-blank lines bound
+   # the row count; it is allocated once the first embedding gives the dim.
+   with open(embedded_path, 'rb', buffering=IO_BUFFER) as f:
+      max_rows = sum(1 for line in f if line.strip())
+   emb_array = None
+
+   with open(embedded_path, 'rb', buffering=IO_BUFFER) as f:
       for line in f:
          line = line.strip()
          if not line:
             continue
 
-         record = json.loads(line)
-         embedding = record.get('embedding')
+         record = _loads(line)
+         embedding = decode_embedding(record)
          if embedding is None:
             continue
 
+         if emb_array is None:
+            emb_array = np.empty((max_rows, len(embedding)), dtype=np.float32)
+         emb_array[len(chunk_ids)] = embedding
+
          chunk_id = record['chunk_id']
          chunk_ids.append(chunk_id)
-         embeddings.append(embedding)
 
          meta_records.append({
             'chunk_id': chunk_id,
@@ -158,46 +426,60 @@ def build_index(
             'text': record.get('text', ''),
          })
 
-         token_corpus.append(tokenize(record.get('text', '')))
-
    if not chunk_ids:
       raise ValueError(f"No embedded chunks found in {embedded_path}")
 
-   # Build FAISS index (cosine sim via inner product on unit vectors)
-   dim = len(embeddings[0])
-   emb_array = np.array(embeddings, dtype=np.float32)
-
-   norms = np.linalg.norm(emb_array, axis=1, keepdims=True)
-   norms[norms == 0] = 1.0
-   emb_array = emb_array / norms
+   # Build FAISS index (cosine sim via inner product on unit vectors).
+   # Leading rows of a C-contiguous array stay contiguous; normalize_L2
+   # works in place and leaves zero vectors as they are.
+   emb_array = emb_array[:len(chunk_ids)]
+   dim = emb_array.shape[1]
+   faiss.normalize_L2(emb_array)
 
-   faiss_index = faiss.IndexFlatIP(dim)
-   faiss_index.add(emb_array)
+   faiss_index, index_type = make_faiss_index(emb_array, index_type, use_gpu=use_gpu)
 
    # Build BM25 index
-   if _HAS_RANK_BM25:
-      bm25 = BM25Okapi(token_corpus)
+   # Texts are already held in meta_records; SimpleBM25 tokenizes them one at
+   # a time instead of keeping a second, tokenized copy of the corpus
+   bm25 = SimpleBM25(tokenize(m['text']) for m in meta_records)
+
+   # Save. Retriever memory-maps faiss.index and meta.jsonl, so each file is
+   # written beside its target and renamed over it: a running reader keeps
+   # its mapping of the old file instead of seeing it truncated, and never
+   # loads a half-written chunk_ids.npy.
+   tmp_index = index_dir / "faiss.index.tmp"
+   faiss.write_index(faiss_index, str(tmp_index))
+   os.replace(tmp_index, index_dir / "faiss.index")
+
+   tmp_ids = index_dir / "chunk_ids.npy.tmp"
+   with open(tmp_ids, 'wb') as f:
+      np.save(f, np.array(chunk_ids))
+   os.replace(tmp_ids, index_dir / "chunk_ids.npy")
+
+   # Exact vectors only where FAISS scores are approximate
+   if index_type in QUANTIZED_INDEX_TYPES:
+      tmp_vecs = index_dir / (VECTORS_FILE + ".tmp")
+      with open(tmp_vecs, 'wb') as f:
+         np.save(f, emb_array.astype(VECTORS_DTYPE))
+      os.replace(tmp_vecs, index_dir / VECTORS_FILE)
    else:
-      bm25 = SimpleBM25(token_corpus)
-
-   # Save
-   faiss.write_index(faiss_index, str(index_dir / "faiss.index"))
-   np.save(str(index_dir / "chunk_ids.npy"), np.array(chunk_ids))
+      (index_dir / VECTORS_FILE).unlink(missing_ok=True)
 
-   with open(index_dir / "meta.jsonl", 'w', encoding='utf-8') as f:
+   tmp_meta = index_dir / "meta.jsonl.tmp"
+   with open(tmp_meta, 'wb', buffering=IO_BUFFER) as f:
       for m in meta_records:
-         f.write(json.dumps(m, ensure_ascii=False) + '\n')
+         f.write(dumps_jsonl_line(m))
+   os.replace(tmp_meta, index_dir / "meta.jsonl")
 
-   with open(index_dir / "bm25.pkl", 'wb') as f:
-      pickle.dump({
-         'bm25': bm25,
-         'token_corpus': token_corpus,
-         'chunk_ids': chunk_ids,
-      }, f)
+   # Only one BM25 file may exist: drop a bm25.pkl left by an older build
+   bm25_path = index_dir / BM25_ARRAYS_FILE
+   bm25.save(bm25_path)
+   (index_dir / BM25_PICKLE_FILE).unlink(missing_ok=True)
 
    stats = {
       'total_chunks': len(chunk_ids),
       'embedding_dim': dim,
+      'index_type': index_type,
       'index_dir': str(index_dir),
    }
 
@@ -206,8 +488,9 @@ def build_index(
       print("-" * 50)
       print(f"  Chunks indexed:  {stats['total_chunks']}")
       print(f"  Embedding dim:   {stats['embedding_dim']}")
+      print(f"  Index type:      {stats['index_type']}")
       print(f"  FAISS index:     {index_dir / 'faiss.index'}")
-      print(f"  BM25 index:      {index_dir / 'bm25.pkl'}")
+      print(f"  BM25 index:      {bm25_path}")
       print(f"  Metadata:        {index_dir / 'meta.jsonl'}")
       print("-" * 50)
 
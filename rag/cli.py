@@ -8,12 +8,13 @@ Usage:
 import sys
 import argparse
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from rag.retrieve import Retriever
-from rag.embedding_client import DummyHashEmbeddingClient, ExternalEmbeddingClient
+if TYPE_CHECKING:
+   from rag.retrieve import Retriever
 
 
-def run_cli(retriever: Retriever, top_k: int = 5) -> None:
+def run_cli(retriever: "Retriever", top_k: int = 5) -> None:
    """Run interactive query loop."""
 
    print("\n" + "=" * 70)
@@ -52,7 +53,7 @@ def run_cli(retriever: Retriever, top_k: int = 5) -> None:
             print(f"Section {meta.get('section_number')}: {meta.get('section_title', '')}")
             print(f"Pages: {meta.get('page_start')}-{meta.get('page_end')}")
             print(f"{'=' * 70}")
-            print(meta.get('text', '(no text)'))
+            print(retriever.get_text(chunk_id) or '(no text)')
             print(f"{'=' * 70}")
          else:
             print(f"  Chunk not found: {chunk_id}")
@@ -108,6 +109,10 @@ def main():
       print(f"Run scripts/build_index.py first.")
       sys.exit(1)
 
+   # Deferred so --help and a missing index exit before faiss/numpy load
+   from rag.retrieve import Retriever
+   from rag.embedding_client import DummyHashEmbeddingClient, ExternalEmbeddingClient
+
    if args.client == 'dummy':
       client = DummyHashEmbeddingClient(dim=args.dim)
    else:
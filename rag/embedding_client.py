@@ -5,21 +5,42 @@ Provides:
   - EmbeddingClient: Protocol for embedding text into vectors.
   - DummyHashEmbeddingClient: Deterministic hash-based embeddings for testing.
   - ExternalEmbeddingClient: Stub for real embedding providers.
+  - embed_texts: Batch embedding for any client.
 """
 from __future__ import annotations
 
 import hashlib
-import math
 import os
-from typing import Protocol, runtime_checkable
+from collections import OrderedDict
+from typing import Dict, Protocol, Sequence, runtime_checkable
+
+import numpy as np
+
+try:
+   import httpx
+except ImportError:
+   httpx = None
+
+# HTTP/2 in httpx needs the optional h2 package
+try:
+   import h2
+except ImportError:
+   h2 = None
+
+# Texts whose vectors ExternalEmbeddingClient keeps (repeated queries are free)
+EMBED_CACHE_SIZE = 4096
 
 
 @runtime_checkable
 class EmbeddingClient(Protocol):
    """Protocol for embedding text into fixed-dimensional vectors."""
 
-   def embed(self, text: str) -> list[float]:
-      """Embed a single text string into a vector."""
+   def embed(self, text: str) -> np.ndarray:
+      """Embed a single text string into a float32 vector of shape (dim,)."""
+      ...
+
+   def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+      """Embed several texts into a float32 matrix of shape (len(texts), dim)."""
       ...
 
    @property
@@ -36,7 +57,8 @@ class DummyHashEmbeddingClient:
    similarity. Use ONLY for testing pipeline mechanics (index building,
    retrieval plumbing, etc.).
 
-   Vectors are normalized to unit length.
+   Vectors are normalized to unit length. Each component comes from 4 bytes
+   of one SHAKE-128 digest of the text, read as a signed int32.
    """
 
    def __init__(self, dim: int = 64):
@@ -46,50 +68,124 @@ class DummyHashEmbeddingClient:
    def dim(self) -> int:
       return self._dim
 
-   def embed(self, text: str) -> list[float]:
-      h = hashlib.sha256(text.encode('utf-8')).digest()
-
-      raw: list[float] = []
-      for i in range(self._dim):
-         seed = hashlib.md5(h + i.to_bytes(4, 'little')).digest()
-         val = int.from_bytes(seed[:4], 'little', signed=True) / (2**31)
-         raw.append(val)
+   def embed(self, text: str) -> np.ndarray:
+      buf = hashlib.shake_128(text.encode('utf-8')).digest(4 * self._dim)
+      raw = np.frombuffer(buf, dtype='<i4') / 2**31
 
       # L2 normalize
-      norm = math.sqrt(sum(x * x for x in raw))
+      norm = np.linalg.norm(raw)
       if norm > 0:
-         raw = [x / norm for x in raw]
+         raw /= norm
 
-      return raw
+      return raw.astype(np.float32)
+
+   def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+      # One digest per text, then decode and normalize all rows at once
+      buf = b''.join(
+         hashlib.shake_128(text.encode('utf-8')).digest(4 * self._dim) for text in texts
+      )
+      raw = np.frombuffer(buf, dtype='<i4').reshape(len(texts), self._dim) / 2**31
+
+      norms = np.linalg.norm(raw, axis=1, keepdims=True)
+      norms[norms == 0] = 1.0
+      return (raw / norms).astype(np.float32)
 
 
 class ExternalEmbeddingClient:
    """
    Stub for external embedding providers (OpenAI, Anthropic, local models).
 
-   Set EMBEDDING_PROVIDER env var to your provider name and implement the
-   embed() method for your chosen provider.
+   Set EMBEDDING_PROVIDER env var to your provider name and implement
+   _embed_uncached() for your chosen provider, sending requests through
+   self.http (one keep-alive httpx.Client, HTTP/2 when h2 is installed).
+
+   embed() and embed_batch() answer repeated texts from an LRU cache of
+   cache_size vectors and send each batch's misses in a single
+   _embed_uncached() call.
 
    Example providers: 'openai', 'sentence-transformers', 'local'.
    """
 
-   def __init__(self, dim: int = 1536):
+   def __init__(self, dim: int = 1536, cache_size: int = EMBED_CACHE_SIZE):
       self._dim = dim
       provider = os.environ.get('EMBEDDING_PROVIDER', '')
       if not provider:
          raise NotImplementedError(
             "ExternalEmbeddingClient requires EMBEDDING_PROVIDER env var.\n"
             "Set it to your provider name (e.g. 'openai') and implement\n"
-            "the embed() method in rag/embedding_client.py."
+            "_embed_uncached() in rag/embedding_client.py."
          )
       self._provider = provider
+      self._http = None
+      self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+      self._cache_size = cache_size
 
    @property
    def dim(self) -> int:
       return self._dim
 
-   def embed(self, text: str) -> list[float]:
+   @property
+   def http(self):
+      """Shared httpx.Client for provider requests, created on first use."""
+      if self._http is None:
+         if httpx is None:
+            raise ImportError("httpx is required for ExternalEmbeddingClient. Install with: pip install httpx")
+         self._http = httpx.Client(http2=h2 is not None, timeout=30.0)
+      return self._http
+
+   def close(self) -> None:
+      """Close the HTTP connection pool."""
+      if self._http is not None:
+         self._http.close()
+         self._http = None
+
+   def embed(self, text: str) -> np.ndarray:
+      return self.embed_batch([text])[0]
+
+   def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+      found: Dict[str, np.ndarray] = {}
+      for text in texts:
+         vec = self._cache.get(text)
+         if vec is not None:
+            self._cache.move_to_end(text)
+            found[text] = vec
+
+      misses = [text for text in dict.fromkeys(texts) if text not in found]
+      if misses:
+         vecs = np.asarray(self._embed_uncached(misses), dtype=np.float32)
+         for text, vec in zip(misses, vecs):
+            # Cached rows are shared between callers, so keep them read-only
+            vec.setflags(write=False)
+            found[text] = vec
+            self._cache[text] = vec
+         while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+      if not texts:
+         return np.empty((0, self._dim), dtype=np.float32)
+      return np.stack([found[text] for text in texts])
+
+   def _embed_uncached(self, texts: Sequence[str]) -> np.ndarray:
+      """
+      Provider call: embed texts (distinct, not cached) as a (len(texts), dim)
+      array. Send them in one request where the provider has a batch
+      endpoint (e.g. OpenAI's list input).
+      """
       raise NotImplementedError(
          f"Embedding for provider '{self._provider}' not yet implemented.\n"
-         f"Add your API call logic in ExternalEmbeddingClient.embed()."
+         f"Add your API call logic in ExternalEmbeddingClient._embed_uncached()."
       )
+
+
+def embed_texts(client, texts: Sequence[str]) -> np.ndarray:
+   """
+   Embed texts as a (len(texts), dim) float32 matrix.
+
+   Uses client.embed_batch() when the client has one, and stacks per-text
+   embed() calls otherwise.
+   """
+   if hasattr(client, 'embed_batch'):
+      return client.embed_batch(texts)
+   if not texts:
+      return np.empty((0, client.dim), dtype=np.float32)
+   return np.stack([np.asarray(client.embed(t), dtype=np.float32) for t in texts])
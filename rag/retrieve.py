@@ -9,11 +9,14 @@ Scoring:
 Diversity: max 3 chunks per (chapter_number, section_number).
 """
 
+import os
 import json
+import mmap
 import pickle
+import threading
 from pathlib import Path
-from collections import defaultdict
-from typing import Dict, List, Optional, Any
+from itertools import chain
+from typing import Dict, FrozenSet, List, Optional, Any, Tuple
 
 import numpy as np
 
@@ -22,14 +25,56 @@ try:
 except ImportError:
    faiss = None
 
-from rag.build_index import tokenize, CODE_SYMBOLS
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+from rag.embedding_client import embed_texts
+from rag.build_index import (
+   tokenize, CODE_SYMBOLS, SimpleBM25, BM25_ARRAYS_FILE, BM25_PICKLE_FILE, VECTORS_FILE,
+)
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+_EMPTY_TOKENS: FrozenSet[str] = frozenset()
+
+
+def _read_faiss_index(path: Path):
+   """
+   Open a FAISS index memory-mapped and read-only, so vector storage is
+   paged in from the OS page cache (shared across processes) on demand.
+   Falls back to reading it into memory if this FAISS build or index type
+   cannot be mapped.
+   """
+   # IO_FLAG_MMAP_IFC also maps flat vector storage (FAISS >= 1.10)
+   mmap_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+   try:
+      return faiss.read_index(str(path), mmap_flag | faiss.IO_FLAG_READ_ONLY)
+   except RuntimeError:
+      return faiss.read_index(str(path))
+
+
+def _load_chunk_ids(path: Path) -> List[str]:
+   """
+   chunk_ids.npy as a list of str. Current builds store a fixed-width string
+   array, read without unpickling; object arrays from older builds still
+   need allow_pickle. Not memory-mapped: every ID becomes a Python str for
+   the BM25 row map anyway.
+   """
+   try:
+      ids = np.load(str(path))
+   except ValueError:
+      ids = np.load(str(path), allow_pickle=True)
+   return ids.tolist()
 
 
 class Retriever:
    """
    Hybrid retriever combining dense (FAISS) and sparse (BM25) search.
 
-   Requires an index directory produced by build_index().
+   Requires an index directory produced by build_index(). self.meta maps
+   chunk_id to its metadata without the text; use get_text() for that.
    """
 
    def __init__(self, index_dir: Path, embedding_client=None):
@@ -47,28 +92,92 @@ class Retriever:
       self.client = embedding_client
 
       # Load FAISS index
-      self.faiss_index = faiss.read_index(str(self.index_dir / "faiss.index"))
+      self.faiss_index = _read_faiss_index(self.index_dir / "faiss.index")
 
       # Load chunk IDs
-      self.chunk_ids: List[str] = list(
-         np.load(str(self.index_dir / "chunk_ids.npy"), allow_pickle=True)
+      self.chunk_ids: List[str] = _load_chunk_ids(self.index_dir / "chunk_ids.npy")
+
+      # Load BM25: SimpleBM25 arrays (rows follow chunk_ids.npy), or a pickled model
+      bm25_arrays = self.index_dir / BM25_ARRAYS_FILE
+      if bm25_arrays.exists():
+         self.bm25 = SimpleBM25.load(bm25_arrays)
+         self.bm25_chunk_ids: List[str] = self.chunk_ids
+      else:
+         with open(self.index_dir / BM25_PICKLE_FILE, 'rb') as f:
+            bm25_data = pickle.load(f)
+            self.bm25 = bm25_data['bm25']
+            self.bm25_chunk_ids = bm25_data['chunk_ids']
+
+      # SimpleBM25 postings are the chunks' token sets in inverted form: query
+      # term overlaps are counted from them, no per-chunk sets needed. Other
+      # (pickled) BM25 models fall back to one token set per chunk.
+      self._use_postings = isinstance(self.bm25, SimpleBM25)
+      self._bm25_rows: Dict[str, int] = {cid: i for i, cid in enumerate(self.bm25_chunk_ids)}
+
+      # Load metadata. Only the small fields stay in self.meta; chunk text is
+      # read back from the memory-mapped meta.jsonl by byte span (get_text).
+      self.meta: Dict[str, Dict] = {}
+      self._text_spans: Dict[str, Tuple[int, int]] = {}
+      self._chunk_token_sets: Dict[str, FrozenSet[str]] = {}
+      # (chapter_number, section_number) of each chunk as a small int, for
+      # the diversity cap
+      self._section_keys: Dict[str, int] = {}
+      section_ids: Dict[tuple, int] = {}
+
+      # The open mapping pins this meta.jsonl even if a rebuild replaces it
+      self._meta_file = open(self.index_dir / "meta.jsonl", 'rb')
+      size = os.fstat(self._meta_file.fileno()).st_size
+      # mmap cannot map an empty file
+      self._meta_mm = mmap.mmap(self._meta_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+      start = 0
+      while start < size:
+         end = self._meta_mm.find(b'\n', start)
+         if end < 0:
+            end = size
+         line = self._meta_mm[start:end]
+         if line.strip():
+            record = _loads(line)
+            cid = record['chunk_id']
+            text = record.pop('text', '')
+            self.meta[cid] = record
+            section = (record.get('chapter_number'), record.get('section_number'))
+            self._section_keys[cid] = section_ids.setdefault(section, len(section_ids))
+            self._text_spans[cid] = (start, end)
+            if not self._use_postings:
+               # Empty texts share one empty set
+               self._chunk_token_sets[cid] = frozenset(tokenize(text)) if text else _EMPTY_TOKENS
+         start = end + 1
+
+      # Unit vectors (memory-mapped, float16) when the index is quantized
+      vectors_path = self.index_dir / VECTORS_FILE
+      self._doc_vecs: Optional[np.ndarray] = (
+         np.load(str(vectors_path), mmap_mode='r') if vectors_path.exists() else None
       )
 
-      # Load metadata
-      self.meta: Dict[str, Dict] = {}
-      with open(self.index_dir / "meta.jsonl", 'r', encoding='utf-8') as f:
-         for line in f:
-            line = line.strip()
-            if not line:
-               continue
-            record = json.loads(line)
-            self.meta[record['chunk_id']] = record
-
-      # Load BM25
-      with open(self.index_dir / "bm25.pkl", 'rb') as f:
-         bm25_data = pickle.load(f)
-         self.bm25 = bm25_data['bm25']
-         self.bm25_chunk_ids: List[str] = bm25_data['chunk_ids']
+      # Per-thread FAISS search output buffers, reused across queries
+      self._search_local = threading.local()
+
+   def get_text(self, chunk_id: str) -> Optional[str]:
+      """Full text of a chunk, decoded from meta.jsonl on demand (None if unknown)."""
+      span = self._text_spans.get(chunk_id)
+      if span is None:
+         return None
+      return _loads(self._meta_mm[span[0]:span[1]]).get('text', '')
+
+   def _search_buffers(self, nq: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+      """(distances, labels) arrays of shape (nq, k) for faiss search(), reused per thread."""
+      bufs = getattr(self._search_local, 'bufs', None)
+      if bufs is None or bufs[0].shape != (nq, k):
+         bufs = (np.empty((nq, k), dtype=np.float32), np.empty((nq, k), dtype=np.int64))
+         self._search_local.bufs = bufs
+      return bufs
+
+   def close(self) -> None:
+      """Release the meta.jsonl mapping."""
+      if isinstance(self._meta_mm, mmap.mmap):
+         self._meta_mm.close()
+      self._meta_file.close()
 
    def retrieve(
       self,
@@ -91,85 +200,168 @@ class Retriever:
       Returns:
          List of result dicts with chunk_id, score, metadata, text
       """
-      query_tokens = tokenize(query)
-      query_token_set = set(query_tokens)
-      query_symbols = query_token_set & CODE_SYMBOLS
-
-      # --- Vector search ---
       vector_scores: Dict[str, float] = {}
       if self.client is not None:
-         query_vec = np.array([self.client.embed(query)], dtype=np.float32)
-         norm = np.linalg.norm(query_vec)
-         if norm > 0:
-            query_vec = query_vec / norm
+         # embed() returns a (dim,) float32 array; asarray is then a no-op view
+         query_vec = np.asarray(self.client.embed(query), dtype=np.float32).reshape(1, -1)
+         vector_scores = self._vector_search(query_vec, vector_top_k)[0]
 
-         k = min(vector_top_k, len(self.chunk_ids))
-         scores, indices = self.faiss_index.search(query_vec, k)
+      return self._rank(query, vector_scores, bm25_top_k, final_k, max_per_section)
+
+   def retrieve_batch(
+      self,
+      queries: List[str],
+      vector_top_k: int = 50,
+      bm25_top_k: int = 50,
+      final_k: int = 10,
+      max_per_section: int = 3,
+   ) -> List[List[Dict[str, Any]]]:
+      """
+      retrieve() for several queries: one batched embedding call and one
+      FAISS search over all query vectors (FAISS spreads the queries over
+      its OpenMP threads), then BM25 and reranking per query.
 
-         for score, idx in zip(scores[0], indices[0]):
-            if idx < 0:
-               continue
-            vector_scores[self.chunk_ids[idx]] = float(score)
+      Returns:
+         One result list per query, in query order
+      """
+      vector_scores: List[Dict[str, float]] = [{} for _ in queries]
+      if self.client is not None and queries:
+         vector_scores = self._vector_search(embed_texts(self.client, queries), vector_top_k)
+
+      return [
+         self._rank(query, scores, bm25_top_k, final_k, max_per_section)
+         for query, scores in zip(queries, vector_scores)
+      ]
+
+   def _vector_search(self, query_vecs: np.ndarray, vector_top_k: int) -> List[Dict[str, float]]:
+      """Cosine scores of the top vector_top_k chunks for each row of query_vecs."""
+      query_vecs = np.asarray(query_vecs, dtype=np.float32)
+      norms = np.linalg.norm(query_vecs, axis=1, keepdims=True)
+      norms[norms == 0] = 1.0
+      query_vecs = query_vecs / norms
+
+      nq = len(query_vecs)
+      k = min(vector_top_k, len(self.chunk_ids))
+      D, I = self._search_buffers(nq, k)
+      scores, indices = self.faiss_index.search(query_vecs, k, D=D, I=I)
+
+      vector_scores: List[Dict[str, float]] = []
+      for q, row_scores, row_indices in zip(query_vecs, scores, indices):
+         # FAISS pads missing hits with -1
+         found = row_indices >= 0
+         hit_rows = row_indices[found]
+         if self._doc_vecs is not None:
+            # Quantized index: rescore its hits from the stored vectors, one
+            # gather + matrix-vector product over the k rows, in float32
+            hit_scores = self._doc_vecs[hit_rows].astype(np.float32, copy=False) @ q
+         else:
+            hit_scores = row_scores[found]
+         # tolist() unboxes the whole row at once
+         vector_scores.append(dict(zip(
+            [self.chunk_ids[i] for i in hit_rows.tolist()], hit_scores.tolist(),
+         )))
+      return vector_scores
+
+   def _rank(
+      self,
+      query: str,
+      vector_scores: Dict[str, float],
+      bm25_top_k: int,
+      final_k: int,
+      max_per_section: int,
+   ) -> List[Dict[str, Any]]:
+      """BM25 search, blend with vector_scores, rerank and apply the diversity cap."""
+      # One tokenization serves BM25 and the overlap features. BM25 gets the
+      # list with repeats: both SimpleBM25 and rank_bm25 weight a term by how
+      # often it occurs in the query. It must also match the index-time
+      # tokenizer exactly, so the query is not normalized any further.
+      query_tokens = tokenize(query)
+      query_token_set = frozenset(query_tokens)
+      query_symbols = query_token_set & CODE_SYMBOLS
 
       # --- BM25 search ---
-      bm25_scores_raw = self.bm25.get_scores(query_tokens)
-      bm25_top_indices = np.argsort(bm25_scores_raw)[::-1][:bm25_top_k]
-
-      bm25_max = float(max(bm25_scores_raw)) if len(bm25_scores_raw) > 0 else 1.0
+      bm25_scores_raw = np.asarray(self.bm25.get_scores(query_tokens))
+      # Partial selection of the top k (O(n)), then sort only those k
+      k = min(bm25_top_k, len(bm25_scores_raw))
+      if k > 0:
+         part = np.argpartition(bm25_scores_raw, -k)[-k:]
+         bm25_top_indices = part[np.argsort(-bm25_scores_raw[part])]
+         # The best score overall is the first of the sorted top k
+         bm25_max = float(bm25_scores_raw[bm25_top_indices[0]])
+      else:
+         bm25_top_indices = np.empty(0, dtype=np.intp)
+         bm25_max = 1.0
       if bm25_max == 0:
          bm25_max = 1.0
 
-      bm25_scores: Dict[str, float] = {}
-      for idx in bm25_top_indices:
-         idx = int(idx)
-         if bm25_scores_raw[idx] <= 0:
-            continue
-         bm25_scores[self.bm25_chunk_ids[idx]] = float(bm25_scores_raw[idx]) / bm25_max
-
-      # --- Union candidates ---
-      all_candidates = set(vector_scores.keys()) | set(bm25_scores.keys())
-
-      # --- Score each candidate ---
-      scored: List[Dict[str, Any]] = []
-      for cid in all_candidates:
-         cosine = vector_scores.get(cid, 0.0)
-
-         meta = self.meta.get(cid, {})
-         chunk_tokens = set(tokenize(meta.get('text', '')))
-
-         # Token overlap
-         overlap = len(query_token_set & chunk_tokens)
-         token_overlap = overlap / max(len(query_token_set), 1)
-
-         # Symbol overlap
-         chunk_symbols = chunk_tokens & CODE_SYMBOLS
+      # Positive hits only, normalized in one vector op and unboxed by tolist()
+      top_raw = bm25_scores_raw[bm25_top_indices]
+      positive = top_raw > 0
+      bm25_scores: Dict[str, float] = dict(zip(
+         [self.bm25_chunk_ids[i] for i in bm25_top_indices[positive].tolist()],
+         (top_raw[positive] / bm25_max).tolist(),
+      ))
+
+      # --- Union candidates (vector hits first, then BM25-only ones) ---
+      # Hits without a meta.jsonl record have nothing to score or return
+      candidates = [
+         cid for cid in dict.fromkeys(chain(vector_scores, bm25_scores)) if cid in self.meta
+      ]
+      n = len(candidates)
+
+      # --- Score all candidates as parallel arrays ---
+      cosine = np.fromiter((vector_scores.get(cid, 0.0) for cid in candidates), np.float64, n)
+      # query_symbols is a subset of CODE_SYMBOLS, so matching it against a
+      # chunk's full token set gives the symbol overlap directly; the scan is
+      # skipped for prose queries, which have no symbols at all.
+      if self._use_postings:
+         rows = np.fromiter((self._bm25_rows[cid] for cid in candidates), np.int64, n)
+         # Each query term's postings are read once: symbol hits are counted
+         # first and then added into the token hits
+         sym_hits = self.bm25.match_counts(query_symbols)[rows] if query_symbols else np.zeros(n)
+         token_hits = self.bm25.match_counts(query_token_set - query_symbols)[rows] + sym_hits
+      else:
+         token_sets = [self._chunk_token_sets[cid] for cid in candidates]
+         token_hits = np.fromiter(
+            (len(query_token_set & tokens) for tokens in token_sets), np.float64, n,
+         )
          if query_symbols:
-            sym_overlap = len(query_symbols & chunk_symbols) / len(query_symbols)
+            sym_hits = np.fromiter(
+               (len(query_symbols & tokens) for tokens in token_sets), np.float64, n,
+            )
          else:
-            sym_overlap = 0.0
-
-         score = 0.65 * cosine + 0.25 * token_overlap + 0.10 * sym_overlap
+            sym_hits = np.zeros(n)
+      token_overlap = token_hits / max(len(query_token_set), 1)
+      sym_overlap = sym_hits / max(len(query_symbols), 1)
 
-         scored.append({
-            'chunk_id': cid,
-            'score': score,
-            'cosine': cosine,
-            'token_overlap': token_overlap,
-            'symbol_overlap': sym_overlap,
-            **meta,
-         })
-
-      scored.sort(key=lambda x: x['score'], reverse=True)
+      score = 0.65 * cosine + 0.25 * token_overlap + 0.10 * sym_overlap
+      order = np.argsort(-score, kind='stable')
 
-      # --- Diversity filter ---
-      section_counts: Dict[tuple, int] = defaultdict(int)
+      # --- Diversity filter; result dicts only for the survivors ---
+      # Walk candidates best-first until final_k pass the per-section cap
+      section_counts: Dict[int, int] = {}
       results: List[Dict[str, Any]] = []
 
-      for item in scored:
-         key = (item.get('chapter_number'), item.get('section_number'))
-         if section_counts[key] >= max_per_section:
+      for i in order.tolist():
+         cid = candidates[i]
+         key = self._section_keys[cid]
+         count = section_counts.get(key, 0)
+         if count >= max_per_section:
             continue
-         section_counts[key] += 1
+         section_counts[key] = count + 1
+
+         meta = self.meta[cid]
+         item = {
+            'chunk_id': cid,
+            'score': float(score[i]),
+            'cosine': float(cosine[i]),
+            'token_overlap': float(token_overlap[i]),
+            'symbol_overlap': float(sym_overlap[i]),
+            **meta,
+         }
+         # Text is only decoded for the chunks actually returned
+         if cid in self._text_spans:
+            item['text'] = self.get_text(cid)
          results.append(item)
 
          if len(results) >= final_k:
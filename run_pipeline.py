@@ -13,10 +13,25 @@ Modes:
   [S] Search  - Interactive textbook search
 """
 
+import os
 import sys
 import json
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import repeat
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from server.library import sha256_file
+
+_loads = orjson.loads if orjson is not None else json.loads
+
 ROOT = Path(__file__).parent
 PDF_DIR = ROOT / "pdfs"
 CONVERTED_DIR = ROOT / "converted"
@@ -24,10 +39,113 @@ CONVERTED_DIR = ROOT / "converted"
 PDF_DIR.mkdir(exist_ok=True)
 CONVERTED_DIR.mkdir(exist_ok=True)
 
+# Batch processing, classification and corpus building run one book per
+# worker process. The environment variable caps the pool (e.g. 1 on a
+# spinning disk, where parallel reads thrash); unset means cpu_count - 1.
+PDF_JOBS_ENV = "LOAD_PDFS_NUMBER_OF_THREADS"
+
+# Written into converted/<book>/ after a successful process_pdf: the PDF's
+# sha256 and the options it was processed with. A re-run with the same PDF
+# bytes and options is skipped.
+INGEST_STAMP_FILE = ".ingest_hash"
+
+
+def _iter_jsonl(path):
+    """Yield one dict per non-blank line of a JSONL file, parsed from bytes in one read."""
+    with open(path, "rb") as f:
+        data = f.read()
+    for line in data.splitlines():
+        if line.strip():
+            yield _loads(line)
+
+
+def _ingest_stamp(pdf_path, options):
+    """Stamp recorded for a processed PDF: its content hash plus the processing options."""
+    return {"sha256": sha256_file(pdf_path), "options": options}
+
+
+# Options that change what convert_pdf (step 1) writes. Steps 2-4 depend only
+# on step 1's outputs, so a stamp that matches on these can reuse all four.
+CONVERT_OPTIONS = (
+    "auto_chunk", "backend", "pymupdf_mode", "emit_pdf_toc", "emit_page_labels", "max_pages",
+)
+
+
+def _read_stamp(pdf_path, classify_pages=False):
+    """
+    The stamp left in converted/<book>/ by the last successful run, or None
+    if it is missing or any of the book's key outputs is.
+    """
+    output_dir = CONVERTED_DIR / pdf_path.stem
+    required = ["_PageRecords", "_DocumentRecord", "_QuestionBank.json"]
+    if classify_pages:
+        required.append("_PageClassifications.jsonl")
+    try:
+        with os.scandir(output_dir) as it:
+            names = {e.name for e in it}
+    except OSError:
+        return None
+    if not all(f"{pdf_path.stem}{suffix}" in names for suffix in required):
+        return None
+    try:
+        with open(output_dir / INGEST_STAMP_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_stamp(pdf_path, stamp):
+    """Record stamp as the last successful run for pdf_path."""
+    with open(CONVERTED_DIR / pdf_path.stem / INGEST_STAMP_FILE, "w", encoding="utf-8") as f:
+        json.dump(stamp, f)
+
+
+def _is_ingested(pdf_path, stamp, classify_pages=False):
+    """True if converted/<book>/ holds outputs stamped with exactly this stamp."""
+    return _read_stamp(pdf_path, classify_pages) == stamp
+
+
+def _conversion_reusable(previous, stamp):
+    """True if the previous run converted the same PDF bytes with the same CONVERT_OPTIONS."""
+    if not previous or previous.get("sha256") != stamp["sha256"]:
+        return False
+    old_options = previous.get("options", {})
+    return all(old_options.get(k) == stamp["options"].get(k) for k in CONVERT_OPTIONS)
+
+
+# Directory scans, keyed by path and reused while the directory's mtime is
+# unchanged (adding, removing or renaming an entry bumps it). Menu loops
+# re-list pdfs/ and converted/ on every pass.
+_scan_cache = {}
+
+
+def _scan_dir(directory):
+    """Sorted (name, is_dir, size) for each entry of directory, cached by mtime."""
+    mtime = directory.stat().st_mtime_ns
+    cached = _scan_cache.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    # scandir's DirEntry carries the type from the directory read itself
+    with os.scandir(directory) as it:
+        entries = sorted(
+            (e.name, e.is_dir(), e.stat().st_size if e.is_file() else 0) for e in it
+        )
+    _scan_cache[directory] = (mtime, entries)
+    return entries
+
+
+def _converted_dirs():
+    """Sorted converted/<book> directories."""
+    return [CONVERTED_DIR / name for name, is_dir, _ in _scan_dir(CONVERTED_DIR) if is_dir]
+
 
 def list_pdfs():
     """List all PDFs in the pdfs/ directory."""
-    pdfs = sorted(PDF_DIR.glob("*.pdf"))
+    pdf_sizes = {
+        name: size for name, is_dir, size in _scan_dir(PDF_DIR)
+        if not is_dir and name.endswith(".pdf")
+    }
+    pdfs = [PDF_DIR / name for name in pdf_sizes]
 
     if not pdfs:
         print("\n⚠ No PDFs found in pdfs/ directory")
@@ -38,12 +156,13 @@ def list_pdfs():
     print("AVAILABLE PDFs")
     print("="*70)
 
+    converted = {d.name for d in _converted_dirs()}
+
     for i, pdf in enumerate(pdfs, 1):
-        size_mb = pdf.stat().st_size / (1024 * 1024)
+        size_mb = pdf_sizes[pdf.name] / (1024 * 1024)
 
         # Check if already converted
-        converted_dir = CONVERTED_DIR / pdf.stem
-        status = "✓ Converted" if converted_dir.exists() else "○ Not converted"
+        status = "✓ Converted" if pdf.stem in converted else "○ Not converted"
 
         print(f"{i}. {pdf.name:<40s} ({size_mb:6.2f} MB)  {status}")
 
@@ -69,6 +188,16 @@ def show_process_menu(pdfs):
     return choice
 
 
+def _sections_file(pdf_name, output_dir):
+    """The book's chunked sections file, else its plain one; None if neither exists."""
+    # Prefer chunked sections, fall back to non-chunked
+    chunked_file = output_dir / f"{pdf_name}_SectionsWithText_Chunked.jsonl"
+    plain_file = output_dir / f"{pdf_name}_SectionsWithText.jsonl"
+
+    sections_file = chunked_file if chunked_file.exists() else plain_file
+    return sections_file if sections_file.exists() else None
+
+
 def embed_textbook(pdf_name, output_dir, search):
     """
     Embed a single textbook's sections into the search index.
@@ -81,18 +210,31 @@ def embed_textbook(pdf_name, output_dir, search):
     Returns:
         True if successful, False otherwise
     """
-    # Prefer chunked sections, fall back to non-chunked
-    chunked_file = output_dir / f"{pdf_name}_SectionsWithText_Chunked.jsonl"
-    plain_file = output_dir / f"{pdf_name}_SectionsWithText.jsonl"
+    return embed_textbooks([(pdf_name, output_dir)], search) == 1
 
-    sections_file = chunked_file if chunked_file.exists() else plain_file
 
-    if not sections_file.exists():
-        print(f"  ⚠ No sections file found for {pdf_name}, skipping embedding")
-        return False
+def embed_textbooks(books, search):
+    """
+    Embed several textbooks with a single TF-IDF refit and index save.
 
-    search.load_textbook(sections_file, book_name=pdf_name)
-    return True
+    Args:
+        books: (pdf_name, output_dir) pairs
+        search: TextbookSearchOffline instance
+
+    Returns:
+        Number of textbooks embedded
+    """
+    found = []
+    for pdf_name, output_dir in books:
+        sections_file = _sections_file(pdf_name, output_dir)
+        if sections_file is None:
+            print(f"  ⚠ No sections file found for {pdf_name}, skipping embedding")
+            continue
+        found.append((sections_file, pdf_name))
+
+    if found:
+        search.load_textbooks(found)
+    return len(found)
 
 
 def embed_all_converted():
@@ -106,18 +248,17 @@ def embed_all_converted():
     search = TextbookSearchOffline()
 
     # Find all converted directories
-    converted_dirs = sorted(d for d in CONVERTED_DIR.iterdir() if d.is_dir())
+    converted_dirs = _converted_dirs()
 
     if not converted_dirs:
         print("✗ No converted textbooks found")
         print(f"  Process PDFs first to create converted output")
         return
 
-    loaded = 0
-    for d in converted_dirs:
-        book_name = d.name
-        if embed_textbook(book_name, d, search):
-            loaded += 1
+    loaded = embed_textbooks([(d.name, d) for d in converted_dirs], search)
+
+    # Index QuestionBanks once here rather than on the first answer query
+    search.index_questionbanks(CONVERTED_DIR)
 
     print("\n" + "="*70)
     print(f"EMBEDDING COMPLETE — {loaded} textbook(s) indexed")
@@ -135,10 +276,21 @@ def process_pdf(
     pymupdf_mode="text",
     emit_pdf_toc=False,
     emit_page_labels=False,
+    embed_index=True,
+    force=False,
+    workers=None,
+    max_pages=None,
+    stamp=None,
+    corpus_workers=None,
 ):
     """
     Process a single PDF through the complete pipeline.
 
+    A PDF whose bytes and options match the stamp left by its last
+    successful run (INGEST_STAMP_FILE) is skipped, unless force is set.
+    If only classify_pages/build_corpus changed, steps 1-4 are reused and
+    just the newly requested optional steps run.
+
     Args:
         pdf_path: Path to PDF file
         auto_chunk: True/False for auto-chunking, None to ask user
@@ -148,42 +300,89 @@ def process_pdf(
         pymupdf_mode: PyMuPDF mode ("text" or "blocks")
         emit_pdf_toc: Write TOC sidecar file (pymupdf backend only)
         emit_page_labels: Write page labels sidecar file (pymupdf backend only)
+        embed_index: If False, skip step 4 and leave the stamp unwritten (the
+            caller embeds into the shared search index itself, then stamps)
+        force: Process even if the PDF is already stamped as processed
+        workers: PyMuPDF page-extraction processes for convert_pdf
+            (None = pdf_to_jsonl.default_extract_workers(), 1 = serial)
+        max_pages: Only convert the first N pages (None = whole PDF)
+        stamp: Ingest stamp the caller already computed for these options,
+            so the PDF is not hashed again
+        corpus_workers: Corpus build processes for step 5
+            (None = rag.build_content_corpus.default_corpus_workers(), 1 = serial)
 
     Returns:
-        True if successful, False otherwise
+        True if successful (or already processed), False otherwise
     """
     pdf_name = pdf_path.stem
 
+    # Interactive chunking (auto_chunk=None) is not known up front: no stamp
+    previous_options = {}
+    reuse = False
+    if auto_chunk is None:
+        stamp = None
+    else:
+        if stamp is None:
+            options = dict(
+                auto_chunk=auto_chunk, classify_pages=classify_pages, build_corpus=build_corpus,
+                backend=backend, pymupdf_mode=pymupdf_mode,
+                emit_pdf_toc=emit_pdf_toc, emit_page_labels=emit_page_labels,
+            )
+            # Recorded only when set, so stamps from full conversions stay valid
+            if max_pages:
+                options["max_pages"] = max_pages
+            stamp = _ingest_stamp(pdf_path, options)
+        previous = None if force else _read_stamp(pdf_path)
+        if previous == stamp and _is_ingested(pdf_path, stamp, classify_pages):
+            print(f"\n✓ {pdf_path.name} unchanged since last run — skipping")
+            return True
+        # Only classification or corpus building was toggled: keep the
+        # conversion, Q&A, QuestionBank and the book's search-index entry
+        reuse = _conversion_reusable(previous, stamp)
+        if reuse:
+            previous_options = previous["options"]
+        # A run that fails part-way must not leave the old stamp behind
+        (CONVERTED_DIR / pdf_name / INGEST_STAMP_FILE).unlink(missing_ok=True)
+
     print("\n" + "="*70)
     print(f"PROCESSING: {pdf_path.name}")
     print("="*70)
 
     try:
         # ── STEP 1: Convert PDF → JSONL + Sections ──────────────────────
-        print("\n" + "="*70)
-        print("STEP 1: CONVERTING PDF TO JSONL")
-        print("="*70 + "\n")
-
-        from pdf_to_jsonl import convert_pdf
-
-        output_dir_name = pdf_name
-
-        doc_id, output_dir = convert_pdf(
-            pdf_path,
-            output_dir_name=output_dir_name,
-            auto_chunk=auto_chunk,
-            backend=backend,
-            pymupdf_mode=pymupdf_mode,
-            emit_pdf_toc=emit_pdf_toc,
-            emit_page_labels=emit_page_labels,
-        )
+        if reuse:
+            output_dir = CONVERTED_DIR / pdf_name
+            print(f"\n✓ {pdf_path.name} already converted with these options — reusing steps 1-4")
+        else:
+            print("\n" + "="*70)
+            print("STEP 1: CONVERTING PDF TO JSONL")
+            print("="*70 + "\n")
+
+            from pdf_to_jsonl import convert_pdf, default_extract_workers
+
+            output_dir_name = pdf_name
+
+            doc_id, output_dir = convert_pdf(
+                pdf_path,
+                output_dir_name=output_dir_name,
+                auto_chunk=auto_chunk,
+                backend=backend,
+                pymupdf_mode=pymupdf_mode,
+                emit_pdf_toc=emit_pdf_toc,
+                emit_page_labels=emit_page_labels,
+                # The pipeline owns the machine, so it opts in to the extraction pool
+                workers=workers if workers is not None else default_extract_workers(),
+                max_pages=max_pages,
+            )
 
-        print(f"\n✓ Conversion complete")
-        print(f"  Document ID: {doc_id}")
-        print(f"  Output dir: {output_dir}\n")
+            print(f"\n✓ Conversion complete")
+            print(f"  Document ID: {doc_id}")
+            print(f"  Output dir: {output_dir}\n")
 
         # ── STEP 1.5 (optional): Classify pages ─────────────────────────
-        if classify_pages:
+        classified = (CONVERTED_DIR / pdf_name / f"{pdf_name}_PageClassifications.jsonl").exists()
+        classified_now = False
+        if classify_pages and not (previous_options.get("classify_pages") and classified):
             print("="*70)
             print("STEP 1.5: CLASSIFYING PAGES")
             print("="*70 + "\n")
@@ -193,109 +392,108 @@ def process_pdf(
                 from legacy.page_classifier import classify_pagerecords
                 cls_out = output_dir / f"{pdf_name}_PageClassifications.jsonl"
                 classify_pagerecords(pages_file, cls_out)
+                classified_now = True
                 print(f"\n✓ Page classification complete: {cls_out.name}\n")
             else:
                 print(f"⚠ PageRecords not found, skipping classification\n")
 
-        # ── STEP 2: Extract Q&A ──────────────────────────────────────────
-        print("="*70)
-        print("STEP 2: EXTRACTING Q&A")
-        print("="*70 + "\n")
-
-        pages_file = output_dir / f"{pdf_name}_PageRecords"
-        doc_file = output_dir / f"{pdf_name}_DocumentRecord"
-
-        if not pages_file.exists():
-            print(f"⚠ Pages file missing: {pages_file}")
-            print("  Skipping Q&A extraction")
-        else:
-            with open(doc_file, "r", encoding="utf-8") as f:
-                book_id = json.load(f).get("id")
-
-            from legacy.qa_handler import extract_qas
-            questions_path, answers_path = extract_qas(pages_file, book_id)
-
-            print(f"\n✓ Q&A extraction complete")
-            print(f"  Questions: {questions_path}")
-            print(f"  Answers: {answers_path}\n")
-
-        # ── STEP 3: Build QuestionBank ────────────────────────────────────
-        print("="*70)
-        print("STEP 3: CREATING QUESTIONBANK")
-        print("="*70 + "\n")
-
-        from legacy.qa_schema import QuestionBank, Question, Answer
-
-        bank = QuestionBank(
-            name=f"{pdf_name} Question Bank",
-            description=f"Questions and answers extracted from {pdf_name}"
-        )
+        # ── STEPS 2-4 run on fresh step 1 outputs only ─────────────────
+        if not reuse:
+            # ── STEP 2: Extract Q&A ──────────────────────────────────────────
+            print("="*70)
+            print("STEP 2: EXTRACTING Q&A")
+            print("="*70 + "\n")
 
-        # Load questions
-        q_count = 0
-        questions_path = output_dir / f"{pdf_name}_Questions.jsonl"
-        if questions_path.exists():
-            with open(questions_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    q_data = json.loads(line)
-                    question = Question(
-                        question_id=q_data.get("id", ""),
-                        question_text=q_data.get("question_text", ""),
-                        question_type="multiple_choice",
-                        source_type="textbook",
-                        source_book=pdf_name,
-                        source_chapter=q_data.get("chapter"),
-                        source_page=q_data.get("pdf_page"),
-                        source_section=", ".join(q_data.get("section_titles", []))
-                    )
-                    bank.add_question(question)
-                    q_count += 1
-
-        # Load answers
-        a_count = 0
-        answers_path = output_dir / f"{pdf_name}_Answers.jsonl"
-        if answers_path.exists():
-            with open(answers_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    a_data = json.loads(line)
-                    answer = Answer(
-                        question_id=a_data.get("id", ""),
-                        answer_text=a_data.get("answer_text", ""),
-                        source=pdf_name
-                    )
-                    bank.add_answer(answer)
-                    a_count += 1
+            pages_file = output_dir / f"{pdf_name}_PageRecords"
 
-        bank_file = output_dir / f"{pdf_name}_QuestionBank.json"
-        bank.save(str(bank_file))
+            if not pages_file.exists():
+                print(f"⚠ Pages file missing: {pages_file}")
+                print("  Skipping Q&A extraction")
+            else:
+                # convert_pdf returns the id it wrote into the DocumentRecord,
+                # so the record need not be read back for it
+                from legacy.qa_handler import extract_qas
+                questions_path, answers_path = extract_qas(pages_file, doc_id)
 
-        print(f"✓ QuestionBank created: {bank_file.name}")
-        print(f"  Questions: {q_count}")
-        print(f"  Answers: {a_count}\n")
+                print(f"\n✓ Q&A extraction complete")
+                print(f"  Questions: {questions_path}")
+                print(f"  Answers: {answers_path}\n")
 
-        # ── STEP 4: Embed into Search Index ───────────────────────────────
-        print("="*70)
-        print("STEP 4: EMBEDDING INTO SEARCH INDEX")
-        print("="*70 + "\n")
+            # ── STEP 3: Build QuestionBank ────────────────────────────────────
+            print("="*70)
+            print("STEP 3: CREATING QUESTIONBANK")
+            print("="*70 + "\n")
 
-        from legacy.textbook_search_offline import TextbookSearchOffline
+            from legacy.qa_schema import QuestionBank
 
-        search = TextbookSearchOffline()
+            bank = QuestionBank(
+                name=f"{pdf_name} Question Bank",
+                description=f"Questions and answers extracted from {pdf_name}"
+            )
 
-        if embed_textbook(pdf_name, output_dir, search):
-            print(f"\n✓ {pdf_name} embedded into search index")
-            search.stats()
-        else:
-            print(f"⚠ Could not embed {pdf_name} (no sections file)")
+            # Load questions as columns, then add them in one batch
+            qids, qtexts, chapters, pages, sections = [], [], [], [], []
+            # Chapter and section values repeat across a book's questions;
+            # every row shares the first string object parsed for a value
+            shared = {}
+            questions_path = output_dir / f"{pdf_name}_Questions.jsonl"
+            if questions_path.exists():
+                for q_data in _iter_jsonl(questions_path):
+                    chapter = q_data.get("chapter")
+                    section = ", ".join(q_data.get("section_titles", []))
+                    qids.append(q_data.get("id", ""))
+                    qtexts.append(q_data.get("question_text", ""))
+                    chapters.append(shared.setdefault(chapter, chapter))
+                    pages.append(q_data.get("pdf_page"))
+                    sections.append(shared.setdefault(section, section))
+            bank.add_questions_bulk(qids, qtexts, chapters, pages, sections, source_book=pdf_name)
+            q_count = len(qids)
+
+            # Load answers
+            aids, atexts = [], []
+            answers_path = output_dir / f"{pdf_name}_Answers.jsonl"
+            if answers_path.exists():
+                for a_data in _iter_jsonl(answers_path):
+                    aids.append(a_data.get("id", ""))
+                    atexts.append(a_data.get("answer_text", ""))
+            bank.add_answers_bulk(aids, atexts, source=pdf_name)
+            a_count = len(aids)
+
+            bank_file = output_dir / f"{pdf_name}_QuestionBank.json"
+            bank.save(str(bank_file))
+
+            print(f"✓ QuestionBank created: {bank_file.name}")
+            print(f"  Questions: {q_count}")
+            print(f"  Answers: {a_count}\n")
+
+            # ── STEP 4: Embed into Search Index ───────────────────────────────
+            if embed_index:
+                print("="*70)
+                print("STEP 4: EMBEDDING INTO SEARCH INDEX")
+                print("="*70 + "\n")
+
+                from legacy.textbook_search_offline import TextbookSearchOffline
+
+                search = TextbookSearchOffline()
+
+                if embed_textbook(pdf_name, output_dir, search):
+                    search.index_questionbanks(CONVERTED_DIR)
+                    print(f"\n✓ {pdf_name} embedded into search index")
+                    search.stats()
+                else:
+                    print(f"⚠ Could not embed {pdf_name} (no sections file)")
 
-        print()
+                print()
 
         # ── STEP 5 (optional): Build content corpus ──────────────────────
-        if build_corpus:
+        corpus_built = (ROOT / "textbook_index" / pdf_name / "chunks_content.jsonl").exists()
+        # The corpus is filtered by page classifications, so a reused corpus
+        # is stale once classification reran or classify_pages was toggled
+        corpus_current = (
+            previous_options.get("build_corpus") and corpus_built and not classified_now
+            and bool(previous_options.get("classify_pages")) == bool(classify_pages)
+        )
+        if build_corpus and not corpus_current:
             print("="*70)
             print("STEP 5: BUILDING CONTENT CORPUS")
             print("="*70 + "\n")
@@ -309,13 +507,15 @@ def process_pdf(
             cls_path = cls_file if cls_file.exists() else None
 
             if sections_file.exists():
-                from rag.build_content_corpus import build_corpus as run_corpus_build
+                from rag.build_content_corpus import build_corpus as run_corpus_build, default_corpus_workers
                 corpus_out = ROOT / "textbook_index"
                 run_corpus_build(
                     sections_path=sections_file,
                     page_cls_path=cls_path,
                     out_root=corpus_out,
                     book_name_override=pdf_name,
+                    # Like step 1, a standalone run opts in to the pool
+                    workers=corpus_workers if corpus_workers is not None else default_corpus_workers(),
                 )
                 print(f"\n✓ Content corpus built\n")
             else:
@@ -339,10 +539,15 @@ def process_pdf(
             f"{pdf_name}_QuestionBank.json"
         ]
 
+        # One directory read for every size (DirEntry.stat is one call per
+        # file) instead of an exists() + stat() pair per key file
+        wanted = set(key_files)
+        with os.scandir(output_dir) as it:
+            sizes = {e.name: e.stat().st_size for e in it if e.name in wanted and e.is_file()}
+
         for filename in key_files:
-            filepath = output_dir / filename
-            if filepath.exists():
-                size = filepath.stat().st_size
+            if filename in sizes:
+                size = sizes[filename]
                 if size > 1024 * 1024:
                     size_str = f"{size / (1024*1024):.2f} MB"
                 else:
@@ -353,6 +558,9 @@ def process_pdf(
                 else:
                     print(f"     {filename:<50s}  {size_str:>10s}")
 
+        if stamp is not None and embed_index:
+            _write_stamp(pdf_path, stamp)
+
         print("\n")
         return True
 
@@ -371,13 +579,13 @@ def classify_all_converted():
     print("CLASSIFYING ALL CONVERTED TEXTBOOKS")
     print("="*70 + "\n")
 
-    converted_dirs = sorted(d for d in CONVERTED_DIR.iterdir() if d.is_dir())
+    converted_dirs = _converted_dirs()
 
     if not converted_dirs:
         print("✗ No converted textbooks found")
         return
 
-    classified = 0
+    tasks = []
     for d in converted_dirs:
         book_name = d.name
         pages_file = d / f"{book_name}_PageRecords"
@@ -387,9 +595,11 @@ def classify_all_converted():
             print(f"  ⚠ No PageRecords for {book_name}, skipping")
             continue
 
-        print(f"\n  Classifying {book_name}...")
-        classify_pagerecords(pages_file, cls_out)
-        classified += 1
+        tasks.append(dict(input_path=pages_file, output_path=cls_out))
+
+    print(f"\n  Classifying {len(tasks)} textbook(s)...")
+    _map_books(classify_pagerecords, tasks)
+    classified = len(tasks)
 
     print("\n" + "="*70)
     print(f"CLASSIFICATION COMPLETE — {classified} textbook(s) classified")
@@ -398,21 +608,21 @@ def classify_all_converted():
 
 def build_corpus_all_converted():
     """Build content corpus for all converted textbooks that have SectionsWithText."""
-    from rag.build_content_corpus import build_corpus as run_corpus_build
+    from rag.build_content_corpus import build_corpus as run_corpus_build, default_corpus_workers
 
     print("\n" + "="*70)
     print("BUILDING CONTENT CORPUS FOR ALL CONVERTED TEXTBOOKS")
     print("="*70 + "\n")
 
-    converted_dirs = sorted(d for d in CONVERTED_DIR.iterdir() if d.is_dir())
+    converted_dirs = _converted_dirs()
 
     if not converted_dirs:
         print("✗ No converted textbooks found")
         return
 
-    built = 0
     corpus_out = ROOT / "textbook_index"
 
+    tasks = []
     for d in converted_dirs:
         book_name = d.name
 
@@ -428,20 +638,62 @@ def build_corpus_all_converted():
         cls_file = d / f"{book_name}_PageClassifications.jsonl"
         cls_path = cls_file if cls_file.exists() else None
 
-        print(f"\n  Building corpus for {book_name}...")
-        run_corpus_build(
+        tasks.append(dict(
             sections_path=sections_file,
             page_cls_path=cls_path,
             out_root=corpus_out,
             book_name_override=book_name,
-        )
-        built += 1
+        ))
+
+    print(f"\n  Building corpus for {len(tasks)} textbook(s)...")
+    # One book per process already: no nested pool per book. A serial run
+    # owns the machine, so each book gets the corpus pool instead.
+    corpus_workers = 1 if _pdf_jobs(None, len(tasks)) > 1 else default_corpus_workers()
+    for task in tasks:
+        task["workers"] = corpus_workers
+    _map_books(run_corpus_build, tasks)
+    built = len(tasks)
 
     print("\n" + "="*70)
     print(f"CORPUS BUILD COMPLETE — {built} textbook(s) processed")
     print("="*70)
 
 
+def _call_with_kwargs(fn, kwargs):
+    """Worker entry point for _map_books (pool.map passes positional args only)."""
+    return fn(**kwargs)
+
+
+def _map_books(fn, tasks, jobs=None):
+    """
+    Call fn(**task) for each per-book task, in a spawn process pool when more
+    than one job is allowed (see _pdf_jobs). Page classification and corpus
+    building are pure-Python CPU work, so threads would share one GIL.
+
+    Returns:
+        fn's results in task order
+    """
+    jobs = _pdf_jobs(jobs, len(tasks))
+    if jobs <= 1:
+        return [fn(**task) for task in tasks]
+
+    # spawn, not fork: matches the batch PDF pool
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as pool:
+        return list(pool.map(_call_with_kwargs, repeat(fn), tasks))
+
+
+def _pdf_jobs(jobs, n_pdfs):
+    """Worker count for batch processing: jobs, else $LOAD_PDFS_NUMBER_OF_THREADS, else cpu_count - 1."""
+    if jobs is None:
+        env = os.environ.get(PDF_JOBS_ENV, "").strip()
+        if env.isdigit():
+            jobs = int(env)
+        else:
+            jobs = (os.cpu_count() or 1) - 1
+    return max(1, min(jobs, n_pdfs))
+
+
 def process_all_pdfs(
     pdfs,
     auto_chunk=True,
@@ -451,8 +703,25 @@ def process_all_pdfs(
     pymupdf_mode="text",
     emit_pdf_toc=False,
     emit_page_labels=False,
+    jobs=None,
+    max_pages=None,
 ):
-    """Process all PDFs in batch mode."""
+    """
+    Process all PDFs in batch mode.
+
+    With more than one job, each PDF runs through process_pdf in its own
+    worker process. Every worker would otherwise load, extend and save the
+    same search index, so step 4 is skipped there and the successful books
+    are embedded here afterwards, one at a time into a single index. Their
+    stamps are written only once that has succeeded.
+
+    Args:
+        jobs: Worker processes; None reads $LOAD_PDFS_NUMBER_OF_THREADS and
+            falls back to cpu_count - 1. 1 processes the PDFs serially.
+        max_pages: Only convert the first N pages of each PDF (None = all)
+    """
+    jobs = _pdf_jobs(jobs, len(pdfs))
+
     print("\n" + "="*70)
     print(f"BATCH PROCESSING: {len(pdfs)} PDFs")
     print("="*70)
@@ -460,26 +729,95 @@ def process_all_pdfs(
     print(f"Page classification: {'ENABLED' if classify_pages else 'DISABLED'}")
     print(f"Content corpus: {'ENABLED' if build_corpus else 'DISABLED'}")
     print(f"Backend: {backend} (mode: {pymupdf_mode})")
+    if max_pages:
+        print(f"Page limit: first {max_pages} pages")
+    print(f"Jobs: {jobs}")
+
+    options = dict(
+        auto_chunk=auto_chunk,
+        classify_pages=classify_pages,
+        build_corpus=build_corpus,
+        backend=backend,
+        pymupdf_mode=pymupdf_mode,
+        emit_pdf_toc=emit_pdf_toc,
+        emit_page_labels=emit_page_labels,
+    )
+    if max_pages:
+        options["max_pages"] = max_pages
+    succeeded = []
+    skipped = []
+
+    if jobs <= 1:
+        for i, pdf in enumerate(pdfs, 1):
+            print(f"\n[{i}/{len(pdfs)}] Processing {pdf.name}...")
+            if process_pdf(pdf, **options):
+                succeeded.append(pdf)
+    else:
+        # Already-processed PDFs are neither reprocessed nor embedded again.
+        # Each PDF is hashed once, here; workers get the stamp
+        pending = []
+        stamps = {}
+        needs_embed = set()
+        for pdf in pdfs:
+            stamp = _ingest_stamp(pdf, options) if auto_chunk is not None else None
+            previous = _read_stamp(pdf) if stamp is not None else None
+            if stamp is not None and _is_ingested(pdf, stamp, classify_pages):
+                print(f"\n✓ {pdf.name} unchanged since last run — skipping")
+                skipped.append(pdf)
+                continue
+            pending.append(pdf)
+            stamps[pdf] = stamp
+            # A reused conversion keeps its search-index entry (see process_pdf)
+            if not _conversion_reusable(previous, stamp):
+                needs_embed.add(pdf)
+
+        # Each book's page extraction gets its share of the cores, rather
+        # than every worker starting a full-size extraction pool of its own
+        page_workers = max(1, (os.cpu_count() or 1) // jobs)
+
+        # spawn, not fork: PyMuPDF state is not fork-safe
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as pool:
+            futures = {
+                pool.submit(process_pdf, pdf, embed_index=False, stamp=stamps[pdf],
+                            workers=page_workers, corpus_workers=1, **options): pdf
+                for pdf in pending
+            }
+            for i, future in enumerate(as_completed(futures), 1):
+                pdf = futures[future]
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    # process_pdf reports its own errors; this is a dead worker
+                    print(f"\n✗ Error processing {pdf.stem}: {e}")
+                    ok = False
+                print(f"\n[{i}/{len(pending)}] {'✓' if ok else '✗'} {pdf.name}")
+                if ok:
+                    succeeded.append(pdf)
+
+        # Same book order as the PDF list, whatever order workers finished in
+        done = set(succeeded)
+        to_embed = [pdf for pdf in pdfs if pdf in done and pdf in needs_embed]
+        if to_embed:
+            from legacy.textbook_search_offline import TextbookSearchOffline
 
-    successful = 0
-    failed = 0
+            print("\n" + "="*70)
+            print("STEP 4: EMBEDDING INTO SEARCH INDEX")
+            print("="*70 + "\n")
 
-    for i, pdf in enumerate(pdfs, 1):
-        print(f"\n[{i}/{len(pdfs)}] Processing {pdf.name}...")
-
-        if process_pdf(
-            pdf,
-            auto_chunk=auto_chunk,
-            classify_pages=classify_pages,
-            build_corpus=build_corpus,
-            backend=backend,
-            pymupdf_mode=pymupdf_mode,
-            emit_pdf_toc=emit_pdf_toc,
-            emit_page_labels=emit_page_labels,
-        ):
-            successful += 1
-        else:
-            failed += 1
+            search = TextbookSearchOffline()
+            embed_textbooks([(pdf.stem, CONVERTED_DIR / pdf.stem) for pdf in to_embed], search)
+            search.index_questionbanks(CONVERTED_DIR)
+            search.stats()
+
+        # Stamped last: a book whose embedding failed or was interrupted is
+        # processed again next run instead of being skipped as ingested
+        for pdf in succeeded:
+            if stamps[pdf] is not None:
+                _write_stamp(pdf, stamps[pdf])
+
+    successful = len(succeeded) + len(skipped)
+    failed = len(pdfs) - successful
 
     # Final summary
     print("\n" + "="*70)
@@ -492,6 +830,29 @@ def process_all_pdfs(
         print(f"\n✓ {successful} textbook(s) processed and indexed!")
 
 
+# Search prompt history, kept between sessions when readline is available
+SEARCH_HISTORY_FILE = Path.home() / ".atrium_history"
+SEARCH_HISTORY_LENGTH = 1000
+QUIT_COMMANDS = frozenset({"quit", "exit", "q"})
+
+
+def _enable_search_history():
+    """
+    Turn on readline line editing and load the saved search history.
+    Returns the readline module, or None where it is unavailable (Windows).
+    """
+    try:
+        import readline
+    except ImportError:
+        return None
+    readline.set_history_length(SEARCH_HISTORY_LENGTH)
+    try:
+        readline.read_history_file(SEARCH_HISTORY_FILE)
+    except OSError:
+        pass
+    return readline
+
+
 def search_mode():
     """Interactive textbook search."""
     from legacy.textbook_search_offline import TextbookSearchOffline
@@ -518,61 +879,65 @@ def search_mode():
     print("Commands: 'stats', 'books', 'full', 'snippets', 'quit'")
     print("="*70)
 
-    show_full = False
-    show_snippets = False
-    answer_mode = True  # Default to answer mode
-
-    while True:
-        try:
-            prompt = "\nA? " if answer_mode else "\n? "
-            query = input(prompt).strip()
-
-            if not query:
-                continue
+    # Answer mode by default; 'full' and 'snippets' start off
+    settings = {"answer": True, "full": False, "snippets": False}
+
+    def toggle(key, describe):
+        def flip():
+            settings[key] = not settings[key]
+            print(f"  {describe(settings[key])}")
+        return flip
+
+    # One dict lookup per line instead of a chain of string compares
+    commands = {
+        "stats": search.stats,
+        "books": search.list_books,
+        "full": toggle("full", lambda on: f"Full text: {'ON' if on else 'OFF'}"),
+        "snippets": toggle("snippets", lambda on: f"Raw snippets: {'ON' if on else 'OFF'}"),
+        "search": toggle("answer", lambda on: f"Mode: {'Answer' if on else 'Search'}"),
+    }
+
+    readline = _enable_search_history()
+    try:
+        while True:
+            try:
+                prompt = "\nA? " if settings["answer"] else "\n? "
+                query = input(prompt).strip()
+
+                if not query:
+                    continue
+
+                command = query.lower()
+                if command in QUIT_COMMANDS:
+                    break
+
+                action = commands.get(command)
+                if action is not None:
+                    action()
+                    continue
+
+                if settings["answer"]:
+                    search.answer(
+                        query,
+                        n_sentences=5,
+                        n_chunks=5,
+                        qa_dir=CONVERTED_DIR,
+                        show_snippets=settings["snippets"],
+                    )
+                else:
+                    search.ask(query, n_results=3, show_full_text=settings["full"])
 
-            if query.lower() in ['quit', 'exit', 'q']:
+            except KeyboardInterrupt:
+                print()
                 break
-
-            if query.lower() == 'stats':
-                search.stats()
-                continue
-
-            if query.lower() == 'books':
-                search.list_books()
-                continue
-
-            if query.lower() == 'full':
-                show_full = not show_full
-                print(f"  Full text: {'ON' if show_full else 'OFF'}")
-                continue
-
-            if query.lower() == 'snippets':
-                show_snippets = not show_snippets
-                print(f"  Raw snippets: {'ON' if show_snippets else 'OFF'}")
-                continue
-
-            if query.lower() == 'search':
-                answer_mode = not answer_mode
-                mode_name = "Answer" if answer_mode else "Search"
-                print(f"  Mode: {mode_name}")
-                continue
-
-            if answer_mode:
-                search.answer(
-                    query,
-                    n_sentences=5,
-                    n_chunks=5,
-                    qa_dir=CONVERTED_DIR,
-                    show_snippets=show_snippets,
-                )
-            else:
-                search.ask(query, n_results=3, show_full_text=show_full)
-
-        except KeyboardInterrupt:
-            print()
-            break
-        except Exception as e:
-            print(f"Error: {e}")
+            except Exception as e:
+                print(f"Error: {e}")
+    finally:
+        if readline is not None:
+            try:
+                readline.write_history_file(SEARCH_HISTORY_FILE)
+            except OSError:
+                pass
 
 
 def _ask_backend_options():
@@ -594,6 +959,12 @@ def _ask_backend_options():
     return backend, pymupdf_mode, emit_toc, emit_labels
 
 
+def _ask_max_pages():
+    """Prompt for an optional page limit. Returns an int, or None for the whole PDF."""
+    limit = input("Page limit? (number, default=all pages): ").strip()
+    return int(limit) if limit.isdigit() and int(limit) > 0 else None
+
+
 def process_mode():
     """Interactive PDF processing loop."""
     pdfs = list_pdfs()
@@ -633,12 +1004,14 @@ def process_mode():
             do_corpus = corpus_choice == 'Y'
 
             be, pm, toc, labels = _ask_backend_options()
+            max_pages = _ask_max_pages()
 
             process_all_pdfs(
                 pdfs, auto_chunk=auto_chunk,
                 classify_pages=classify, build_corpus=do_corpus,
                 backend=be, pymupdf_mode=pm,
                 emit_pdf_toc=toc, emit_page_labels=labels,
+                max_pages=max_pages,
             )
             pdfs = list_pdfs()
 
@@ -657,12 +1030,14 @@ def process_mode():
                 do_corpus = corpus_choice == 'Y'
 
                 be, pm, toc, labels = _ask_backend_options()
+                max_pages = _ask_max_pages()
 
                 process_pdf(
                     pdf, auto_chunk=auto_chunk,
                     classify_pages=classify, build_corpus=do_corpus,
                     backend=be, pymupdf_mode=pm,
                     emit_pdf_toc=toc, emit_page_labels=labels,
+                    max_pages=max_pages,
                 )
                 pdfs = list_pdfs()
             else:
@@ -672,8 +1047,28 @@ def process_mode():
             print("\n✗ Invalid choice. Try again.")
 
 
-def main():
-    """Main entry point — choose Process or Search."""
+# Imported lazily by the Process/Search steps; PyMuPDF and scikit-learn
+# make the first of those imports slow
+WARM_IMPORTS = (
+    "pdf_to_jsonl",
+    "legacy.qa_handler",
+    "legacy.textbook_search_offline",
+    "legacy.page_classifier",
+    "rag.build_content_corpus",
+)
+
+
+def _warm_imports():
+    """Import WARM_IMPORTS ahead of use; failures are left for the real import to report."""
+    for name in WARM_IMPORTS:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+
+def _print_main_menu():
+    """Print the top-level Process / Search / Quit banner."""
     print("="*70)
     print("TEXTBOOK PIPELINE & SEARCH")
     print("="*70)
@@ -682,6 +1077,15 @@ def main():
     print("  [Q] Quit")
     print("="*70)
 
+
+def main():
+    """Main entry point — choose Process or Search."""
+    # Load the heavy modules while the user reads the menu. The import
+    # system's per-module locks make a real import wait for a warm one.
+    threading.Thread(target=_warm_imports, daemon=True).start()
+
+    _print_main_menu()
+
     while True:
         choice = input("\nYour choice: ").strip().upper()
 
@@ -692,24 +1096,14 @@ def main():
         elif choice == 'P':
             process_mode()
             # After returning from process mode, show main menu again
-            print("\n" + "="*70)
-            print("TEXTBOOK PIPELINE & SEARCH")
-            print("="*70)
-            print("\n  [P] Process PDFs  — Extract, embed, and index textbooks")
-            print("  [S] Search        — Search your indexed textbooks")
-            print("  [Q] Quit")
-            print("="*70)
+            print()
+            _print_main_menu()
 
         elif choice == 'S':
             search_mode()
             # After returning from search, show main menu again
-            print("\n" + "="*70)
-            print("TEXTBOOK PIPELINE & SEARCH")
-            print("="*70)
-            print("\n  [P] Process PDFs  — Extract, embed, and index textbooks")
-            print("  [S] Search        — Search your indexed textbooks")
-            print("  [Q] Quit")
-            print("="*70)
+            print()
+            _print_main_menu()
 
         else:
             print("✗ Invalid choice. Enter P, S, or Q.")
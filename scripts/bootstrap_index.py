@@ -52,18 +52,17 @@ def main() -> int:
     pdf_dir = args.pdf_dir.resolve()
     index_root = args.index_root.resolve()
 
+    # One directory scan serves both branches; ingest_pdfs_incremental sorts its own
+    pdfs = list(pdf_dir.glob("*.pdf"))
     if index_exists(index_root):
-        pdfs = list(pdf_dir.glob("*.pdf"))
         if not pdfs:
             print(f"Index present: {index_root}")
             return 0
         # Run incremental anyway - will skip already-ingested
         print(f"Incremental ingest (index present, checking {len(pdfs)} PDFs)...")
-    else:
-        pdfs = sorted(pdf_dir.glob("*.pdf"))
-        if not pdfs:
-            print(f"No PDFs found in {pdf_dir}. Add PDFs then run `make index` or `make run-bootstrap`.")
-            return 1
+    elif not pdfs:
+        print(f"No PDFs found in {pdf_dir}. Add PDFs then run `make index` or `make run-bootstrap`.")
+        return 1
 
     from scripts.ingest_library import ingest_pdfs_incremental, rebuild_search_index
 
@@ -5,7 +5,8 @@ Build FAISS + BM25 search index from embedded chunks.
 Usage:
    python scripts/build_index.py \\
       --input textbook_index/eecs281_textbook/chunks_content_embedded.jsonl \\
-      --index-dir textbook_index/eecs281_textbook/index
+      --index-dir textbook_index/eecs281_textbook/index \\
+      --index-type auto
 """
 
 import sys
@@ -14,7 +15,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from rag.build_index import build_index
+from rag.build_index import build_index, INDEX_TYPES
 
 
 def main():
@@ -25,6 +26,11 @@ def main():
                        help="Path to chunks_content_embedded.jsonl")
    parser.add_argument('--index-dir', '-o', default=None,
                        help="Output directory (default: <input_dir>/index/)")
+   parser.add_argument('--index-type', choices=INDEX_TYPES, default='auto',
+                       help="FAISS index: flat (exact), hnsw, ivfpq or ivfsq8 (quantized), "
+                            "or auto (flat below 50k chunks, hnsw above; default)")
+   parser.add_argument('--no-gpu', action='store_true',
+                       help="Train ivfpq/ivfsq8 on CPU even when faiss sees a GPU")
 
    args = parser.parse_args()
 
@@ -38,8 +44,9 @@ def main():
    print(f"Building search index...")
    print(f"  Input: {input_path}")
    print(f"  Output: {index_dir}")
+   print(f"  Index type: {args.index_type}")
 
-   build_index(input_path, index_dir)
+   build_index(input_path, index_dir, index_type=args.index_type, use_gpu=not args.no_gpu)
 
    print("\nDone.")
 
@@ -2,7 +2,8 @@
 """
 Embed chunks_content.jsonl with vector embeddings.
 
-Reads chunks, embeds each text field, writes output with 'embedding' field added.
+Reads chunks, embeds their text fields --batch-size at a time, writes output
+with 'embedding' field added ('embedding_b64' with --b64).
 
 Usage:
    python scripts/embed_chunks.py \\
@@ -21,7 +22,22 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from rag.embedding_client import DummyHashEmbeddingClient, ExternalEmbeddingClient
+from rag.embedding_client import DummyHashEmbeddingClient, ExternalEmbeddingClient, embed_texts
+from rag.build_index import EMBEDDING_B64_KEY, encode_embedding_b64
+
+# Texts per embed_batch() call
+DEFAULT_BATCH_SIZE = 128
+
+
+def _write_batch(fout, client, records: list, texts: list, b64: bool) -> None:
+   """Embed one batch of texts in a single call and write their records in order."""
+   vectors = embed_texts(client, texts)
+   for record, vector in zip(records, vectors):
+      if b64:
+         record[EMBEDDING_B64_KEY] = encode_embedding_b64(vector)
+      else:
+         record['embedding'] = vector.tolist()
+      fout.write(json.dumps(record, ensure_ascii=False) + '\n')
 
 
 def embed_chunks(
@@ -30,6 +46,8 @@ def embed_chunks(
    client,
    max_chars: int = 0,
    verbose: bool = True,
+   b64: bool = False,
+   batch_size: int = DEFAULT_BATCH_SIZE,
 ) -> dict:
    """
    Read chunks JSONL, add 'embedding' field, write to output.
@@ -40,11 +58,18 @@ def embed_chunks(
       client:      EmbeddingClient instance
       max_chars:   If > 0, truncate text before embedding
       verbose:     Print progress
+      b64:         Write the vector as base64 float32 under 'embedding_b64'
+                   instead of a JSON list under 'embedding'
+      batch_size:  Texts per client.embed_batch() call (clients without
+                   embed_batch fall back to one embed() per text)
 
    Returns:
       Stats dict with count, dim, output_path
    """
+   batch_size = max(1, batch_size)
    count = 0
+   records = []
+   texts = []
 
    with open(input_path, 'r', encoding='utf-8') as fin, \
         open(output_path, 'w', encoding='utf-8') as fout:
@@ -60,12 +85,20 @@ def embed_chunks(
          if max_chars > 0 and len(text) > max_chars:
             text = text[:max_chars]
 
-         record['embedding'] = client.embed(text)
-         fout.write(json.dumps(record, ensure_ascii=False) + '\n')
-         count += 1
+         records.append(record)
+         texts.append(text)
+         if len(texts) < batch_size:
+            continue
+
+         _write_batch(fout, client, records, texts, b64)
+         if verbose and (count + len(records)) // 100 > count // 100:
+            print(f"  Embedded {count + len(records)} chunks...")
+         count += len(records)
+         records, texts = [], []
 
-         if verbose and count % 100 == 0:
-            print(f"  Embedded {count} chunks...")
+      if records:
+         _write_batch(fout, client, records, texts, b64)
+         count += len(records)
 
    # Write sidecar meta
    meta_path = output_path.parent / "embedding_meta.json"
@@ -100,6 +133,10 @@ def main():
                        help="Embedding dimension (default: 64)")
    parser.add_argument('--max-chars', type=int, default=0,
                        help="Truncate text to N chars before embedding (0=no truncation)")
+   parser.add_argument('--b64', action='store_true',
+                       help="Store embeddings as base64 float32 (smaller, faster to index)")
+   parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f"Texts per embedding call (default: {DEFAULT_BATCH_SIZE})")
 
    args = parser.parse_args()
 
@@ -125,7 +162,8 @@ def main():
    print(f"  Input: {input_path}")
    print(f"  Client: {args.client} (dim={client.dim})")
 
-   embed_chunks(input_path, output_path, client, max_chars=args.max_chars)
+   embed_chunks(input_path, output_path, client, max_chars=args.max_chars, b64=args.b64,
+                batch_size=args.batch_size)
 
    if args.inplace:
       output_path.rename(input_path)
@@ -15,6 +15,9 @@ import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+# Book IDs are the sha256 of the PDF; one hasher for the whole library
+from server.library import sha256_file
+
 REPO_ROOT = Path(__file__).resolve().parent.parent
 
 
@@ -24,16 +27,6 @@ def _family_key(filename: str) -> str:
     return re.sub(r"\s+", " ", stem).strip()
 
 
-def _sha256_file(path: Path) -> str:
-    """Compute sha256 hash of file bytes."""
-    import hashlib
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
 def _atomic_write(path: Path, content: str | bytes, mode: str = "w") -> None:
     """Write to .tmp then rename for atomicity."""
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -97,7 +90,7 @@ def ingest_one_pdf(
     index_root = Path(index_root).resolve()
     pdf_path = Path(pdf_path).resolve()
 
-    book_id = _sha256_file(pdf_path)
+    book_id = sha256_file(pdf_path)
     book_dir = index_root / "books" / book_id
     book_dir.mkdir(parents=True, exist_ok=True)
 
@@ -211,7 +204,7 @@ def ingest_pdfs_incremental(
     pdfs = sorted(pdf_dir.glob("*.pdf"))
 
     for pdf_path in pdfs:
-        book_id = _sha256_file(pdf_path)
+        book_id = sha256_file(pdf_path)
         filename = pdf_path.name
         existing = existing_by_id.get(book_id)
 
@@ -309,7 +302,7 @@ def ingest_pdfs_incremental(
 
 def rebuild_search_index(index_root: Path) -> None:
     """
-    Rebuild global TF-IDF search index (data.json, vectorizer.pkl, vectors.pkl)
+    Rebuild global TF-IDF search index (data.msgpack/data.json, vectorizer.pkl, vectors_*.npy)
     from all ready books in the library.
     """
     index_root = Path(index_root).resolve()
@@ -324,7 +317,16 @@ def rebuild_search_index(index_root: Path) -> None:
     if not ready:
         return
 
-    for name in ("data.json", "vectorizer.pkl", "vectors.pkl"):
+    for name in (
+        "data.json",
+        "data.msgpack",
+        "vectorizer.pkl",
+        "vectors.pkl",
+        "vectors_data.npy",
+        "vectors_indices.npy",
+        "vectors_indptr.npy",
+        "vectors_shape.json",
+    ):
         p = index_root / name
         if p.exists():
             p.unlink()
@@ -334,6 +336,8 @@ def rebuild_search_index(index_root: Path) -> None:
     search = TextbookSearchOffline(db_path=str(index_root))
     books_dir = index_root / "books"
 
+    # Collected first so TF-IDF is fitted and saved once for the library
+    books = []
     for b in ready:
         book_id = b["book_id"]
         chunks_file = books_dir / book_id / "chunks.jsonl"
@@ -342,4 +346,6 @@ def rebuild_search_index(index_root: Path) -> None:
         display_name = b.get("filename", book_id)
         if display_name.endswith(".pdf"):
             display_name = display_name[:-4]
-        search.load_textbook(chunks_file, book_name=display_name)
+        books.append((chunks_file, display_name))
+    # Per-book term counts are cached, so only new or changed books are tokenized
+    search.load_textbooks(books, cache_counts=True)
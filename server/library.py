@@ -11,6 +11,8 @@ from __future__ import annotations
 
 import hashlib
 import json
+import mmap
+import os
 import re
 import shutil
 import time as _time
@@ -41,13 +43,18 @@ def _family_key(filename: str) -> str:
     return re.sub(r"\s+", " ", stem).strip()
 
 
-def _sha256_file(path: Path) -> str:
-    """Compute sha256 hash of file bytes."""
-    h = hashlib.sha256()
+def sha256_file(path: Path) -> str:
+    """
+    Compute sha256 hash of file bytes. The one hasher for book IDs
+    (scripts.ingest_library) and run_pipeline's ingest stamps.
+    """
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            h.update(chunk)
-    return h.hexdigest()
+        if not os.fstat(f.fileno()).st_size:
+            # mmap cannot map an empty file
+            return hashlib.sha256().hexdigest()
+        # Hashed straight from the page cache: no read() copies into Python
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
 
 
 def load_library(index_root: Path) -> Optional[Dict[str, Any]]:
@@ -18,10 +18,23 @@ def _family_key(filename: str) -> str:
     return re.sub(r"\s+", " ", stem).strip()
 
 
+def _read_legacy_data(msgpack_file: Path, data_file: Path) -> Dict[str, Any]:
+    """Read the legacy documents/metadatas store, preferring MessagePack."""
+    if msgpack_file.exists():
+        try:
+            import msgpack
+        except ImportError:
+            msgpack = None
+        if msgpack is not None:
+            return msgpack.unpackb(msgpack_file.read_bytes(), raw=False)
+    with open(data_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def get_index_status(index_root: Path, pdf_dir: Path) -> Dict[str, Any]:
     """
     Return index status. Cheap: reads library.json only when present,
-    else falls back to data.json (legacy).
+    else falls back to data.msgpack / data.json (legacy).
     """
     index_root = Path(index_root).resolve()
     pdf_dir = Path(pdf_dir).resolve()
@@ -32,17 +45,17 @@ def get_index_status(index_root: Path, pdf_dir: Path) -> Dict[str, Any]:
     if lib_status["index_exists"]:
         return lib_status
 
-    # Fallback: legacy data.json
+    # Fallback: legacy data.msgpack / data.json
+    msgpack_file = index_root / "data.msgpack"
     data_file = index_root / "data.json"
-    index_exists = data_file.exists()
+    index_exists = msgpack_file.exists() or data_file.exists()
     index_ready = False
     chunk_count = 0
     book_counts: List[Dict[str, Any]] = []
 
     if index_exists:
         try:
-            with open(data_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = _read_legacy_data(msgpack_file, data_file)
             documents = data.get("documents", [])
             metadatas = data.get("metadatas", [])
             chunk_count = len(documents)
@@ -56,7 +69,7 @@ def get_index_status(index_root: Path, pdf_dir: Path) -> Dict[str, Any]:
                 {"book": name, "chunks": count}
                 for name, count in sorted(counts.items())
             ]
-        except (json.JSONDecodeError, OSError):
+        except (ValueError, OSError):
             index_ready = False
 
     return {
@@ -467,8 +480,17 @@ def clear_index(index_root: Path, project_root: Path) -> None:
     for name in [
         "library.json",
         "data.json",
+        "data.msgpack",
         "vectorizer.pkl",
         "vectors.pkl",
+        "vectors_data.npy",
+        "vectors_indices.npy",
+        "vectors_indptr.npy",
+        "vectors_shape.json",
+        "qa_meta.json",
+        "qa_meta.msgpack",
+        "qa_idf.pkl",
+        "q_vectors.npz",
         "study_cards.jsonl",
         "session_log.jsonl",
         "graph_registry.json",
@@ -194,7 +194,7 @@ def _ingest_with_progress(
     from scripts.ingest_library import (
         _atomic_write,
         _family_key,
-        _sha256_file,
+        sha256_file,
         ingest_one_pdf,
     )
     from scripts.ingest_library import rebuild_search_index
@@ -234,7 +234,7 @@ def _ingest_with_progress(
             break
         progress_cb(i, len(pdfs), pdf_path.name)
 
-        book_id = _sha256_file(pdf_path)
+        book_id = sha256_file(pdf_path)
         filename = pdf_path.name
         existing = existing_by_id.get(book_id)
 
@@ -133,12 +133,12 @@ def run_upload_job(
     try:
         from scripts.ingest_library import (
             _atomic_write,
-            _sha256_file,
+            sha256_file,
             _sections_to_chunks_jsonl,
         )
 
         base_name = pdf_path.stem
-        book_id = _sha256_file(pdf_path)
+        book_id = sha256_file(pdf_path)
         index_root = Path(index_root).resolve()
         uploads_root = Path(uploads_root).resolve()
 
@@ -21,8 +21,13 @@ from rag.build_content_corpus import (
    subchunk_text,
    build_corpus,
    make_chunk_id,
+   hash_chunk_id,
    get_page_types_in_range,
    looks_like_toc,
+   analyze_and_clean,
+   excluded_page_types,
+   page_filter_reason,
+   text_filter_reason,
    CorpusConfig,
 )
 
@@ -241,6 +246,78 @@ def test_clean_text_removes_toc_lines():
    assert "Some real content here" in cleaned
 
 
+def test_analyze_and_clean_signals():
+   """One pass yields the cleaned text plus the phrase, structural and dot-leader signals."""
+   toc = analyze_and_clean(TOC_SECTION['text'])
+   assert toc.contains_toc_phrase is True
+   assert toc.looks_like_toc is True
+   assert toc.dot_leader_count == 6
+   assert toc.cleaned == clean_text(TOC_SECTION['text']) == ''
+
+   text = "Intro\r\nSee Table of\r\nContents first.\r\n\r\n\r\n\r\nStep . . . . 3\r\nBody text."
+   analysis = analyze_and_clean(text)
+   assert analysis.contains_toc_phrase is True     # phrase spans a line break
+   assert analysis.looks_like_toc is False
+   assert analysis.dot_leader_count == 1
+   assert analysis.cleaned == "Intro\nSee Table of\nContents first.\n\nBody text."
+
+
+def _reference_clean_text(text):
+   """The original per-line cleaner, kept as an oracle for the gated single pass."""
+   import re
+   text = text.replace('\r\n', '\n').replace('\r', '\n')
+   kept = []
+   for line in text.split('\n'):
+      if re.search(r'table\s+of\s+contents', line, re.IGNORECASE):
+         continue
+      stripped = line.strip()
+      if stripped and (re.search(r'(?:\.\s*){3,}.*\b\d+\s*$', stripped)
+                       or re.search(r'(?:\.\s*){4,}\s*$', stripped)):
+         if len(re.findall(r'[.\s]', stripped)) / len(stripped) > 0.5:
+            continue
+      kept.append(line)
+   return re.sub(r'\n{3,}', '\n\n', '\n'.join(kept)).strip()
+
+
+def test_analyze_and_clean_matches_reference_cleaner():
+   """Texts with and without dot runs / TOC phrases clean exactly as the per-line loop did."""
+   import random
+   samples = [
+      "Plain prose sentence.", "Wait... what?", ". . . . . 7", "Intro . . . . . . .",
+      "Table of Contents", "see table of", "contents here", "", "   ", "x = 1.5",
+      ". .", ".", "Overview ........ 12", "\xa0. . . .\xa0",
+      "... page_7", "1.2 Heaps . . . x42", "Sorting . . . \u0663", "....5",
+   ]
+   rng = random.Random(5)
+   for _ in range(500):
+      text = rng.choice(['\n', '\r\n', '\n\n\n']).join(
+         rng.choice(samples) for _ in range(rng.randrange(0, 10)))
+      assert analyze_and_clean(text).cleaned == _reference_clean_text(text), repr(text)
+
+
+def test_classify_line_matches_dot_leader_regexes():
+   """The string-method line classifier flags exactly the lines the two dot-leader regexes match."""
+   import random
+   from rag.build_content_corpus import (
+      _classify_line, _DOT_LEADER_RE, _DOT_LEADER_BARE_RE, _LINE_DOT_LEADER, _LINE_BARE_DOTS,
+   )
+   pieces = ['.', '.', ' ', '\t', '1', '42', 'a', '_', '-', '\u00b2', '\u0663', ' . . ']
+   rng = random.Random(11)
+   for _ in range(20000):
+      line = ''.join(rng.choice(pieces) for _ in range(rng.randrange(0, 12))).strip()
+      expected = ((_LINE_DOT_LEADER if _DOT_LEADER_RE.search(line) else 0)
+                  | (_LINE_BARE_DOTS if _DOT_LEADER_BARE_RE.search(line) else 0))
+      assert _classify_line(line, ''.join(line.split())) == expected, repr(line)
+
+
+def test_check_filters_uses_given_analysis():
+   """check_filters gives the same verdict with a precomputed analysis as without."""
+   config = CorpusConfig()
+   for record in (TOC_SECTION, CONTENT_SECTION, NORMAL_SHORT_SECTION):
+      analysis = analyze_and_clean(record['text'])
+      assert check_filters(record, {}, config, analysis) == check_filters(record, {}, config)
+
+
 def test_clean_section_title():
    """clean_section_title should strip dot padding."""
    title = "Introduction . . . . . . . . . . . . . . . . . . . . 1"
@@ -288,6 +365,25 @@ def test_empty_text_returns_empty():
    assert len(subchunks) == 0 or (len(subchunks) == 1 and not subchunks[0].strip())
 
 
+def test_subchunk_word_counts_are_carried_not_recounted():
+   """Carried per-subchunk counts equal a fresh split() count on every path (merge, sentences, lines, run-on)."""
+   import random
+   from rag.build_content_corpus import subchunk_text_with_counts
+   config = CorpusConfig(target_min_words=30, target_max_words=60, hard_max_words=90)
+   rng = random.Random(2)
+   words = ["alpha", "beta", "gamma", "delta", "Tree.", "Heap."]
+   for _ in range(200):
+      paras = []
+      for _ in range(rng.randrange(0, 6)):
+         n = rng.choice([3, 20, 80, 200])
+         sep = rng.choice([' ', '\n'])
+         paras.append(sep.join(rng.choice(words) for _ in range(n)))
+      text = '\n\n'.join(paras)
+      pairs = subchunk_text_with_counts(text, config)
+      assert [sub for sub, _ in pairs] == subchunk_text(text, config)
+      assert [wc for _, wc in pairs] == [len(sub.split()) for sub, _ in pairs]
+
+
 # ============================================================================
 # TESTS: CHUNK ID
 # ============================================================================
@@ -313,6 +409,36 @@ def test_chunk_id_handles_none():
    assert "secX" in chunk_id
 
 
+def test_hash_chunk_id_fixed_width():
+   """Hashed IDs are 32 hex chars, deterministic, and distinct per raw ID."""
+   raw0 = make_chunk_id("a very long book name " * 5, 3, "3.2", 45, 46, 0, 0)
+   raw1 = make_chunk_id("a very long book name " * 5, 3, "3.2", 45, 46, 0, 1)
+   assert len(hash_chunk_id(raw0)) == 32
+   assert hash_chunk_id(raw0) == hash_chunk_id(raw0)
+   assert hash_chunk_id(raw0) != hash_chunk_id(raw1)
+   int(hash_chunk_id(raw0), 16)
+
+
+def test_build_corpus_hashed_chunk_ids():
+   """hash_chunk_ids swaps chunk_id for its digest and keeps the readable ID in provenance."""
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      sections_path = tmpdir / "sections.jsonl"
+      _write_jsonl(sections_path, [CONTENT_SECTION])
+
+      build_corpus(sections_path, None, tmpdir / "plain", verbose=False)
+      build_corpus(sections_path, None, tmpdir / "hashed", verbose=False,
+                   config=CorpusConfig(hash_chunk_ids=True))
+      plain = _read_jsonl(tmpdir / "plain" / "test_book" / "chunks_content.jsonl")
+      hashed = _read_jsonl(tmpdir / "hashed" / "test_book" / "chunks_content.jsonl")
+
+   assert len(hashed) == len(plain) > 0
+   for p, h in zip(plain, hashed):
+      assert h["chunk_id"] == hash_chunk_id(p["chunk_id"])
+      assert h["provenance"]["chunk_id_human"] == p["chunk_id"]
+      assert "chunk_id_human" not in p["provenance"]
+
+
 # ============================================================================
 # TESTS: PROVENANCE
 # ============================================================================
@@ -469,6 +595,43 @@ def test_looks_like_toc_normal_content():
    assert looks_like_toc(CONTENT_SECTION['text']) is False
 
 
+def _reference_looks_like_toc(text):
+   """The original per-line implementation, kept as an oracle for the single-scan version."""
+   import re
+   dot = re.compile(r'(?:\.\s*){3,}.*\b\d+\s*$')
+   bare_dot = re.compile(r'(?:\.\s*){4,}\s*$')
+   secpage = re.compile(r'^\d+(?:\.\d+)+\s+.*\b\d+\s*$')
+   bare = re.compile(r'^\d+(?:\.\d+)+\s*$')
+   lines = [ln.strip() for ln in text.split('\n') if ln.strip()]
+   return (
+      sum(1 for ln in lines if dot.search(ln) or bare_dot.search(ln)) >= 5
+      or sum(1 for ln in lines if secpage.match(ln)) >= 5
+      or sum(1 for ln in lines if bare.match(ln)) >= 8
+   )
+
+
+def test_looks_like_toc_matches_per_line_reference():
+   """Single-scan detection agrees with the per-line checks, including lines that hit two signals."""
+   import random
+   samples = [
+      "1.2 Overview . . . . . 5", "  1.2 Overview . . . . . 5  ", "1.2.1", "  10.3.4 \t",
+      "Topic . . . . . . . .", "Topic........42", "3.1 Heaps 12", "Chapter 3 . .", ".", "..",
+      "", "   ", "Binary search runs in O(log n) time.", "1.2 and then 3", "1.23   ",
+      "x = a.b.c.d", ". . .\r", "2.1 Arrays\t 11\r", ". . . . 12", "Intro . . . 7 . . . .",
+      "1.2.3 . . . . 4", "....", "a...b 3x", "1.2.", "7.1 Trees..9",
+   ]
+   rng = random.Random(11)
+   for _ in range(400):
+      text = '\n'.join(rng.choice(samples) for _ in range(rng.randrange(0, 14)))
+      assert looks_like_toc(text) == _reference_looks_like_toc(text), repr(text)
+
+   # Lines split across newlines never combine into one dot-leader
+   assert looks_like_toc(".\n.\n.\n.\n5\n" * 5) is False
+   # Three lines that are both dot-leader and section-page, plus two section-page only
+   mixed = "1.1 A . . . . 2\n1.2 B . . . . 3\n1.3 C . . . . 4\n1.4 D 5\n1.5 E 6\n"
+   assert looks_like_toc(mixed) is True
+
+
 # ============================================================================
 # TESTS: TOC page classification filtering (the bug)
 # ============================================================================
@@ -546,3 +709,78 @@ def test_allow_page_types_whitelist():
    reason = check_filters(NORMAL_SHORT_SECTION, page_cls, config)
    # NORMAL_SHORT_SECTION is on page 80, not page 1 — no filtering expected
    assert reason is None
+
+
+def test_page_and_text_filters_compose_check_filters():
+   """check_filters is the page filter, then the text filter on the record's analysis."""
+   config = CorpusConfig()
+   page_cls = {80: {"page_type": "index", "confidence": 0.9}}
+   for record in (TOC_SECTION, CONTENT_SECTION, NORMAL_SHORT_SECTION):
+      for cls in ({}, page_cls):
+         expected = (page_filter_reason(record, cls, config)
+                     or text_filter_reason(record, analyze_and_clean(record['text']), config))
+         assert check_filters(record, cls, config) == expected
+   assert page_filter_reason(NORMAL_SHORT_SECTION, page_cls, config) == "page_index_confidence_0.9"
+   assert page_filter_reason(NORMAL_SHORT_SECTION, page_cls, CorpusConfig(include_noncontent=True)) is None
+
+
+def test_excluded_page_types_precomputed():
+   """A precomputed excluded_types set gives the same verdicts as computing it per record."""
+   config = CorpusConfig(allow_page_types={"toc"})
+   excluded = excluded_page_types(config)
+   assert excluded == frozenset({"index", "front_matter", "blankish"})
+
+   record = dict(NORMAL_SHORT_SECTION, page_start=1, page_end=2)
+   for page_type in ("toc", "index"):
+      page_cls = {2: {"page_type": page_type, "confidence": 1.0}}
+      assert (check_filters(record, page_cls, config, excluded_types=excluded)
+              == check_filters(record, page_cls, config))
+   assert check_filters(record, {2: {"page_type": "index", "confidence": 1.0}}, config,
+                        excluded_types=excluded) == "page_index_confidence_1.0"
+
+
+def test_iter_corpus_batches_pool_is_opt_in(monkeypatch):
+   """workers=None builds large inputs in-process; no pool is started."""
+   import rag.build_content_corpus as bcc
+
+   def no_pool(*args, **kwargs):
+      raise AssertionError("workers=None must not start a process pool")
+
+   monkeypatch.setattr(bcc, "ProcessPoolExecutor", no_pool)
+   lines = [
+      json.dumps(dict(CONTENT_SECTION, chunk_index=i)).encode() + b"\n"
+      for i in range(bcc.PARALLEL_MIN_RECORDS)
+   ]
+   batches = list(bcc.iter_corpus_batches(lines, "test_book", {}, CorpusConfig()))
+   assert sum(stats['total_input'] for _, _, stats, _, _ in batches) == len(lines)
+
+
+def test_build_corpus_parallel_matches_serial():
+   """Process-pool batches produce byte-identical outputs and the same stats as one process."""
+   from rag.build_content_corpus import PARALLEL_MIN_RECORDS
+   records = []
+   for i in range(PARALLEL_MIN_RECORDS + 40):
+      base = (TOC_SECTION, CONTENT_SECTION, NORMAL_SHORT_SECTION)[i % 3]
+      records.append(dict(base, chunk_index=i, page_start=1 + i % 90, page_end=2 + i % 90))
+   page_cls = [{"pdf_page_number": 5, "page_type": "index", "confidence": 0.95}]
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      sections_path = tmpdir / "sections.jsonl"
+      cls_path = tmpdir / "cls.jsonl"
+      _write_jsonl(sections_path, records)
+      _write_jsonl(cls_path, page_cls)
+
+      outputs = {}
+      for workers in (1, 2):
+         out_root = tmpdir / f"out{workers}"
+         stats = build_corpus(sections_path, cls_path, out_root, verbose=False, workers=workers)
+         book_dir = out_root / "test_book"
+         outputs[workers] = (
+            stats,
+            (book_dir / "chunks_content.jsonl").read_bytes(),
+            (book_dir / "corpus_build_logs.jsonl").read_bytes(),
+         )
+
+   assert outputs[2] == outputs[1]
+   assert outputs[1][0]['total_input'] == len(records)
@@ -10,9 +10,11 @@ import sys
 import math
 from pathlib import Path
 
+import numpy as np
+
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from rag.embedding_client import DummyHashEmbeddingClient, ExternalEmbeddingClient
+from rag.embedding_client import DummyHashEmbeddingClient, ExternalEmbeddingClient, embed_texts
 
 
 def test_dummy_deterministic():
@@ -20,7 +22,7 @@ def test_dummy_deterministic():
    client = DummyHashEmbeddingClient(dim=64)
    v1 = client.embed("hello world")
    v2 = client.embed("hello world")
-   assert v1 == v2
+   assert np.array_equal(v1, v2)
 
 
 def test_dummy_different_inputs_differ():
@@ -28,7 +30,7 @@ def test_dummy_different_inputs_differ():
    client = DummyHashEmbeddingClient(dim=64)
    v1 = client.embed("hello world")
    v2 = client.embed("goodbye world")
-   assert v1 != v2
+   assert not np.array_equal(v1, v2)
 
 
 def test_dummy_correct_dim():
@@ -39,6 +41,37 @@ def test_dummy_correct_dim():
       assert len(v) == dim, f"Expected dim={dim}, got {len(v)}"
 
 
+def test_dummy_returns_float32_array():
+   """embed() returns a (dim,) float32 array, ready for FAISS without conversion."""
+   v = DummyHashEmbeddingClient(dim=32).embed("test text")
+   assert isinstance(v, np.ndarray)
+   assert v.dtype == np.float32 and v.shape == (32,)
+
+
+def test_dummy_embed_batch_matches_embed():
+   """embed_batch rows equal per-text embed() results, including an empty batch."""
+   client = DummyHashEmbeddingClient(dim=48)
+   texts = ["hello world", "", "binary heap", "hello world"]
+   batch = client.embed_batch(texts)
+   assert batch.shape == (4, 48) and batch.dtype == np.float32
+   assert np.allclose(batch, np.stack([client.embed(t) for t in texts]), atol=1e-7)
+   assert client.embed_batch([]).shape == (0, 48)
+
+
+def test_embed_texts_falls_back_to_embed():
+   """embed_texts stacks embed() for clients without embed_batch."""
+   class ListClient:
+      dim = 3
+
+      def embed(self, text):
+         return [float(len(text)), 0.0, 1.0]
+
+   out = embed_texts(ListClient(), ["ab", "abcd"])
+   assert out.dtype == np.float32
+   assert out.tolist() == [[2.0, 0.0, 1.0], [4.0, 0.0, 1.0]]
+   assert embed_texts(ListClient(), []).shape == (0, 3)
+
+
 def test_dummy_unit_normalized():
    """Vector is unit-normalized (L2 norm = 1.0)."""
    client = DummyHashEmbeddingClient(dim=64)
@@ -65,3 +98,58 @@ def test_external_raises_without_env():
    finally:
       if old is not None:
          os.environ['EMBEDDING_PROVIDER'] = old
+
+
+def test_external_caches_and_batches_misses(monkeypatch):
+   """Repeated texts come from the LRU cache; each batch's misses go to the provider once."""
+   monkeypatch.setenv('EMBEDDING_PROVIDER', 'test')
+
+   class CountingClient(ExternalEmbeddingClient):
+      def __init__(self, **kwargs):
+         super().__init__(**kwargs)
+         self.calls = []
+
+      def _embed_uncached(self, texts):
+         self.calls.append(list(texts))
+         return np.stack([DummyHashEmbeddingClient(dim=self.dim).embed(t) for t in texts])
+
+   client = CountingClient(dim=8, cache_size=2)
+   batch = client.embed_batch(["a", "b", "a"])
+   assert client.calls == [["a", "b"]]
+   assert np.array_equal(batch[0], batch[2])
+
+   assert np.array_equal(client.embed("b"), batch[1])
+   assert client.calls == [["a", "b"]]
+
+   client.embed("c")               # evicts "a", the least recently used
+   client.embed_batch(["a", "b"])
+   assert client.calls == [["a", "b"], ["c"], ["a"]]
+   assert client.embed_batch([]).shape == (0, 8)
+
+
+def test_embed_chunks_batches_in_order(tmp_path):
+   """embed_chunks sends batch_size texts per embed_batch call and keeps record order."""
+   import json
+   from scripts.embed_chunks import embed_chunks
+
+   class CountingClient(DummyHashEmbeddingClient):
+      def __init__(self):
+         super().__init__(dim=8)
+         self.batches = []
+
+      def embed_batch(self, texts):
+         self.batches.append(len(texts))
+         return super().embed_batch(texts)
+
+   input_path = tmp_path / "chunks.jsonl"
+   with open(input_path, 'w', encoding='utf-8') as f:
+      for i in range(10):
+         f.write(json.dumps({"chunk_id": f"c{i}", "text": f"chunk {i}"}) + '\n\n')
+
+   client = CountingClient()
+   stats = embed_chunks(input_path, tmp_path / "out.jsonl", client, verbose=False, batch_size=4)
+   assert stats["count"] == 10 and client.batches == [4, 4, 2]
+
+   rows = [json.loads(line) for line in open(tmp_path / "out.jsonl", encoding='utf-8')]
+   assert [r["chunk_id"] for r in rows] == [f"c{i}" for i in range(10)]
+   assert np.allclose([r["embedding"] for r in rows], [client.embed(r["text"]) for r in rows], atol=1e-7)
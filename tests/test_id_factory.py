@@ -0,0 +1,25 @@
+"""Tests for id_factory.IDFactory: cached-prefix IDs match plain uuid5."""
+
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from id_factory import IDFactory, _norm
+
+
+def test_page_and_section_ids_match_uuid5_names():
+    ns = IDFactory._ns()
+    for book_id in ("abc-123", "  Mixed  Case Book ", "ünïcode"):
+        for n in (1, 2, 250):
+            name = f"page|book:{_norm(book_id)}|number:{n}"
+            assert IDFactory.page_id(book_id, n) == str(uuid.uuid5(ns, name))
+        for key in ("practice exercises", "Exercise  Solutions", "1.2"):
+            name = f"section|book:{_norm(book_id)}|{_norm(key)}|key:{_norm(key)}"
+            assert IDFactory.section_id(book_id, key) == str(uuid.uuid5(ns, name))
+
+
+def test_ids_are_scoped_per_book():
+    assert IDFactory.page_id("book-a", 1) != IDFactory.page_id("book-b", 1)
+    assert IDFactory.page_id("book-a", 1) == IDFactory.page_id("BOOK-A ", 1)
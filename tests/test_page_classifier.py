@@ -285,3 +285,14 @@ def test_signals_always_present():
     _, _, signals = classify_page(CONTENT_TEXT, pdf_page_number=1)
     missing = expected_keys - set(signals.keys())
     assert not missing, f"Missing signal keys: {missing}"
+
+
+def test_import_stays_light():
+    """Spawned classifier workers must not import the conversion stack."""
+    import subprocess
+    root = Path(__file__).resolve().parent.parent
+    code = ("import sys, legacy.page_classifier; "
+            "print(any(m in sys.modules for m in ('pdf_to_jsonl', 'fitz', 'numpy')))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=root,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for legacy/pagerecords_reader.py and the page-iterable scanner entry points.
+
+Run:  pytest tests/test_pagerecords_reader.py -v
+"""
+
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from legacy.pagerecords_reader import PageRecordsReader, iter_pagerecords, load_pagerecords, page_text_map
+from legacy.chapter_scanner import scan_pagerecords_for_chapters, scan_pages_for_chapters
+from legacy.section_scanner import scan_pagerecords_for_sections, scan_pages_for_sections
+from legacy.section_text_extractor import load_page_text_map
+
+
+def _write_pagerecords(path: Path, texts):
+   with open(path, 'w', encoding='utf-8') as f:
+      for i, text in enumerate(texts, 1):
+         f.write(json.dumps({"pdf_page_number": i, "text": text}) + '\n')
+         if i == 2:
+            f.write('{not json\n\n')
+
+
+TEXTS = [
+   "Preface\nSome words",
+   "Chapter 1\nIntroduction\nbody",
+   "1.1 Getting Started\nbody",
+   "more body text",
+   "1.2 Next Steps\nbody",
+   "Exercises\n1. Do a thing",
+   "plain page",
+   "Chapter 2\nAdvanced Topics\nbody",
+   "2.1 Deeper\nbody",
+]
+
+
+def test_reader_skips_blank_and_malformed_lines():
+   with tempfile.TemporaryDirectory() as tmp:
+      path = Path(tmp) / "book_PageRecords"
+      _write_pagerecords(path, TEXTS)
+
+      pages = load_pagerecords(path)
+      assert [p["pdf_page_number"] for p in pages] == list(range(1, len(TEXTS) + 1))
+      assert list(iter_pagerecords(path)) == pages
+      assert page_text_map(pages) == load_page_text_map(path)
+
+
+def test_page_scanners_match_file_scanners():
+   with tempfile.TemporaryDirectory() as tmp:
+      path = Path(tmp) / "book_PageRecords"
+      _write_pagerecords(path, TEXTS)
+      pages = load_pagerecords(path)
+
+      from_file = scan_pagerecords_for_chapters(path, min_page_gap=1, verbose=False)
+      from_pages = scan_pages_for_chapters(pages, min_page_gap=1, verbose=False)
+      assert [b.to_dict() for b in from_file] == [b.to_dict() for b in from_pages]
+      assert [b.chapter_number for b in from_pages] == [1, 2]
+
+      sec_file = scan_pagerecords_for_sections(path, verbose=False)
+      sec_pages = scan_pages_for_sections(pages, verbose=False)
+      assert [s.to_dict() for s in sec_file] == [s.to_dict() for s in sec_pages]
+      assert [s.section_number for s in sec_pages] == ["1.1", "1.2", "2.1"]
+
+
+def test_reader_random_access_and_edge_files():
+   with tempfile.TemporaryDirectory() as tmp:
+      path = Path(tmp) / "book_PageRecords"
+      _write_pagerecords(path, TEXTS)
+
+      with PageRecordsReader(path) as reader:
+         # 9 pages plus the malformed and blank lines written after page 2
+         assert len(reader) == len(TEXTS) + 2
+         assert reader.get(0)["text"] == TEXTS[0]
+         assert reader.get(len(reader) - 1)["pdf_page_number"] == len(TEXTS)
+         assert reader.raw(3) == b""
+         assert list(reader) == load_pagerecords(path)
+
+      empty = Path(tmp) / "empty_PageRecords"
+      empty.write_bytes(b"")
+      assert load_pagerecords(empty) == []
+
+      no_trailing = Path(tmp) / "nt_PageRecords"
+      no_trailing.write_bytes(b'{"pdf_page_number": 1, "text": "a"}\n{"pdf_page_number": 2, "text": "b"}')
+      with PageRecordsReader(no_trailing) as reader:
+         assert len(reader) == 2
+         assert reader.get(1)["text"] == "b"
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Tests for pdf_to_jsonl.py page-level helpers.
+
+Covers:
+  - words_to_text: layout reconstruction from PyMuPDF word tuples
+  - words_to_dict / dumps_jsonl_line: dict fast path matches the dataclass path
+  - json_default: encoder hook matches to_jsonable
+  - section_ids_for_text: practice/solution heuristics
+  - iter_page_dicts: sharded process-pool extraction matches serial output
+
+Run:  pytest tests/test_pdf_to_jsonl.py -v
+"""
+
+import sys
+import random
+import tempfile
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from id_factory import IDFactory
+import json
+
+from pdf_to_jsonl import (
+   words_to_text, words_to_dict, to_jsonable, group_sections_per_page,
+   dumps_jsonl_line, json_default, DocumentRecord, iter_page_dicts, section_ids_for_text, PARALLEL_MIN_PAGES,
+   PRACTICE_KEYWORDS, SOLUTION_KEYWORDS,
+)
+
+
+BOOK_ID = IDFactory.book_id("test-book-pdf-to-jsonl")
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+class _FakePage:
+   """Minimal stand-in for a PyMuPDF page: get_text("words"/"text") and .number."""
+
+   def __init__(self, words, number=0, text=None):
+      self._words = words
+      self._text = text
+      self.number = number
+
+   def get_text(self, mode):
+      if mode == "text":
+         return self._text
+      assert mode == "words"
+      return list(self._words)
+
+
+def _reference_layout(words):
+   """The original per-word loop (sorted by block, line, x0), kept as an oracle for the vectorised version."""
+   words = sorted(words, key=lambda w: (w[5], w[6], w[0]))
+   lines, current_line, prev = [], [], None
+   for w in words:
+      x0, y0, x1, y1, text, block_no, line_no, word_no = w
+      if prev is None:
+         current_line = [text]
+      elif (block_no, line_no) != (prev[5], prev[6]):
+         lines.append(' '.join(current_line))
+         current_line = [text]
+      elif x0 - prev[2] >= 2.0:
+         current_line.append(text)
+      else:
+         current_line[-1] = current_line[-1] + text
+      prev = w
+   if current_line:
+      lines.append(' '.join(current_line))
+   return '\n'.join(lines)
+
+
+def _random_words(rng, n):
+   words = []
+   for i in range(n):
+      block, line = rng.randrange(3), rng.randrange(4)
+      x0 = rng.choice([10.0, 40.0, 41.5, 70.0, 72.0, 100.0]) + rng.random()
+      y0 = 100.0 + 12 * line
+      words.append((x0, y0, x0 + rng.uniform(5, 30), y0 + 10,
+                    f"w{i}", block, line, i))
+   return words
+
+
+# ============================================================================
+# TESTS: words_to_text
+# ============================================================================
+
+def test_words_to_text_matches_reference_layout():
+   """Vectorised layout equals the original loop on shuffled, glued and multi-line input."""
+   rng = random.Random(7)
+   for n in (1, 2, 5, 40, 300):
+      words = _random_words(rng, n)
+      rng.shuffle(words)
+      page = words_to_text(_FakePage(words), book_id=BOOK_ID)
+      assert page.text == _reference_layout(words)
+      assert page.word_count == n
+
+
+def test_words_to_text_glues_close_words():
+   """Words closer than the gap threshold are concatenated; lines split on (block, line)."""
+   words = [
+      (10.0, 100.0, 30.0, 110.0, "Hash", 0, 0, 0),
+      (30.5, 100.0, 50.0, 110.0, "ing", 0, 0, 1),
+      (55.0, 100.0, 80.0, 110.0, "works", 0, 0, 2),
+      (10.0, 112.0, 30.0, 122.0, "Next", 0, 1, 0),
+   ]
+   page = words_to_text(_FakePage(words, number=4), book_id=BOOK_ID)
+   assert page.text == "Hashing works\nNext"
+   assert page.pdf_page_number == 5
+   assert page.id == IDFactory.page_id(BOOK_ID, 5)
+
+
+def test_words_to_text_orders_raised_words_by_x0():
+   """A raised word (smaller y0) on the same line stays in left-to-right position."""
+   words = [
+      (10.0, 100.0, 30.0, 110.0, "x", 0, 0, 0),
+      (33.0, 96.0, 38.0, 102.0, "2", 0, 0, 1),
+      (45.0, 100.0, 60.0, 110.0, "plus", 0, 0, 2),
+   ]
+   page = words_to_text(_FakePage(words), book_id=BOOK_ID)
+   assert page.text == "x 2 plus"
+
+
+def test_words_to_text_empty_page():
+   """A page without words yields an empty PageRecord."""
+   page = words_to_text(_FakePage([]), book_id=BOOK_ID)
+   assert page.text == ''
+   assert page.word_count == 0
+
+
+def test_words_to_text_text_mode_uses_mupdf_text():
+   """mode='text' takes MuPDF's text output and counts whitespace-separated words."""
+   page = _FakePage([], text="Chapter 1: Sorting\nQuicksort partitions the array.\n")
+   record = words_to_text(page, book_id=BOOK_ID, mode="text")
+   assert record.text.startswith("Chapter 1: Sorting")
+   assert record.word_count == 7
+
+   empty = words_to_text(_FakePage([], text=None), book_id=BOOK_ID, mode="text")
+   assert empty.text == '' and empty.word_count == 0
+
+
+def test_words_to_text_unknown_mode_raises():
+   """Unknown layout modes are rejected."""
+   import pytest
+   with pytest.raises(ValueError):
+      words_to_text(_FakePage([]), book_id=BOOK_ID, mode="columns")
+
+
+def test_words_to_dict_matches_dataclass_path():
+   """words_to_dict emits exactly what to_jsonable(words_to_text(...)) + section heuristics did."""
+   rng = random.Random(7)
+   pages = [
+      _FakePage(_random_words(rng, 40), number=3),
+      _FakePage([], number=5),
+      _FakePage([], number=6, text="Review Questions\n1. What is a heap?\nAnswers\n"),
+   ]
+   for page, mode in zip(pages, ("words", "words", "text")):
+      record = words_to_text(page, book_id=BOOK_ID, mode=mode)
+      record.section_ids = group_sections_per_page(record)
+      expected = to_jsonable(record)
+
+      d = words_to_dict(page, book_id=BOOK_ID, mode=mode)
+      assert d == expected
+      assert list(d) == list(expected)
+      assert json.loads(dumps_jsonl_line(d)) == expected
+      assert dumps_jsonl_line(d).endswith(b"\n")
+
+   assert len(words_to_dict(pages[2], book_id=BOOK_ID, mode="text")["section_ids"]) == 2
+
+
+def test_json_default_matches_to_jsonable():
+   """Encoding with json_default gives the same document as dumping to_jsonable() output."""
+   book = DocumentRecord(title="Algorithms", id="b1", related_readings={"z", "a"})
+   book.page_ids.update({"p2", "p1"})
+   book.section_ids.add("s1")
+   book.references = ["r1"]
+
+   fast = json.dumps(book, default=json_default, indent=2, ensure_ascii=False, sort_keys=True)
+   slow = json.dumps(to_jsonable(book), indent=2, ensure_ascii=False, sort_keys=True)
+   assert fast == slow
+   assert json.loads(fast)["page_ids"] == ["p1", "p2"]
+
+
+def test_section_ids_for_text_keywords_and_headings():
+   """Every keyword (any case) and the standalone headings map to the two fixed section IDs."""
+   practice = IDFactory.section_id(BOOK_ID, "practice exercises")
+   solutions = IDFactory.section_id(BOOK_ID, "exercise solutions")
+
+   for kw in PRACTICE_KEYWORDS:
+      assert section_ids_for_text(f"Intro\n{kw.upper()} for chapter 3", BOOK_ID) == {practice}
+   for kw in SOLUTION_KEYWORDS:
+      assert section_ids_for_text(f"See the {kw.title()} below", BOOK_ID) == {solutions}
+
+   assert section_ids_for_text("text\nProblems  \nmore\nANSWERS\n", BOOK_ID) == {practice, solutions}
+   assert section_ids_for_text("No problems here, and no answers either.", BOOK_ID) == set()
+   assert section_ids_for_text(None, BOOK_ID) == set()
+
+
+# ============================================================================
+# iter_page_dicts
+# ============================================================================
+
+def test_iter_page_dicts_parallel_matches_serial():
+   """Sharded extraction yields the same records, in the same order, as one process."""
+   doc = fitz.open()
+   n_pages = PARALLEL_MIN_PAGES + 5
+   for i in range(n_pages):
+      page = doc.new_page(width=612, height=792)
+      page.insert_text((72, 72), f"Page {i + 1} of the sharded test book.", fontsize=12)
+   with tempfile.TemporaryDirectory() as tmp:
+      pdf_path = Path(tmp) / "sharded.pdf"
+      doc.save(pdf_path)
+      doc.close()
+
+      serial = list(iter_page_dicts(pdf_path, BOOK_ID, n_pages, workers=1))
+      parallel = list(iter_page_dicts(pdf_path, BOOK_ID, n_pages, workers=2))
+
+   assert [d["pdf_page_number"] for d in serial] == list(range(1, n_pages + 1))
+   assert parallel == serial
+
+
+def test_iter_page_dicts_pool_is_opt_in(monkeypatch):
+   """workers=None extracts in-process even for long books; no pool is started."""
+   import pdf_to_jsonl
+
+   def no_pool(*args, **kwargs):
+      raise AssertionError("workers=None must not start a process pool")
+
+   monkeypatch.setattr(pdf_to_jsonl, "ProcessPoolExecutor", no_pool)
+   doc = fitz.open()
+   n_pages = PARALLEL_MIN_PAGES
+   for i in range(n_pages):
+      doc.new_page(width=612, height=792).insert_text((72, 72), f"Page {i + 1}", fontsize=12)
+   with tempfile.TemporaryDirectory() as tmp:
+      pdf_path = Path(tmp) / "long.pdf"
+      doc.save(pdf_path)
+      doc.close()
+      records = list(iter_page_dicts(pdf_path, BOOK_ID, n_pages))
+
+   assert len(records) == n_pages
@@ -333,3 +333,17 @@ def test_ids_match_across_backends():
         assert c["pdf_page_number"] == p["pdf_page_number"]
 
     pdf_path.unlink()
+
+
+def test_page_range_limits_extraction():
+    """page_range restricts both backends to the requested pages, numbered as in the full PDF."""
+    pdf_path = _make_test_pdf(["Page one.", "Page two.", "Page three.", "Page four."])
+
+    for backend in ("pymupdf", "legacy"):
+        records = list(extract_pagerecords(
+            pdf_path, BOOK_ID, backend=backend, page_range=range(1, 3)
+        ))
+        assert [r["pdf_page_number"] for r in records] == [2, 3]
+        assert records[0]["id"] == IDFactory.page_id(BOOK_ID, 2)
+
+    pdf_path.unlink()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the page-flag helpers in legacy/regex_parts.py.
+
+Run:  pytest tests/test_regex_parts.py -v
+"""
+
+import re
+import sys
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from legacy.regex_parts import (
+   CHAPTER_PATTERNS, SECTION_PATTERNS, QUESTION_HEADER_PATTERNS, ANSWER_HEADER_PATTERNS,
+   has_chapter, has_section, has_question, has_answer, scan_page_flags,
+)
+
+
+FRAGMENTS = [
+   "Chapter 3: Intro", "Chapter 2", "CHAPTER ONE - Basics", "ch. 4 - Trees", "1.2 Pointers",
+   "Section 1.2 - Heaps", "§1.2 Graphs", "A. Introduction here", "Practice Exercises", "Exercises",
+   "Answers", "Answer Key", "Selected Solutions", "Solutions to problems", "Review Questions",
+   "plain words ", "\n", " ",
+]
+
+
+def _any_pattern(patterns, text):
+   """The original per-pattern loop, kept as an oracle."""
+   return any(re.search(p, text, re.IGNORECASE) for p in patterns)
+
+
+def test_flags_match_per_pattern_search():
+   rng = random.Random(11)
+   for _ in range(3000):
+      text = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randrange(1, 6)))
+      expected = (
+         _any_pattern(CHAPTER_PATTERNS, text),
+         _any_pattern(SECTION_PATTERNS, text),
+         _any_pattern(QUESTION_HEADER_PATTERNS, text),
+         _any_pattern(ANSWER_HEADER_PATTERNS, text),
+      )
+      assert scan_page_flags(text) == expected
+      assert (has_chapter(text), has_section(text), has_question(text), has_answer(text)) == expected
+
+
+def test_flags_empty_text():
+   assert scan_page_flags('') == (False, False, False, False)
+   assert scan_page_flags(None) == (False, False, False, False)
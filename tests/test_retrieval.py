@@ -17,7 +17,9 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 import numpy as np
 
 from rag.embedding_client import DummyHashEmbeddingClient
-from rag.build_index import build_index, tokenize
+from rag.build_index import (
+   build_index, tokenize, SimpleBM25, decode_embedding, encode_embedding_b64, EMBEDDING_B64_KEY,
+)
 from rag.retrieve import Retriever
 
 
@@ -111,7 +113,7 @@ def _make_embedded_chunks(client):
    ]
 
    for chunk in chunks:
-      chunk['embedding'] = client.embed(chunk['text'])
+      chunk['embedding'] = client.embed(chunk['text']).tolist()
 
    return chunks
 
@@ -144,6 +146,107 @@ def test_tokenize_lowercases():
    assert "tree" in tokens
 
 
+def test_tokenize_single_scan_keeps_token_multiset():
+   """Words and symbols come out of one scan in text order, same tokens as before."""
+   import re
+   from collections import Counter
+   text = "std::Vector<int> A[i] <= b_2 && x += 1; Foo::bar() >> Out"
+   tokens = tokenize(text)
+   assert tokens[:5] == ["std", "::", "vector", "<", "int"]
+
+   words = re.findall(r'[a-zA-Z0-9_]+', text.lower())
+   symbols = re.findall(r'(::|<<|>>|[*&<>{}\[\]()+\-=])', text)
+   assert Counter(tokens) == Counter(words + symbols)
+
+
+# ============================================================================
+# TESTS: SimpleBM25
+# ============================================================================
+
+def _reference_bm25_scores(corpus, query, k1=1.5, b=0.75):
+   """Per-document BM25 Okapi loop, kept as an oracle for the inverted-index version."""
+   import math
+   from collections import Counter
+   n = len(corpus)
+   avgdl = sum(len(d) for d in corpus) / n
+   df = Counter(t for d in corpus for t in set(d))
+   scores = np.zeros(n)
+   for term in query:
+      if term not in df:
+         continue
+      idf = math.log((n - df[term] + 0.5) / (df[term] + 0.5) + 1.0)
+      for i, doc in enumerate(corpus):
+         tf = doc.count(term)
+         scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avgdl))
+   return scores
+
+
+def test_simple_bm25_matches_reference():
+   """Vectorised scoring equals the per-document loop, including repeated and unknown query terms."""
+   corpus = [tokenize(t) for t in (
+      "binary search tree insert", "hash table with chaining", "",
+      "tree traversal tree height", "std::map << tree",
+   )]
+   bm25 = SimpleBM25(corpus)
+   streamed = SimpleBM25(iter(corpus))
+   for query in (["tree"], ["tree", "tree", "hash"], ["missing"], [], ["::", "<<", "tree"]):
+      assert np.allclose(bm25.get_scores(query), _reference_bm25_scores(corpus, query))
+      assert np.array_equal(streamed.get_scores(query), bm25.get_scores(query))
+   assert bm25.get_top_n(["hash"], n=3) == [1]
+
+
+def test_simple_bm25_match_counts_distinct_terms():
+   """match_counts gives, per document, how many distinct given terms it contains."""
+   corpus = [tokenize(t) for t in (
+      "binary search tree insert", "hash table with chaining", "",
+      "tree traversal tree height", "std::map << tree",
+   )]
+   bm25 = SimpleBM25(iter(corpus))
+   for terms in (["tree"], ["tree", "tree", "hash", "missing"], [], ["::", "<<", "*"]):
+      expected = [len(set(terms) & set(doc)) for doc in corpus]
+      assert bm25.match_counts(terms).tolist() == expected
+
+
+def test_simple_bm25_loads_pre_postings_pickle():
+   """bm25.pkl files holding per-document Counters unpickle into a working index."""
+   import pickle
+   from collections import Counter
+   corpus = [["heap", "sort"], ["heap", "heap", "queue"], ["graph"]]
+   old = SimpleBM25.__new__(SimpleBM25)
+   old.__dict__.update({
+      "k1": 1.5, "b": 0.75, "corpus": corpus, "doc_count": 3, "avgdl": 2.0,
+      "df": Counter({"heap": 2, "sort": 1, "queue": 1, "graph": 1}),
+      "tf": [Counter(d) for d in corpus], "doc_lens": [2, 3, 1],
+   })
+   restored = pickle.loads(pickle.dumps(old))
+   assert not hasattr(restored, "tf")
+   assert np.allclose(restored.get_scores(["heap"]), _reference_bm25_scores(corpus, ["heap"]))
+
+
+def test_simple_bm25_save_load_round_trip():
+   """The .npz arrays reload into an index that scores exactly like the original."""
+   corpus = [tokenize(t) for t in (
+      "binary search tree insert", "hash table with chaining", "",
+      "tree traversal tree height", "std::map << tree",
+   )]
+   bm25 = SimpleBM25(corpus)
+   with tempfile.TemporaryDirectory() as tmpdir:
+      path = Path(tmpdir) / "bm25.npz"
+      bm25.save(path)
+      loaded = SimpleBM25.load(path)
+      with np.load(path) as data:
+         assert data['doc_ids'].dtype == np.int32 and data['vocab'].dtype == np.uint8
+
+      empty_path = Path(tmpdir) / "empty.npz"
+      SimpleBM25([[], []]).save(empty_path)
+      empty = SimpleBM25.load(empty_path)
+
+   for query in (["tree"], ["::", "<<", "hash", "tree"], ["missing"]):
+      assert np.array_equal(loaded.get_scores(query), bm25.get_scores(query))
+   assert loaded.vocab == bm25.vocab
+   assert empty.vocab == {} and list(empty.get_scores(["tree"])) == [0.0, 0.0]
+
+
 # ============================================================================
 # TESTS: INDEX BUILDING
 # ============================================================================
@@ -165,12 +268,148 @@ def test_build_index_creates_files():
       assert (index_dir / "faiss.index").exists()
       assert (index_dir / "chunk_ids.npy").exists()
       assert (index_dir / "meta.jsonl").exists()
-      assert (index_dir / "bm25.pkl").exists()
+      assert (index_dir / "bm25.npz").exists()
+      assert not (index_dir / "bm25.pkl").exists()
 
       assert stats['total_chunks'] == 6
       assert stats['embedding_dim'] == 64
 
 
+def test_build_index_normalizes_streamed_embeddings():
+   """Rows are unit-normalized in place; zero vectors and unembedded records are handled."""
+   import faiss
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+   chunks[1]['embedding'] = [0.0] * 64
+   chunks[2] = dict(chunks[2], embedding=None)
+   expected = np.array([c['embedding'] for c in chunks if c['embedding'] is not None], dtype=np.float32)
+   norms = np.linalg.norm(expected, axis=1, keepdims=True)
+   norms[norms == 0] = 1.0
+   expected = expected / norms
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+      index_dir = tmpdir / "index"
+      stats = build_index(embedded_path, index_dir, verbose=False)
+
+      index = faiss.read_index(str(index_dir / "faiss.index"))
+      stored = index.reconstruct_n(0, index.ntotal)
+
+   assert stats['total_chunks'] == 5
+   assert np.allclose(stored, expected, atol=1e-6)
+
+
+def test_build_index_reads_b64_embeddings():
+   """Base64 float32 embeddings decode bit-exactly and index like the JSON-list form."""
+   import faiss
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+   vec = chunks[0]['embedding']
+   assert np.array_equal(decode_embedding({EMBEDDING_B64_KEY: encode_embedding_b64(vec)}),
+                         np.asarray(vec, dtype=np.float32))
+   assert decode_embedding({'chunk_id': 'x'}) is None
+
+   # Mix both encodings in one file
+   b64_chunks = [dict(c) for c in chunks]
+   for c in b64_chunks[::2]:
+      c[EMBEDDING_B64_KEY] = encode_embedding_b64(c.pop('embedding'))
+
+   stored = {}
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      for name, records in (("list", chunks), ("b64", b64_chunks)):
+         embedded_path = tmpdir / f"{name}.jsonl"
+         _write_jsonl(embedded_path, records)
+         build_index(embedded_path, tmpdir / name, verbose=False)
+         index = faiss.read_index(str(tmpdir / name / "faiss.index"))
+         stored[name] = index.reconstruct_n(0, index.ntotal)
+
+   assert np.array_equal(stored["b64"], stored["list"])
+
+
+def test_build_index_hnsw_serves_retrieval():
+   """An HNSW index (inner product) is written and ranks like the flat one."""
+   import pytest
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+
+      results = {}
+      for index_type in ("flat", "hnsw"):
+         index_dir = tmpdir / index_type
+         stats = build_index(embedded_path, index_dir, verbose=False, index_type=index_type)
+         assert stats['index_type'] == index_type
+         retriever = Retriever(index_dir, client)
+         results[index_type] = [r['chunk_id'] for r in retriever.retrieve("hash tables", final_k=3)]
+      assert results['hnsw'] == results['flat']
+
+      assert build_index(embedded_path, tmpdir / "auto", verbose=False)['index_type'] == "flat"
+      with pytest.raises(ValueError):
+         build_index(embedded_path, tmpdir / "pq", verbose=False, index_type="ivfpq")
+      with pytest.raises(ValueError):
+         build_index(embedded_path, tmpdir / "bad", verbose=False, index_type="lsh")
+
+
+def test_make_faiss_index_ivfpq_trains_on_large_corpus():
+   """ivfpq trains on the embeddings and still finds each vector's own row."""
+   import faiss
+   from rag.build_index import make_faiss_index
+   rng = np.random.default_rng(0)
+   emb = rng.standard_normal((10_000, 32)).astype(np.float32)
+   faiss.normalize_L2(emb)
+
+   index, resolved = make_faiss_index(emb, "ivfpq")
+   assert resolved == "ivfpq" and index.is_trained and index.ntotal == 10_000
+   _, ids = index.search(emb[:100], 1)
+   assert (ids[:, 0] == np.arange(100)).mean() >= 0.9
+
+
+def test_make_faiss_index_ivfsq8_is_compact_and_accurate():
+   """ivfsq8 stores one byte per dimension and keeps scores close to exact cosines."""
+   import faiss
+   import pytest
+   from rag.build_index import make_faiss_index
+   rng = np.random.default_rng(2)
+   emb = rng.standard_normal((2_000, 32)).astype(np.float32)
+   faiss.normalize_L2(emb)
+
+   index, resolved = make_faiss_index(emb, "ivfsq8")
+   assert resolved == "ivfsq8" and index.is_trained and index.ntotal == 2_000
+   assert index.code_size == 32
+   index.nprobe = index.nlist
+   scores, ids = index.search(emb[:100], 1)
+   assert (ids[:, 0] == np.arange(100)).all()
+   assert np.allclose(scores[:, 0], 1.0, atol=0.02)
+   with pytest.raises(ValueError):
+      make_faiss_index(emb[:10], "ivfsq8")
+
+
+def test_make_faiss_index_ivfpq_falls_back_when_gpu_build_fails(monkeypatch):
+   """A visible GPU that cannot build the index leaves the CPU path to train it."""
+   import faiss
+   import rag.build_index as build_index_mod
+   calls = []
+   monkeypatch.setattr(build_index_mod, "faiss_gpu_count", lambda: 1)
+   monkeypatch.setattr(build_index_mod, "_train_and_add_on_gpu",
+                       lambda index, emb: calls.append(index) or None)
+   rng = np.random.default_rng(1)
+   emb = rng.standard_normal((10_000, 32)).astype(np.float32)
+   faiss.normalize_L2(emb)
+
+   index, _ = build_index_mod.make_faiss_index(emb, "ivfpq")
+   assert len(calls) == 1
+   assert index.is_trained and index.ntotal == 10_000 and index.nprobe == 16
+   build_index_mod.make_faiss_index(emb, "ivfpq", use_gpu=False)
+   build_index_mod.make_faiss_index(emb[:100], "flat")
+   assert len(calls) == 1
+
+
 # ============================================================================
 # TESTS: RETRIEVAL
 # ============================================================================
@@ -197,6 +436,163 @@ def test_retrieve_returns_results():
       assert all('score' in r for r in results)
 
 
+def test_retrieve_overlap_features_match_chunk_text():
+   """Cached per-chunk token sets give the overlaps that tokenizing the chunk text gives."""
+   from rag.build_index import CODE_SYMBOLS
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+      index_dir = tmpdir / "index"
+      build_index(embedded_path, index_dir, verbose=False)
+
+      retriever = Retriever(index_dir, embedding_client=client)
+      query = "std::map << tree rotations"
+      results = retriever.retrieve(query, final_k=10)
+
+   query_set = set(tokenize(query))
+   query_symbols = query_set & CODE_SYMBOLS
+   assert results
+   for r in results:
+      chunk_set = set(tokenize(r['text']))
+      assert r['token_overlap'] == len(query_set & chunk_set) / len(query_set)
+      assert r['symbol_overlap'] == len(query_symbols & chunk_set) / len(query_symbols)
+
+
+def test_retriever_survives_rebuild_and_loads_legacy_chunk_ids():
+   """A mapped index keeps serving across a rebuild; pickled object-array chunk IDs still load."""
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+      index_dir = tmpdir / "index"
+      build_index(embedded_path, index_dir, verbose=False)
+
+      retriever = Retriever(index_dir, embedding_client=client)
+      before = retriever.retrieve("AVL tree rotations", final_k=5)
+      build_index(embedded_path, index_dir, verbose=False)
+      assert retriever.retrieve("AVL tree rotations", final_k=5) == before
+      assert not list(index_dir.glob("*.tmp"))
+
+      ids = np.load(str(index_dir / "chunk_ids.npy")).tolist()
+      np.save(str(index_dir / "chunk_ids.npy"), np.array(ids, dtype=object))
+      legacy = Retriever(index_dir, embedding_client=client)
+      assert legacy.chunk_ids == ids
+      assert all(type(cid) is str for cid in legacy.chunk_ids)
+
+
+def test_retriever_reads_text_on_demand():
+   """meta holds no text; get_text and the returned results decode it from meta.jsonl."""
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+   texts = {c['chunk_id']: c['text'] for c in chunks}
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+      index_dir = tmpdir / "index"
+      build_index(embedded_path, index_dir, verbose=False)
+
+      retriever = Retriever(index_dir, embedding_client=client)
+      assert all('text' not in m for m in retriever.meta.values())
+      assert {cid: retriever.get_text(cid) for cid in texts} == texts
+      assert retriever.get_text("no-such-chunk") is None
+
+      results = retriever.retrieve("AVL tree rotations", final_k=10)
+      assert results and all(r['text'] == texts[r['chunk_id']] for r in results)
+      retriever.close()
+
+
+def test_retrieve_reuses_search_buffers():
+   """Repeated queries reuse one pair of FAISS output buffers and rank the same way."""
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+      index_dir = tmpdir / "index"
+      build_index(embedded_path, index_dir, verbose=False)
+
+      retriever = Retriever(index_dir, embedding_client=client)
+      first = retriever.retrieve("hash table chaining", final_k=5)
+      bufs = retriever._search_local.bufs
+      retriever.retrieve("AVL tree rotations", final_k=5)
+      assert retriever._search_local.bufs is bufs
+      assert retriever.retrieve("hash table chaining", final_k=5) == first
+
+
+def test_retrieve_batch_matches_single_queries():
+   """retrieve_batch returns, per query, what retrieve returns for it alone."""
+   client = DummyHashEmbeddingClient(dim=64)
+   chunks = _make_embedded_chunks(client)
+   queries = ["AVL tree rotations", "hash table chaining", "std::map <<", "zzz"]
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+      index_dir = tmpdir / "index"
+      build_index(embedded_path, index_dir, verbose=False)
+
+      retriever = Retriever(index_dir, embedding_client=client)
+      batched = retriever.retrieve_batch(queries, final_k=4)
+      single = [retriever.retrieve(q, final_k=4) for q in queries]
+      assert retriever.retrieve_batch([]) == []
+
+   assert len(batched) == len(queries)
+   for got, want in zip(batched, single):
+      assert [r['chunk_id'] for r in got] == [r['chunk_id'] for r in want]
+      assert np.allclose([r['score'] for r in got], [r['score'] for r in want], atol=1e-6)
+
+
+def test_retriever_rescores_ivfpq_hits_exactly():
+   """With an ivfpq index, vector hits are rescored from float16 vectors.npy; flat builds drop the file."""
+   from rag.build_index import VECTORS_FILE
+   rng = np.random.default_rng(2)
+   emb = rng.standard_normal((10_000, 32)).astype(np.float32)
+   chunks = [
+      {"chunk_id": f"c{i}", "chapter_number": i, "section_number": "1",
+       "text": f"chunk {i}", "embedding": emb[i].tolist()}
+      for i in range(len(emb))
+   ]
+   unit = emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+   class FixedClient:
+      dim = 32
+
+      def embed(self, text):
+         return emb[7]
+
+   with tempfile.TemporaryDirectory() as tmpdir:
+      tmpdir = Path(tmpdir)
+      embedded_path = tmpdir / "chunks.jsonl"
+      _write_jsonl(embedded_path, chunks)
+      index_dir = tmpdir / "index"
+      build_index(embedded_path, index_dir, verbose=False, index_type="ivfpq")
+      assert np.load(index_dir / VECTORS_FILE).dtype == np.float16
+
+      retriever = Retriever(index_dir, embedding_client=FixedClient())
+      results = retriever.retrieve("zzz", final_k=5)
+      assert results[0]['chunk_id'] == "c7"
+      for r in results:
+         i = int(r['chunk_id'][1:])
+         # float16 storage: |error| <= 2**-11 for unit vectors
+         assert abs(r['cosine'] - float(unit[i] @ unit[7])) < 1e-3
+      retriever.close()
+
+      build_index(embedded_path, index_dir, verbose=False, index_type="flat")
+      assert not (index_dir / VECTORS_FILE).exists()
+
+
 def test_retrieve_respects_final_k():
    """Retrieval returns at most final_k results."""
    client = DummyHashEmbeddingClient(dim=64)
@@ -237,7 +633,7 @@ def test_diversity_cap_enforced():
          "text": f"AVL tree content variant {i} with rotations and balance "
                  f"factors and height analysis.",
       }
-      chunk['embedding'] = client.embed(chunk['text'])
+      chunk['embedding'] = client.embed(chunk['text']).tolist()
       chunks.append(chunk)
 
    with tempfile.TemporaryDirectory() as tmpdir:
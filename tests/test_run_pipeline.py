@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for run_pipeline.py
+
+Run:  pytest tests/test_run_pipeline.py -v
+"""
+
+import sys
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import run_pipeline
+
+
+def test_classify_toggle_rebuilds_reused_corpus(tmp_path, monkeypatch):
+   """Turning classify_pages on reuses steps 1-4 but rebuilds the corpus it filters."""
+   import legacy.page_classifier as page_classifier
+   import rag.build_content_corpus as build_content_corpus
+
+   converted = tmp_path / "converted"
+   book_dir = converted / "book"
+   book_dir.mkdir(parents=True)
+   for suffix in ("_PageRecords", "_DocumentRecord", "_QuestionBank.json",
+                  "_SectionsWithText.jsonl"):
+      (book_dir / f"book{suffix}").write_text("{}\n")
+   corpus = tmp_path / "textbook_index" / "book" / "chunks_content.jsonl"
+   corpus.parent.mkdir(parents=True)
+   corpus.write_text("{}\n")
+   pdf = tmp_path / "book.pdf"
+   pdf.write_bytes(b"%PDF-1.4 test")
+
+   monkeypatch.setattr(run_pipeline, "CONVERTED_DIR", converted)
+   monkeypatch.setattr(run_pipeline, "ROOT", tmp_path)
+
+   options = dict(
+      auto_chunk=True, classify_pages=False, build_corpus=True,
+      backend="pymupdf", pymupdf_mode="text",
+      emit_pdf_toc=False, emit_page_labels=False,
+   )
+   run_pipeline._write_stamp(pdf, run_pipeline._ingest_stamp(pdf, options))
+
+   calls = []
+
+   def fake_classify(pages_file, out_path):
+      calls.append("classify")
+      Path(out_path).write_text("{}\n")
+
+   def fake_build_corpus(**kwargs):
+      calls.append(("corpus", kwargs["page_cls_path"]))
+
+   monkeypatch.setattr(page_classifier, "classify_pagerecords", fake_classify)
+   monkeypatch.setattr(build_content_corpus, "build_corpus", fake_build_corpus)
+
+   assert run_pipeline.process_pdf(
+      pdf, auto_chunk=True, classify_pages=True, build_corpus=True,
+   )
+   assert calls == ["classify", ("corpus", book_dir / "book_PageClassifications.jsonl")]
+   stamp = run_pipeline._read_stamp(pdf, classify_pages=True)
+   assert stamp["options"]["classify_pages"] is True
+
+   # Same options again: nothing reruns
+   calls.clear()
+   assert run_pipeline.process_pdf(
+      pdf, auto_chunk=True, classify_pages=True, build_corpus=True,
+   )
+   assert calls == []
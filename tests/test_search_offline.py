@@ -481,3 +481,441 @@ def test_comparison_mode_falls_back():
    # Should still return valid result (fallback to normal compose)
    assert 'answer' in result
    assert 'confidence' in result
+
+
+# ============================================================================
+# TESTS: index persistence
+# ============================================================================
+
+def test_save_load_index_roundtrip(tmp_path):
+   """Saved documents/metadatas reload unchanged (MessagePack or JSON store)."""
+   from legacy.textbook_search_offline import TextbookSearchOffline, msgpack
+
+   search = TextbookSearchOffline(db_path=str(tmp_path))
+   search.documents = ["first chunk text", "second chunk – ünïcode"]
+   search.metadatas = [
+      {'book': 'BookA', 'chapter': '1', 'word_count': 3},
+      {'book': 'BookB', 'chapter': '2', 'word_count': 4},
+   ]
+   search._save_index()
+
+   if msgpack is not None:
+      assert (tmp_path / 'data.msgpack').exists()
+      assert not (tmp_path / 'data.json').exists()
+   else:
+      assert (tmp_path / 'data.json').exists()
+
+   reloaded = TextbookSearchOffline(db_path=str(tmp_path))
+   assert reloaded.documents == search.documents
+   assert reloaded.metadatas == search.metadatas
+
+
+def test_list_books_counts_chunks_per_book(tmp_path, capsys):
+   """list_books reports each book once with its chunk count."""
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   search = TextbookSearchOffline(db_path=str(tmp_path))
+   search.metadatas = [{'book': 'B'}, {'book': 'A'}, {'book': 'B'}]
+   capsys.readouterr()
+   search.list_books()
+   out = capsys.readouterr().out
+   assert "Books in index (2):" in out
+   assert out.index("- A: 1 chunks") < out.index("- B: 2 chunks")
+
+
+def test_fit_query_and_texts_drops_query_only_terms():
+   """Single-pass fit has no query-only columns; scores shift while the order is kept here."""
+   from sklearn.feature_extraction.text import TfidfVectorizer
+   from sklearn.metrics.pairwise import cosine_similarity
+   from legacy.textbook_search_offline import _fit_query_and_texts
+
+   texts = [
+      "Gradient descent updates parameters along the negative gradient.",
+      "A binary search tree keeps keys in sorted order.",
+      "Stochastic gradient descent samples one example per update.",
+   ]
+   query = "how does gradient descent update zebra parameters"
+
+   query_vec, text_vecs = _fit_query_and_texts(TfidfVectorizer(), query, texts)
+   assert query_vec.shape[0] == 1 and text_vecs.shape[0] == len(texts)
+   fused = cosine_similarity(query_vec, text_vecs)[0]
+
+   ref_vec = TfidfVectorizer()
+   ref = cosine_similarity(ref_vec.fit(texts).transform([query]), ref_vec.transform(texts))[0]
+   # 'zebra' only occurs in the query, so it gets no column
+   assert text_vecs.shape[1] == len(ref_vec.vocabulary_)
+   # The query shifts the IDF, so scores differ; on this corpus the order holds
+   assert not np.allclose(fused, ref)
+   assert list(np.argsort(-fused)) == list(np.argsort(-ref))
+
+
+def test_fit_query_and_texts_stopwords_only_raises():
+   """Texts with no usable vocabulary still raise ValueError."""
+   import pytest
+   from sklearn.feature_extraction.text import TfidfVectorizer
+   from legacy.textbook_search_offline import _fit_query_and_texts
+
+   with pytest.raises(ValueError):
+      _fit_query_and_texts(TfidfVectorizer(stop_words='english'), "gradient descent", ["the and of"])
+
+
+# ============================================================================
+# TESTS: QuestionBank matching
+# ============================================================================
+
+def _write_question_bank(qa_dir, book, pairs):
+   """Write a minimal <book>/<book>_QuestionBank.json with (question, answer) pairs."""
+   import json
+   book_dir = qa_dir / book
+   book_dir.mkdir(parents=True, exist_ok=True)
+   data = {
+      'questions': [
+         {'question_id': f'q{i}', 'text': q} for i, (q, _) in enumerate(pairs)
+      ],
+      'answers': [
+         {'question_id': f'q{i}', 'answer_text': a} for i, (_, a) in enumerate(pairs)
+      ],
+   }
+   (book_dir / f'{book}_QuestionBank.json').write_text(json.dumps(data), encoding='utf-8')
+
+
+def test_match_questionbank_finds_best_question(tmp_path):
+   """The closest QuestionBank question is returned with its answer and source."""
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   qa_dir = tmp_path / 'converted'
+   _write_question_bank(qa_dir, 'algos', [
+      ("What is the time complexity of binary search?", "O(log n)"),
+      ("Define a hash table collision.", "Two keys map to one slot."),
+   ])
+   search = TextbookSearchOffline(db_path=str(tmp_path / 'index'))
+
+   match = search._match_questionbank("time complexity of binary search", qa_dir)
+   assert match is not None
+   sim, q_text, a_text, source = match
+   assert q_text.startswith("What is the time complexity")
+   assert a_text == "O(log n)"
+   assert source == 'algos'
+   assert 0.3 <= sim <= 1.0 + 1e-6
+
+   assert search._match_questionbank("unrelated zebra migration", qa_dir) is None
+   assert search._match_questionbank(
+      "time complexity of binary search", qa_dir, book_filter='other'
+   ) is None
+
+
+def test_match_questionbank_threshold_matches_refit_scale(tmp_path):
+   """Near 0.3, similarities and accept/reject decisions match a per-query TF-IDF refit."""
+   from sklearn.feature_extraction.text import TfidfVectorizer
+   from sklearn.metrics.pairwise import cosine_similarity
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   banks = {
+      'algos': [
+         ("What is the time complexity of binary search?", "O(log n)"),
+         ("Define a hash table collision.", "Two keys map to one slot."),
+         ("How does merge sort divide an array?", "In halves."),
+         ("Why is quicksort fast on average?", "Balanced partitions."),
+         ("What does a heap guarantee about its root?", "It is the minimum."),
+      ],
+      'graphs': [
+         ("How does Dijkstra's shortest path algorithm work?", "Greedy relaxation."),
+         ("What is a spanning tree of a graph?", "An acyclic subgraph on every vertex."),
+         ("When does breadth first search find shortest paths?", "On unweighted graphs."),
+      ],
+   }
+   qa_dir = tmp_path / 'converted'
+   for book, pairs in banks.items():
+      _write_question_bank(qa_dir, book, pairs)
+   search = TextbookSearchOffline(db_path=str(tmp_path / 'index'))
+
+   def refit_sim(query, book_filter):
+      questions = [q for book, pairs in banks.items()
+                   if book_filter in (None, book) for q, _ in pairs]
+      vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2), max_features=5000)
+      q_vectors = vectorizer.fit_transform(questions)
+      return float(cosine_similarity(vectorizer.transform([query]), q_vectors)[0].max())
+
+   cases = [
+      ("binary search tree", 'graphs'),   # ~0.32: accepted
+      ("graph search", 'graphs'),         # ~0.32: accepted
+      ("search array", None),             # ~0.26: rejected
+      ("search array", 'graphs'),         # ~0.35 once IDF is the book's own: accepted
+      ("merge heap", None),               # ~0.28: rejected
+   ]
+   for query, book_filter in cases:
+      expected = refit_sim(query, book_filter)
+      assert 0.25 < expected < 0.36
+      match = search._match_questionbank(query, qa_dir, book_filter=book_filter, threshold=0.0)
+      assert match is not None
+      assert abs(match[0] - expected) < 1e-5, (query, book_filter)
+      accepted = search._match_questionbank(query, qa_dir, book_filter=book_filter) is not None
+      assert accepted == (expected >= 0.3), (query, book_filter)
+
+
+def test_rank_sentences_scores_finite_and_sorted(tmp_path):
+   """_rank_sentences returns finite scores in descending order."""
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   search = TextbookSearchOffline(db_path=str(tmp_path))
+   search._pagerank_fell_back = False
+   results = [
+      {'text': "Gradient descent updates the model parameters iteratively. "
+               "Each step moves parameters against the gradient of the loss.",
+       'metadata': {'book': 'A', 'pages': '1-2'}},
+      {'text': "A heap is a tree based structure used for priority queues. "
+               "Gradient methods are unrelated to heaps in most textbooks.",
+       'metadata': {'book': 'B', 'pages': '3-4'}},
+   ]
+   ranked = search._rank_sentences("how does gradient descent update parameters", results)
+   assert ranked
+   scores = [r[0] for r in ranked]
+   assert all(np.isfinite(scores))
+   assert scores == sorted(scores, reverse=True)
+   assert 'gradient' in ranked[0][1].lower()
+
+
+def test_rank_sentences_large_result_set_uses_cached_split(tmp_path):
+   """Large result sets split through the sentence cache, in process."""
+   import legacy.textbook_search_offline as tso
+
+   search = tso.TextbookSearchOffline(db_path=str(tmp_path))
+   search._pagerank_fell_back = False
+   results = [
+      {'text': f"Topic {i} explains gradient descent step number {i} in detail. "
+               f"Another sentence about heaps and priority queues appears here {i}.",
+       'metadata': {'book': 'A', 'pages': str(i)}}
+      for i in range(100)
+   ]
+   query = "gradient descent step"
+   tso._split_sentences_cached.cache_clear()
+   first = search._rank_sentences(query, results)
+   info = tso._split_sentences_cached.cache_info()
+   assert info.misses == len(results) and info.hits == 0
+   second = search._rank_sentences(query, results)
+   assert tso._split_sentences_cached.cache_info().hits == len(results)
+   assert [(r[1], r[3]) for r in second] == [(r[1], r[3]) for r in first]
+
+
+def test_split_sentences_cached_reuses_result():
+   """Repeated texts hit the sentence-split cache."""
+   from legacy.textbook_search_offline import _split_sentences, _split_sentences_cached
+
+   text = ("Dynamic programming stores answers to overlapping subproblems. "
+           "Memoization is the top-down form of the same idea in practice.")
+   first = _split_sentences_cached(text)
+   hits = _split_sentences_cached.cache_info().hits
+   assert _split_sentences_cached(text) is first
+   assert _split_sentences_cached.cache_info().hits == hits + 1
+   assert list(first) == _split_sentences(text)
+
+
+def test_sparse_top1_matches_dense_argmax():
+   """_sparse_top1 agrees with a dense cosine argmax, including ties."""
+   from scipy.sparse import csr_matrix
+   from sklearn.metrics.pairwise import cosine_similarity
+   from sklearn.preprocessing import normalize
+   from legacy.textbook_search_offline import _sparse_top1
+
+   rows = normalize(csr_matrix(np.array([
+      [0.0, 1.0, 0.0],
+      [1.0, 1.0, 0.0],
+      [1.0, 1.0, 0.0],
+      [0.0, 0.0, 1.0],
+   ])))
+   query = normalize(csr_matrix(np.array([[1.0, 1.0, 0.0]])))
+   idx, sim = _sparse_top1(query, rows)
+   dense = cosine_similarity(query, rows)[0]
+   assert idx == int(np.argmax(dense)) == 1
+   assert abs(sim - dense[idx]) < 1e-9
+
+   no_overlap = csr_matrix(np.array([[0.0, 0.0, 0.0]]))
+   assert _sparse_top1(no_overlap, rows) is None
+
+
+def test_questionbank_index_persists_and_refreshes(tmp_path):
+   """index_questionbanks is reused across instances; queries never write it and see new banks on load."""
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   qa_dir = tmp_path / 'converted'
+   index_dir = tmp_path / 'index'
+   _write_question_bank(qa_dir, 'algos', [
+      ("What is the time complexity of binary search?", "O(log n)"),
+   ])
+   search = TextbookSearchOffline(db_path=str(index_dir))
+   search.index_questionbanks(qa_dir)
+   assert (index_dir / 'q_vectors.npz').exists()
+
+   reloaded = TextbookSearchOffline(db_path=str(index_dir))
+   assert reloaded.q_vectors is not None
+   assert reloaded.qa_signature == search.qa_signature
+   match = reloaded._match_questionbank("binary search time complexity", qa_dir)
+   assert match is not None and match[3] == 'algos'
+
+   _write_question_bank(qa_dir, 'graphs', [
+      ("How does Dijkstra's shortest path algorithm work?", "Greedy relaxation."),
+   ])
+   saved = (index_dir / 'q_vectors.npz').stat().st_mtime_ns
+
+   # An instance checks the banks once, on first use; later queries touch no files
+   assert reloaded._match_questionbank(
+      "dijkstra shortest path algorithm", qa_dir, book_filter='graphs'
+   ) is None
+
+   fresh = TextbookSearchOffline(db_path=str(index_dir))
+   match = fresh._match_questionbank(
+      "dijkstra shortest path algorithm", qa_dir, book_filter='graphs'
+   )
+   assert match is not None
+   assert match[2] == "Greedy relaxation."
+   assert len(fresh.qa_pairs) == 2
+   # Rebuilt in memory only: queries leave the persisted index alone
+   assert (index_dir / 'q_vectors.npz').stat().st_mtime_ns == saved
+
+
+def test_vectors_saved_as_memory_mapped_csr(tmp_path):
+   """Vectors round-trip through the .npy store and reload memory-mapped."""
+   import json
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   sections = tmp_path / 'book_SectionsWithText.jsonl'
+   with open(sections, 'w', encoding='utf-8') as f:
+      for i, text in enumerate([
+         "Binary search halves the search interval each step.",
+         "Hash tables map keys to slots with a hash function.",
+         "Binary trees store keys with left and right children.",
+      ]):
+         f.write(json.dumps({'text': text, 'page_start': i, 'page_end': i}) + '\n')
+
+   search = TextbookSearchOffline(db_path=str(tmp_path / 'index'))
+   search.vectorizer.set_params(min_df=1, max_df=1.0)
+   search.load_textbook(sections, book_name='algos')
+   assert (tmp_path / 'index' / 'vectors_shape.json').exists()
+   assert not (tmp_path / 'index' / 'vectors.pkl').exists()
+
+   reloaded = TextbookSearchOffline(db_path=str(tmp_path / 'index'))
+   assert not reloaded.vectors.data.flags.writeable
+   assert (reloaded.vectors != search.vectors).nnz == 0
+   top = reloaded.search("binary search interval", n_results=1)
+   assert top[0]['text'].startswith("Binary search")
+
+
+def test_load_textbooks_fits_and_saves_once(tmp_path):
+   """Several books load with one TF-IDF fit and one save; missing files are skipped."""
+   import json
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   paths = []
+   for name, texts in [
+      ('algos', ["Binary search halves the interval.", "Heaps keep the minimum on top."]),
+      ('graphs', ["Dijkstra relaxes edges greedily.", "BFS visits nodes level by level."]),
+   ]:
+      path = tmp_path / f'{name}_SectionsWithText.jsonl'
+      with open(path, 'w', encoding='utf-8') as f:
+         for i, text in enumerate(texts):
+            f.write(json.dumps({'text': text, 'page_start': i, 'page_end': i}) + '\n')
+      paths.append((path, name))
+   paths.append((tmp_path / 'missing_SectionsWithText.jsonl', None))
+
+   search = TextbookSearchOffline(db_path=str(tmp_path / 'index'))
+   search.vectorizer.set_params(min_df=1, max_df=1.0)
+   saves = []
+   original_save = search._save_index
+   search._save_index = lambda: saves.append(1) or original_save()
+
+   search.load_textbooks(paths)
+   assert len(saves) == 1
+   assert [m['book'] for m in search.metadatas] == ['algos', 'algos', 'graphs', 'graphs']
+   assert search.vectors.shape[0] == 4
+   assert search.search("dijkstra edges", n_results=1)[0]['metadata']['book'] == 'graphs'
+
+
+def test_search_filters_follow_newly_loaded_books(tmp_path):
+   """Book/chapter filters see books loaded after an earlier search; no match falls back to all."""
+   import json
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   def write_book(name, texts):
+      path = tmp_path / f'{name}_SectionsWithText.jsonl'
+      with open(path, 'w', encoding='utf-8') as f:
+         for i, text in enumerate(texts):
+            f.write(json.dumps({'text': text, 'page_start': i, 'page_end': i,
+                                'chapter_number': i + 1, 'book_id': f'id-{name}'}) + '\n')
+      return path
+
+   search = TextbookSearchOffline(db_path=str(tmp_path / 'index'))
+   search.vectorizer.set_params(min_df=1, max_df=1.0)
+   search.load_textbook(write_book('algos', ["Heaps keep the minimum on top.", "Heaps sort in place."]))
+   assert search.search("heaps", book_filter='graphs')[0]['metadata']['book'] == 'algos'
+
+   search.load_textbook(write_book('graphs', ["Heaps speed up Dijkstra.", "BFS visits by level."]))
+   hits = search.search("heaps", book_filter='graphs')
+   assert [h['metadata']['book'] for h in hits] == ['graphs', 'graphs']
+   assert [h['metadata']['chapter'] for h in search.search("heaps", book_ids=['id-algos'], chapter_filter=2)] == ['2']
+
+
+def test_search_filters_follow_reassigned_and_saved_metadatas(tmp_path):
+   """Filter columns are rebuilt after metadatas is reassigned (same length) or edited then saved."""
+   import json
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   path = tmp_path / 'algos_SectionsWithText.jsonl'
+   with open(path, 'w', encoding='utf-8') as f:
+      for i, text in enumerate(["Heaps keep the minimum on top.", "Heaps sort in place."]):
+         f.write(json.dumps({'text': text, 'page_start': i, 'page_end': i}) + '\n')
+
+   search = TextbookSearchOffline(db_path=str(tmp_path / 'index'))
+   search.vectorizer.set_params(min_df=1, max_df=1.0)
+   search.load_textbook(path)
+   assert len(search.search("heaps", book_filter='algos')) == 2
+
+   search.metadatas = [dict(search.metadatas[0], book='renamed'), search.metadatas[1]]
+   assert len(search.search("heaps", book_filter='renamed')) == 1
+
+   search.metadatas[1]['book'] = 'renamed'
+   search._save_index()
+   assert len(search.search("heaps", book_filter='renamed')) == 2
+
+
+def test_load_textbooks_from_cached_counts_matches_full_fit(tmp_path, monkeypatch):
+   """Fitting from per-book cached counts equals fit_transform; unchanged books are not re-tokenized."""
+   import json
+   import random
+   from legacy.textbook_search_offline import TextbookSearchOffline
+
+   rng = random.Random(7)
+   words = [f"term{i}" for i in range(60)] + ["heap", "graph", "the", "and"]
+   paths = []
+   for b in range(3):
+      path = tmp_path / f'book{b}' / 'chunks.jsonl'
+      path.parent.mkdir()
+      with open(path, 'w', encoding='utf-8') as f:
+         for i in range(15):
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(3, 25)))
+            f.write(json.dumps({'text': text, 'page_start': i, 'page_end': i}) + '\n')
+      paths.append((path, f'book{b}'))
+
+   def build(name, cache_counts):
+      search = TextbookSearchOffline(db_path=str(tmp_path / name))
+      search.vectorizer.set_params(max_features=40)
+      search.load_textbooks(paths, cache_counts=cache_counts)
+      return search
+
+   full = build('full', False)
+   cached = build('cached', True)
+   assert cached.vectorizer.vocabulary_ == full.vectorizer.vocabulary_
+   assert np.allclose(cached.vectorizer.idf_, full.vectorizer.idf_)
+   assert abs(cached.vectors - full.vectors).max() < 1e-6
+   assert (paths[0][0].parent / 'chunks.tfidf_counts.npz').exists()
+
+   # Second rebuild reads every book's counts from the cache
+   import legacy.textbook_search_offline as tso
+   calls = []
+   original = tso.CountVectorizer.fit_transform
+   monkeypatch.setattr(tso.CountVectorizer, 'fit_transform',
+                       lambda self, docs, y=None: calls.append(1) or original(self, docs))
+   again = build('again', True)
+   assert calls == []
+   assert abs(again.vectors - full.vectors).max() < 1e-6
+   query = full.search("heap term3 graph", n_results=3)
+   assert [r['text'] for r in again.search("heap term3 graph", n_results=3)] == [r['text'] for r in query]
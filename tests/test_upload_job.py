@@ -260,7 +260,7 @@ def test_upload_job_succeeds_without_converted_folder():
 
         try:
             with patch("pdf_to_jsonl.convert_pdf", side_effect=mock_convert):
-                with patch("scripts.ingest_library._sha256_file", return_value=fixed_book_id):
+                with patch("scripts.ingest_library.sha256_file", return_value=fixed_book_id):
                     with patch("server.services.upload_job_service._check_cancelled", return_value=False):
                         with patch("scripts.ingest_library.rebuild_search_index"):
                             ujs.run_upload_job(
@@ -307,7 +307,7 @@ def test_upload_job_fs_error_returns_sanitized_message():
             raise OSError(f"Cannot write to /Users/secret/path/to/file.pdf")
 
         with patch("pdf_to_jsonl.convert_pdf", side_effect=mock_convert):
-            with patch("scripts.ingest_library._sha256_file", return_value="b" * 64):
+            with patch("scripts.ingest_library.sha256_file", return_value="b" * 64):
                 ujs.run_upload_job(job_id, pdf_path, index_root, uploads_root, "J", "u1")
 
         job = ujs.get_job(job_id)